@@ -0,0 +1,519 @@
+import { sleep, setRequestTransport } from '../lib/requests.js';
+import { summarizeLatencies } from '../lib/aiMetrics.js';
+import {
+  AI_SCHEDULER_POLICY, getAiSchedulerStats, setAiSchedulerPolicy
+} from '../lib/aiScheduler.js';
+import {
+  generateGeminiContent, streamGeminiArray, ITINERARY_SCHEMA, buildDayPlanPrompt, addDaysToDate
+} from '../lib/gemini.js';
+import { INITIAL_TRIP } from '../lib/sampleTrip.js';
+import { DEFAULT_TRAVEL_MODE, hasLocation } from '../lib/travel.js';
+import {
+  MINUTES_PER_DAY, scheduleDays, calculateSchedule, getInfeasibleDayIds, EMPTY_SCHEDULE,
+  updateIncrementalSchedule
+} from '../lib/schedule.js';
+import { optimizeDayOrder } from '../lib/route.js';
+import { splitStopsIntoDays } from '../lib/daySplitter.js';
+import { createTripStore } from '../lib/tripStore.js';
+import { createConflictIndex } from '../lib/conflicts.js';
+import { createSearchIndex, connectSearchIndex } from '../lib/search.js';
+import { GAZETTEER_PLACES, parseGazetteer, getGeocoder, locateStops } from '../lib/geocoding.js';
+import {
+  textEncoder, encodeTripBytes, toBase64Url, encodeSharedTrip, decodeSharedTrip
+} from '../lib/shareLinks.js';
+import {
+  DEFAULT_CURRENCY, EXPENSE_CATEGORIES, parseExpense, convertMinor, summarizeTripExpenses,
+  packTripExpenses, aggregatePackedExpenses
+} from '../lib/expenses.js';
+import { COMPUTE_SLICE_MS, createComputeClient } from '../lib/compute.js';
+import { VIRTUAL_OVERSCAN_PX, buildRowOffsets, visibleRows } from '../lib/virtualList.js';
+import { getStartupReport, getStartupHistory } from '../lib/startup.js';
+import { createGeminiStandIn } from './geminiStandIn.js';
+
+// --- Benchmarks ---
+// Console helpers, e.g. `tripBenchmarks.schedule({ days: 30, stopsPerDay: 200 })`
+// once console.js is loaded.
+
+// Small deterministic PRNG (mulberry32) so benchmark runs are comparable.
+const seededRandom = (seed) => () => {
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+const SYNTHETIC_EXPENSES = ['¥1,200', 'Free', '$25', '€14.50', '¥3,000', '', '2000 yen', '£8'];
+
+const makeSyntheticDays = (dayCount, stopsPerDay) => {
+  const categories = EXPENSE_CATEGORIES.filter(c => c !== 'default');
+  const random = seededRandom(dayCount * 7919 + stopsPerDay);
+  return Array.from({ length: dayCount }, (_, d) => ({
+    id: `bench-day-${d}`,
+    date: '2024-01-01',
+    label: `Day ${d + 1}`,
+    stops: Array.from({ length: stopsPerDay }, (_, i) => ({
+      id: `bench-${d}-${i}`,
+      name: `Stop ${i + 1}`,
+      category: categories[i % categories.length],
+      startTime: '08:00',
+      duration: 15 + (i % 8) * 15,
+      expenses: SYNTHETIC_EXPENSES[(d + i) % SYNTHETIC_EXPENSES.length],
+      location: { lat: 35.6 + random() * 0.1, lng: 139.65 + random() * 0.12 }
+    }))
+  }));
+};
+
+const timeIt = (fn, iterations) => {
+  fn(); // warm-up
+  const t0 = performance.now();
+  for (let i = 0; i < iterations; i++) fn();
+  return (performance.now() - t0) / iterations;
+};
+
+// Resolves at the compute client's next result that answers every patch
+// sent so far. Call it after a change, before its result can arrive.
+const computeSettled = (client) => new Promise(resolve => {
+  const check = () => {
+    if (client.getSnapshot().version < client.getStats().sentVersion) return;
+    unsubscribe();
+    resolve();
+  };
+  const unsubscribe = client.subscribe(check);
+});
+
+// The string-based scheduler this engine replaced, kept only as a baseline.
+const legacyCalculateSchedule = (stops) => {
+  if (stops.length === 0) return [];
+  const addMinutes = (timeStr, mins) => {
+    const [h, m] = timeStr.split(':').map(Number);
+    const totalMins = h * 60 + m + mins;
+    const newH = Math.floor(totalMins / 60) % 24;
+    const newM = totalMins % 60;
+    return `${String(newH).padStart(2, '0')}:${String(newM).padStart(2, '0')}`;
+  };
+  let currentStartTime = stops[0].startTime;
+  return stops.map((stop, index) => {
+    if (index > 0) {
+      const prevStop = stops[index - 1];
+      currentStartTime = addMinutes(prevStop.startTime, prevStop.duration + 30);
+    }
+    return { ...stop, startTime: currentStartTime };
+  });
+};
+
+const benchmarkSchedule = ({ days = 30, stopsPerDay = 200, iterations = 20 } = {}) => {
+  const tripDays = makeSyntheticDays(days, stopsPerDay);
+  const legacyMs = timeIt(() => tripDays.forEach(day => legacyCalculateSchedule(day.stops)), iterations);
+  const engineMs = timeIt(() => scheduleDays(tripDays), iterations);
+  return {
+    stops: days * stopsPerDay,
+    legacyMs,
+    engineMs,
+    speedup: legacyMs / engineMs
+  };
+};
+
+// Cost of a single +15 min edit in the middle of one long day. With
+// `fixedEvery` set, every n-th stop is a fixed-time appointment that stops the
+// edit from rippling further.
+const benchmarkIncrementalSchedule = ({ stopsPerDay = 500, iterations = 200, fixedEvery = 0 } = {}) => {
+  const [day] = makeSyntheticDays(1, stopsPerDay);
+  const middle = Math.floor(stopsPerDay / 2);
+  let stops = fixedEvery > 0
+    ? day.stops.map((stop, i) => (i > 0 && i % fixedEvery === 0 ? { ...stop, fixedTime: true, startTime: '23:00' } : stop))
+    : day.stops;
+  let state = updateIncrementalSchedule(EMPTY_SCHEDULE, stops);
+  const edit = () => {
+    stops = stops.slice();
+    stops[middle] = { ...stops[middle], duration: stops[middle].duration === 15 ? 30 : 15 };
+    return stops;
+  };
+  const fullMs = timeIt(() => calculateSchedule(edit()), iterations);
+  const incrementalMs = timeIt(() => { state = updateIncrementalSchedule(state, edit()); }, iterations);
+  return { stops: stopsPerDay, fullMs, incrementalMs, speedup: fullMs / incrementalMs };
+};
+
+const benchmarkOptimizeDay = ({ sizes = [10, 50, 200, 1000], travelMode = 'car' } = {}) =>
+  sizes.map(size => {
+    const [day] = makeSyntheticDays(1, size);
+    const stops = day.stops.map(stop => ({ ...stop, category: 'sight' }));
+    const t0 = performance.now();
+    const { beforeMinutes, afterMinutes, savedMinutes } = optimizeDayOrder(stops, travelMode);
+    return { stops: size, ms: performance.now() - t0, beforeMinutes, afterMinutes, savedMinutes };
+  });
+
+// Splits one long day of places, into as many days as the budget needs and
+// into a fixed `days`. Spread is the heaviest day's load over the lightest's.
+const benchmarkSplitDays = ({ sizes = [40, 500, 3000], days = 14 } = {}) =>
+  sizes.map(size => {
+    const [day] = makeSyntheticDays(1, size);
+    const run = (options) => {
+      const t0 = performance.now();
+      const { days: split, loads } = splitStopsIntoDays(day.stops, options);
+      return { days: split.length, ms: performance.now() - t0, spread: Math.max(...loads) / Math.min(...loads) };
+    };
+    return { places: size, byBudget: run({}), fixedDays: run({ days }) };
+  });
+
+// One stop edit on a large trip: nested copy-on-write vs the normalized store.
+const benchmarkTripStore = ({ days = 365, stopsPerDay = 50, iterations = 200 } = {}) => {
+  const tripDays = makeSyntheticDays(days, stopsPerDay);
+  const dayIndex = Math.floor(days / 2);
+  const { id: dayId } = tripDays[dayIndex];
+  const stopId = tripDays[dayIndex].stops[Math.floor(stopsPerDay / 2)].id;
+  const bump = stop => ({ ...stop, duration: stop.duration === 15 ? 30 : 15 });
+
+  let trip = { id: 'bench', title: 'Bench', days: tripDays };
+  const nestedMs = timeIt(() => {
+    trip = {
+      ...trip,
+      days: trip.days.map(day => day.id === dayId
+        ? { ...day, stops: day.stops.map(s => s.id === stopId ? bump(s) : s) }
+        : day)
+    };
+    trip.days.find(day => day.id === dayId);
+  }, iterations);
+
+  const store = createTripStore({ id: 'bench', title: 'Bench', days: tripDays });
+  const storeMs = timeIt(() => {
+    store.updateStop(stopId, bump);
+    store.getDayStops(dayId);
+  }, iterations);
+
+  return { stops: days * stopsPerDay, nestedMs, storeMs, speedup: nestedMs / storeMs };
+};
+
+// Totals for many stored trips: re-parsing every string vs packed columns.
+const benchmarkExpenseTotals = ({ trips = 2000, days = 4, stopsPerDay = 6, iterations = 5 } = {}) => {
+  const tripDays = makeSyntheticDays(days, stopsPerDay);
+  const allTrips = Array.from({ length: trips }, (_, i) => ({ id: `bench-trip-${i}`, days: tripDays }));
+  const reparseMs = timeIt(() => allTrips.map(trip => trip.days.reduce((sum, day) =>
+    sum + day.stops.reduce((daySum, stop) => {
+      const parsed = stop.expenses && parseExpense(stop.expenses);
+      return parsed ? daySum + convertMinor(parsed.minor, parsed.currency, 'USD') : daySum;
+    }, 0), 0)), iterations);
+  let packed;
+  const packMs = timeIt(() => { packed = packTripExpenses(allTrips); }, iterations);
+  const aggregateMs = timeIt(() => aggregatePackedExpenses(packed, 'USD'), iterations);
+  return { trips, stops: trips * days * stopsPerDay, reparseMs, packMs, aggregateMs };
+};
+
+// Share payload size and speed against JSON.stringify of the same trip.
+const benchmarkShareEncoding = async ({ days = 7, stopsPerDay = 8, iterations = 50 } = {}) => {
+  const trip = { ...INITIAL_TRIP, days: [...INITIAL_TRIP.days, ...makeSyntheticDays(days, stopsPerDay)] };
+  const json = JSON.stringify(trip);
+  const encoded = await encodeSharedTrip(trip);
+
+  const jsonEncodeMs = timeIt(() => JSON.stringify(trip), iterations);
+  const jsonDecodeMs = timeIt(() => JSON.parse(json), iterations);
+  const binaryEncodeMs = timeIt(() => encodeTripBytes(trip), iterations);
+  let t0 = performance.now();
+  for (let i = 0; i < iterations; i++) await encodeSharedTrip(trip);
+  const encodeMs = (performance.now() - t0) / iterations;
+  t0 = performance.now();
+  for (let i = 0; i < iterations; i++) await decodeSharedTrip(encoded, { onTrip: () => {}, onDay: () => {} });
+  const decodeMs = (performance.now() - t0) / iterations;
+
+  return {
+    stops: trip.days.reduce((sum, day) => sum + day.stops.length, 0),
+    jsonBytes: textEncoder.encode(json).length,
+    jsonBase64UrlChars: toBase64Url(textEncoder.encode(json)).length,
+    binaryBytes: encodeTripBytes(trip).length,
+    shareChars: encoded.length,
+    jsonEncodeMs,
+    jsonDecodeMs,
+    binaryEncodeMs,
+    encodeMs,
+    decodeMs
+  };
+};
+
+// Conflict index over a large trip: build and one stop edit, each until the
+// index reflects it (schedules come from the compute client), and an overlap
+// query against a linear scan of every scheduled stop.
+const benchmarkConflictIndex = async ({ days = 365, stopsPerDay = 50, iterations = 200 } = {}) => {
+  const tripDays = makeSyntheticDays(days, stopsPerDay).map((day, i) => ({ ...day, date: addDaysToDate('2024-04-10', i) }));
+  const store = createTripStore({ id: 'bench', title: 'Bench', startDate: '2024-04-10', travelMode: 'car', days: tripDays });
+  const client = createComputeClient(store);
+  const index = createConflictIndex(store, client);
+  let t0 = performance.now();
+  const unsubscribe = index.subscribe(() => {});
+  await computeSettled(client);
+  const buildMs = performance.now() - t0;
+
+  const dayId = tripDays[Math.floor(days / 2)].id;
+  const stopId = store.getDayStopIds(dayId)[Math.floor(stopsPerDay / 2)];
+  t0 = performance.now();
+  for (let i = 0; i < iterations; i++) {
+    store.updateStop(stopId, s => ({ ...s, duration: s.duration === 15 ? 30 : 15 }));
+    await computeSettled(client);
+  }
+  const editMs = (performance.now() - t0) / iterations;
+
+  const { starts } = scheduleDays(tripDays, 'car');
+  const probe = Math.floor(days / 2) * MINUTES_PER_DAY + 12 * 60;
+  const queryMs = timeIt(() => index.stopsBetween(probe, probe + 60), iterations);
+  const scanMs = timeIt(() => starts.filter(start => start < probe + 60 && start + 60 > probe), iterations);
+  unsubscribe();
+  return { stops: days * stopsPerDay, buildMs, editMs, queryMs, scanMs };
+};
+
+// Per-frame cost of windowing a long list while scrolling it top to bottom,
+// and how many rows stay mounted compared with rendering all of them.
+const benchmarkVirtualWindow = ({ rows = 10000, viewportHeight = 800, step = 40 } = {}) => {
+  const random = seededRandom(rows);
+  const keys = Array.from({ length: rows }, (_, i) => `row-${i}`);
+  const heights = new Map(keys.map(key => [key, 100 + Math.floor(random() * 140)]));
+  const t0 = performance.now();
+  const offsets = buildRowOffsets(keys, heights, 120);
+  const offsetsMs = performance.now() - t0;
+
+  let frames = 0;
+  let maxMounted = 0;
+  const t1 = performance.now();
+  for (let top = 0; top < offsets[rows]; top += step) {
+    const [start, end] = visibleRows(offsets, top, viewportHeight, VIRTUAL_OVERSCAN_PX);
+    maxMounted = Math.max(maxMounted, end - start);
+    frames++;
+  }
+  return { rows, offsetsMs, frameMs: (performance.now() - t1) / frames, maxMounted };
+};
+
+const SYNTHETIC_PLACE_WORDS = ['Ramen', 'Sushi', 'Temple', 'Shrine', 'Market', 'Garden', 'Tower', 'Museum', 'Café', 'Izakaya', 'Onsen', 'Castle', 'Park', 'Station', 'Gallery', 'Bridge'];
+const SYNTHETIC_PLACE_WORDS_JA = ['ラーメン', '寿司', '神社', '市場', '庭園', '美術館', '温泉', '城下町', '公園', '商店街'];
+
+// Indexes a synthetic trip through the live store path, then times typical
+// queries (ms per query) and re-indexing after a one-stop edit.
+const benchmarkSearch = ({ stops = 100000, stopsPerDay = 100, iterations = 50 } = {}) => {
+  const random = seededRandom(stops);
+  const pick = (words) => words[Math.floor(random() * words.length)];
+  let sampleTicket = '';
+  const tripDays = Array.from({ length: Math.ceil(stops / stopsPerDay) }, (_, d) => ({
+    id: `bench-day-${d}`,
+    date: '2024-01-01',
+    label: `Day ${d + 1}`,
+    stops: Array.from({ length: Math.min(stopsPerDay, stops - d * stopsPerDay) }, (_, i) => {
+      const name = `${pick(SYNTHETIC_PLACE_WORDS)} ${pick(SYNTHETIC_PLACE_WORDS)} ${pick(SYNTHETIC_PLACE_WORDS_JA)}`;
+      const ticketInfo = random() < 0.3 ? `Booking HX${String(Math.floor(random() * 1e6)).padStart(6, '0')}` : '';
+      if (ticketInfo) sampleTicket = ticketInfo.split(' ')[1];
+      return {
+        id: `bench-${d}-${i}`,
+        name,
+        category: 'sight',
+        startTime: '09:00',
+        duration: 60,
+        remarks: `${pick(SYNTHETIC_PLACE_WORDS)} near the ${pick(SYNTHETIC_PLACE_WORDS).toLowerCase()}`,
+        ticketInfo,
+        googleLink: `https://maps.google.com/?q=${encodeURIComponent(name)}`
+      };
+    })
+  }));
+  const store = createTripStore({ id: 'bench', title: 'Bench', days: tripDays });
+
+  const index = createSearchIndex();
+  const t0 = performance.now();
+  const disconnect = connectSearchIndex(index, store);
+  const buildMs = performance.now() - t0;
+
+  const queries = {
+    ticket: sampleTicket.toLowerCase(),
+    word: 'ramen',
+    typing: 'mus',
+    twoWords: 'sushi market',
+    cjk: 'ラーメ',
+    cjkWords: '美術館 温泉'
+  };
+  const queryMs = {};
+  const hits = {};
+  Object.entries(queries).forEach(([name, query]) => {
+    queryMs[name] = timeIt(() => index.search(query), iterations);
+    hits[name] = index.search(query, { limit: Infinity }).length;
+  });
+
+  let edits = 0;
+  const editMs = timeIt(() => store.updateStop('bench-0-0', stop => ({ ...stop, remarks: `Edit ${edits++}` })), iterations);
+  disconnect();
+  return { stops, terms: index.termCount(), buildMs, queryMs, hits, editMs };
+};
+
+// Geocodes a batch of stops without coordinates, named after gazetteer
+// places, written with pin links, or unknown: cold (empty memo), then again
+// as a re-render would. Also times nearest-place lookups against the tree.
+const benchmarkGeocode = ({ stops = 2000, iterations = 20 } = {}) => {
+  const random = seededRandom(stops);
+  const pick = (words) => words[Math.floor(random() * words.length)];
+  const geocoder = getGeocoder();
+  const known = parseGazetteer(GAZETTEER_PLACES, 'place');
+  const batch = Array.from({ length: stops }, (_, i) => {
+    const place = known[Math.floor(random() * known.length)];
+    const roll = random();
+    const stop = { id: `bench-${i}`, name: `Stop ${i}`, googleLink: '', location: { lat: 0, lng: 0 } };
+    if (roll < 0.5) stop.name = `Visit ${place.name} ${i}`;
+    else if (roll < 0.8) stop.googleLink = `https://www.google.com/maps/place/x/data=!3d${(place.lat + random() / 100).toFixed(5)}!4d${(place.lng + random() / 100).toFixed(5)}`;
+    else stop.name = `${pick(SYNTHETIC_PLACE_WORDS)} ${pick(SYNTHETIC_PLACE_WORDS)} ${i}`;
+    return stop;
+  });
+
+  geocoder.clearCache();
+  const t0 = performance.now();
+  const located = locateStops(batch);
+  const coldMs = performance.now() - t0;
+  const warmMs = timeIt(() => locateStops(batch), iterations);
+  const reverseMs = timeIt(() => geocoder.reverse(35 + random(), 135 + random() * 5, { k: 3, maxKm: 50 }), iterations * 100);
+  const resolved = located.filter(hasLocation).length;
+  geocoder.clearCache();
+  return { stops, resolved, coldMs, warmMs, reverseMs };
+};
+
+// Trip-wide derivations per stop edit on a large trip: main-thread time when
+// computed inline by store selectors, against the compute client (patch
+// building only; the engine runs in a worker where available) and the delay
+// until its result arrives. A burst of edits during a full recompute shows
+// superseded days being dropped rather than posted.
+const benchmarkCompute = async ({ days = 365, stopsPerDay = 50, edits = 20 } = {}) => {
+  const store = createTripStore({ id: 'bench', title: 'Bench', days: makeSyntheticDays(days, stopsPerDay) });
+  const dayIds = store.getDayIds();
+  const stopIdOf = (i) => store.getDayStopIds(dayIds[(i * 7919) % days])[0];
+  const bump = stop => ({ ...stop, duration: stop.duration === 15 ? 30 : 15 });
+
+  let edit = 0;
+  const inlineMs = timeIt(() => {
+    store.updateStop(stopIdOf(edit++), bump);
+    getInfeasibleDayIds(store, DEFAULT_TRAVEL_MODE);
+    summarizeTripExpenses(store, DEFAULT_CURRENCY);
+  }, edits);
+
+  const client = createComputeClient(store);
+  const t0 = performance.now();
+  const release = client.subscribe(() => {});
+  const settled = () => computeSettled(client);
+  await settled();
+  const initialMs = performance.now() - t0;
+
+  let patchMs = 0;
+  const latencies = [];
+  for (let i = 0; i < edits; i++) {
+    const started = performance.now();
+    store.updateStop(stopIdOf(edit++), bump);
+    await Promise.resolve(); // the patch is sent from a microtask
+    patchMs += performance.now() - started;
+    await settled();
+    latencies.push({ ms: performance.now() - started });
+  }
+
+  const before = client.getStats().engine;
+  store.setMeta({ travelMode: 'walk' });
+  await sleep(COMPUTE_SLICE_MS * 2);
+  for (let i = 0; i < edits; i++) store.updateStop(stopIdOf(edit++), bump);
+  await settled();
+  const after = client.getStats();
+  release();
+
+  return {
+    stops: days * stopsPerDay,
+    inlineMs,
+    patchMs: patchMs / edits,
+    initialMs,
+    resultLatencyMs: summarizeLatencies(latencies, 'ms'),
+    burst: {
+      superseded: after.engine.superseded - before.superseded,
+      results: after.engine.results - before.results
+    },
+    inWorker: after.inWorker,
+    bytesTransferred: after.bytesTransferred
+  };
+};
+
+// This load's startup timings and script bytes, with the history of earlier
+// releases (see lib/startup.js). Timings are only complete once the page has idled.
+const benchmarkStartup = () => ({ current: getStartupReport(), releases: getStartupHistory() });
+
+// Simulates `users` people each planning `iterations` days: a streamed,
+// interactive itinerary request, then a Sparkles click on every returned stop
+// (background enrichment), then `thinkTimeMs` of reading. Requests go through
+// the real scheduler, resilience and metrics layers with the cache bypassed.
+// By default they are answered by a Gemini stand-in built from `standIn`; pass
+// `standIn: null` to use the current transport, e.g. a local server set with
+// setGeminiApiBase. `schedulerPolicy` overrides the limits for this run only.
+const benchmarkAiLoad = async ({
+  users = 5,
+  iterations = 2,
+  thinkTimeMs = 500,
+  standIn = {},
+  schedulerPolicy = null,
+  seed = 1
+} = {}) => {
+  const standInServer = standIn && createGeminiStandIn({ random: seededRandom(seed), ...standIn });
+  if (standInServer) setRequestTransport(standInServer.fetch);
+  const previousPolicy = { ...AI_SCHEDULER_POLICY };
+  if (schedulerPolicy) setAiSchedulerPolicy(schedulerPolicy);
+
+  const samples = { generate: [], enrich: [] };
+  const failures = { generate: 0, enrich: 0 };
+  const timed = async (kind, request) => {
+    const startedAt = performance.now();
+    const result = await request();
+    samples[kind].push({ ms: performance.now() - startedAt });
+    if (result == null) failures[kind]++;
+    return result;
+  };
+
+  const runUser = async (user) => {
+    for (let day = 1; day <= iterations; day++) {
+      const prompt = buildDayPlanPrompt(`Load Test City ${user}`, 'Hidden gems', day, iterations);
+      const stops = await timed('generate', () => streamGeminiArray(prompt, ITINERARY_SCHEMA, () => {}, {
+        cache: false, caller: 'load:generate', priority: 'interactive'
+      }));
+      await Promise.all((stops || []).map(stop => timed('enrich', () => generateGeminiContent(
+        `Give me one interesting, insider travel tip, fun fact, or "must-eat" recommendation for "${stop.name}" (user ${user}, day ${day}). Keep it short (max 20 words).`,
+        null,
+        { cache: false, caller: 'load:enrich' }
+      ))));
+      await sleep(thinkTimeMs);
+    }
+  };
+
+  const startedAt = performance.now();
+  let scheduler;
+  try {
+    await Promise.all(Array.from({ length: users }, (_, user) => runUser(user + 1)));
+    scheduler = getAiSchedulerStats();
+  } finally {
+    if (standInServer) setRequestTransport(null);
+    if (schedulerPolicy) setAiSchedulerPolicy(previousPolicy);
+  }
+
+  const durationMs = performance.now() - startedAt;
+  const summarize = (kind) => ({
+    requests: samples[kind].length,
+    failed: failures[kind],
+    perSecond: samples[kind].length / (durationMs / 1000),
+    latencyMs: summarizeLatencies(samples[kind], 'ms')
+  });
+  return {
+    users,
+    iterations,
+    durationMs: Math.round(durationMs),
+    generate: summarize('generate'),
+    enrich: summarize('enrich'),
+    scheduler,
+    standIn: standInServer ? standInServer.getStats() : null
+  };
+};
+
+export const tripBenchmarks = {
+  schedule: benchmarkSchedule,
+  incrementalSchedule: benchmarkIncrementalSchedule,
+  optimizeDay: benchmarkOptimizeDay,
+  splitDays: benchmarkSplitDays,
+  tripStore: benchmarkTripStore,
+  expenseTotals: benchmarkExpenseTotals,
+  shareEncoding: benchmarkShareEncoding,
+  conflictIndex: benchmarkConflictIndex,
+  virtualWindow: benchmarkVirtualWindow,
+  search: benchmarkSearch,
+  compute: benchmarkCompute,
+  startup: benchmarkStartup,
+  geocode: benchmarkGeocode,
+  aiLoad: benchmarkAiLoad
+};
@@ -0,0 +1,12 @@
+import { tripBenchmarks } from './benchmarks.js';
+import { tripDiagnostics } from './diagnostics.js';
+
+// Development entry point; the app never imports anything under dev/. Loaded
+// into a running page, e.g. `await import('./dev/console.js')` from the
+// devtools console, it exposes window.tripBenchmarks and
+// window.tripDiagnostics. It shares the lib modules with the app only when
+// both load them from the same URLs, so a bundled build needs it added as a
+// separate development entry instead.
+
+window.tripBenchmarks = tripBenchmarks;
+window.tripDiagnostics = tripDiagnostics;
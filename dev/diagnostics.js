@@ -0,0 +1,36 @@
+import { setRequestTransport, getRequestHealth } from '../lib/requests.js';
+import { getAiMetrics, formatAiMetricsText, exportAiMetrics, resetAiMetrics } from '../lib/aiMetrics.js';
+import { getAiSchedulerStats, setAiSchedulerPolicy } from '../lib/aiScheduler.js';
+import { getResponseCacheStats, clearResponseCache } from '../lib/gemini.js';
+import { getGeocoder } from '../lib/geocoding.js';
+import {
+  getRenderProfile, resetRenderProfile, exportRenderProfile, enableRenderProfiling
+} from '../lib/renderProfiling.js';
+import { getStartupHistory } from '../lib/startup.js';
+import { createGeminiStandIn } from './geminiStandIn.js';
+
+// --- Diagnostics ---
+// Console handles on the live page's request, AI, geocoder, render and
+// startup state, e.g. `tripDiagnostics.aiMetricsText()`. The state belongs to
+// the lib modules, so these see what the app is doing when loaded beside it
+// (see console.js).
+
+export const tripDiagnostics = {
+  requestHealth: getRequestHealth,
+  responseCache: getResponseCacheStats,
+  clearResponseCache,
+  aiMetrics: getAiMetrics,
+  aiMetricsText: formatAiMetricsText,
+  exportAiMetrics,
+  resetAiMetrics,
+  aiScheduler: getAiSchedulerStats,
+  setAiSchedulerPolicy,
+  createGeminiStandIn,
+  setRequestTransport,
+  geocoder: () => getGeocoder().getStats(),
+  startupHistory: getStartupHistory,
+  renderProfile: getRenderProfile,
+  exportRenderProfile,
+  resetRenderProfile,
+  enableRenderProfiling
+};
@@ -0,0 +1,160 @@
+import { createAbortError, sleep } from '../lib/requests.js';
+
+// --- Gemini Stand-in ---
+// An in-process imitation of the generateContent and streamGenerateContent
+// endpoints, so the AI paths can be load tested without spending quota. It
+// reads the real request payload and answers with JSON that conforms to
+// generationConfig.responseSchema (or plain text), in the response and SSE
+// shapes the Gemini helpers parse, including usageMetadata. Install it with
+// setRequestTransport(standIn.fetch).
+//
+// `latency` is the time to first byte: { distribution: 'fixed', ms },
+// { distribution: 'uniform', minMs, maxMs }, { distribution: 'lognormal',
+// medianMs, p99Ms } or a function of a random() source returning ms.
+// `rateLimitRate` and `errorRate` are the shares of calls answered with 429
+// and 500. Streams send `streamChunks` events `chunkIntervalMs` apart.
+
+const STAND_IN_WORDS = ['quiet', 'local', 'historic', 'riverside', 'hidden', 'famous', 'garden', 'market', 'alley', 'view', 'morning', 'late-night'];
+
+const sampleLatency = (latency, random) => {
+  if (typeof latency === 'function') return latency(random);
+  switch (latency.distribution) {
+    case 'fixed':
+      return latency.ms;
+    case 'uniform':
+      return latency.minMs + random() * (latency.maxMs - latency.minMs);
+    default: {
+      // Log-normal fitted to the median and p99 (z = 2.326).
+      const sigma = Math.log(latency.p99Ms / latency.medianMs) / 2.326;
+      const normal = Math.sqrt(-2 * Math.log(1 - random())) * Math.cos(2 * Math.PI * random());
+      return latency.medianMs * Math.exp(sigma * normal);
+    }
+  }
+};
+
+const standInText = (random, words) =>
+  Array.from({ length: words }, () => STAND_IN_WORDS[Math.floor(random() * STAND_IN_WORDS.length)]).join(' ');
+
+// A value conforming to a Gemini responseSchema (OpenAPI subset, upper-case types).
+const sampleFromSchema = (schema, random, { key = '', itemCount = 4 } = {}) => {
+  switch (schema.type) {
+    case 'ARRAY':
+      return Array.from({ length: itemCount }, (_, i) => sampleFromSchema(schema.items, random, { key: `${key}${i + 1}`, itemCount }));
+    case 'OBJECT':
+      return Object.fromEntries(Object.entries(schema.properties || {}).map(([name, property]) =>
+        [name, sampleFromSchema(property, random, { key: name, itemCount })]));
+    case 'INTEGER':
+    case 'NUMBER': {
+      const min = schema.minimum ?? 15;
+      const max = schema.maximum ?? 180;
+      const value = min + random() * (max - min);
+      return schema.type === 'INTEGER' ? Math.round(value / 15) * 15 || min : value;
+    }
+    case 'BOOLEAN':
+      return random() < 0.5;
+    default:
+      if (schema.enum) return schema.enum[Math.floor(random() * schema.enum.length)];
+      return `${standInText(random, 2)} ${key}`.trim();
+  }
+};
+
+const standInUsage = (prompt, text) => {
+  const promptTokenCount = Math.ceil(prompt.length / 4);
+  const candidatesTokenCount = Math.ceil(text.length / 4);
+  return { promptTokenCount, candidatesTokenCount, totalTokenCount: promptTokenCount + candidatesTokenCount };
+};
+
+export const createGeminiStandIn = ({
+  latency = { distribution: 'lognormal', medianMs: 800, p99Ms: 4000 },
+  rateLimitRate = 0,
+  errorRate = 0,
+  streamChunks = 6,
+  chunkIntervalMs = 150,
+  itemCount = 4,
+  random = Math.random
+} = {}) => {
+  const config = { latency, rateLimitRate, errorRate, streamChunks, chunkIntervalMs, itemCount };
+  const stats = { requests: 0, streams: 0, rateLimited: 0, errors: 0, pending: 0, maxPending: 0 };
+
+  const jsonResponse = (status, body) =>
+    new Response(JSON.stringify(body), { status, headers: { 'Content-Type': 'application/json' } });
+
+  const streamResponse = (chunks, usage, signal) => {
+    const encoder = new TextEncoder();
+    let timer = null;
+    return new Response(new ReadableStream({
+      start(controller) {
+        let index = 0;
+        const push = () => {
+          const event = { candidates: [{ content: { role: 'model', parts: [{ text: chunks[index] }] } }] };
+          if (++index === chunks.length) {
+            event.candidates[0].finishReason = 'STOP';
+            event.usageMetadata = usage;
+          }
+          controller.enqueue(encoder.encode(`data: ${JSON.stringify(event)}\r\n\r\n`));
+          if (index < chunks.length) {
+            timer = setTimeout(push, config.chunkIntervalMs);
+          } else {
+            timer = null;
+            controller.close();
+          }
+        };
+        signal?.addEventListener('abort', () => {
+          if (timer === null) return;
+          clearTimeout(timer);
+          controller.error(createAbortError());
+        }, { once: true });
+        push();
+      },
+      cancel() {
+        clearTimeout(timer);
+      }
+    }), { status: 200, headers: { 'Content-Type': 'text/event-stream' } });
+  };
+
+  const standInFetch = async (url, init = {}) => {
+    const streaming = String(url).includes(':streamGenerateContent');
+    stats.requests++;
+    if (streaming) stats.streams++;
+    stats.pending++; // awaiting headers
+    stats.maxPending = Math.max(stats.maxPending, stats.pending);
+    try {
+      if (random() < config.rateLimitRate) {
+        stats.rateLimited++;
+        return jsonResponse(429, { error: { code: 429, status: 'RESOURCE_EXHAUSTED', message: 'Stand-in quota exceeded' } });
+      }
+      await sleep(Math.max(0, sampleLatency(config.latency, random)), init.signal);
+      if (random() < config.errorRate) {
+        stats.errors++;
+        return jsonResponse(500, { error: { code: 500, status: 'INTERNAL', message: 'Stand-in failure' } });
+      }
+
+      const payload = JSON.parse(init.body);
+      const prompt = payload.contents[0].parts[0].text;
+      const schema = payload.generationConfig?.responseSchema;
+      const text = schema
+        ? JSON.stringify(sampleFromSchema(schema, random, { itemCount: config.itemCount }))
+        : standInText(random, 12);
+      const usage = standInUsage(prompt, text);
+      if (!streaming) {
+        return jsonResponse(200, {
+          candidates: [{ content: { role: 'model', parts: [{ text }] }, finishReason: 'STOP' }],
+          usageMetadata: usage
+        });
+      }
+
+      const size = Math.ceil(text.length / Math.max(1, config.streamChunks));
+      const chunks = [];
+      for (let i = 0; i < text.length; i += size) chunks.push(text.slice(i, i + size));
+      return streamResponse(chunks, usage, init.signal);
+    } finally {
+      stats.pending--;
+    }
+  };
+
+  return {
+    fetch: standInFetch,
+    configure: (changes) => Object.assign(config, changes),
+    getStats: () => ({ ...stats })
+  };
+};
@@ -0,0 +1,161 @@
+import { isAbortError } from './requests.js';
+
+// --- AI Call Metrics ---
+// Every model call is recorded with its caller tag, wall time, time to first
+// byte, prompt and response sizes, token usage from usageMetadata and outcome.
+// The most recent calls feed rolling p50/p95/p99 latencies per caller, while
+// counters and latency histogram buckets are cumulative. Read them in process
+// with getAiMetrics(), as Prometheus text with formatAiMetricsText(), or save
+// them to a file with exportAiMetrics().
+
+const AI_METRICS_WINDOW = 500;
+const AI_LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000];
+
+let aiCallLog = [];               // most recent calls, oldest first
+const aiCallerTotals = new Map(); // caller -> cumulative counters
+
+export const byteLength = (text) => (text ? new TextEncoder().encode(text).length : 0);
+
+export const downloadJson = (filename, data) => {
+  const blob = new Blob([JSON.stringify(data, null, 2)], { type: 'application/json' });
+  const url = URL.createObjectURL(blob);
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = filename;
+  link.click();
+  URL.revokeObjectURL(url);
+};
+
+const recordAiCall = (call) => {
+  aiCallLog.push(call);
+  if (aiCallLog.length > AI_METRICS_WINDOW) aiCallLog = aiCallLog.slice(-AI_METRICS_WINDOW);
+
+  let totals = aiCallerTotals.get(call.caller);
+  if (!totals) {
+    totals = {
+      calls: 0, ok: 0, errors: 0, aborted: 0, cacheHits: 0,
+      promptBytes: 0, responseBytes: 0, promptTokens: 0, responseTokens: 0, totalTokens: 0,
+      latencyBuckets: new Array(AI_LATENCY_BUCKETS_MS.length + 1).fill(0)
+    };
+    aiCallerTotals.set(call.caller, totals);
+  }
+  totals.calls++;
+  if (call.outcome === 'ok') totals.ok++;
+  else if (call.outcome === 'aborted') totals.aborted++;
+  else totals.errors++;
+  if (call.cached) {
+    totals.cacheHits++;
+    return;
+  }
+  totals.promptBytes += call.promptBytes;
+  totals.responseBytes += call.responseBytes;
+  totals.promptTokens += call.promptTokens;
+  totals.responseTokens += call.responseTokens;
+  totals.totalTokens += call.totalTokens;
+  if (call.outcome !== 'ok') return;
+  const bucket = AI_LATENCY_BUCKETS_MS.findIndex(limit => call.wallMs <= limit);
+  totals.latencyBuckets[bucket < 0 ? AI_LATENCY_BUCKETS_MS.length : bucket]++;
+};
+
+// Starts timing one call. The tracker records the call on its first finish();
+// later calls are ignored, so error paths can finish unconditionally.
+export const startAiCall = (caller = 'unknown', kind, prompt) => {
+  const startedAt = performance.now();
+  let firstByteAt = null;
+  let finished = false;
+  return {
+    firstByte() {
+      if (firstByteAt === null) firstByteAt = performance.now();
+    },
+    finish({ outcome = 'ok', status = null, responseBytes = 0, usage = null, cached = false } = {}) {
+      if (finished) return;
+      finished = true;
+      recordAiCall({
+        caller,
+        kind,
+        at: Date.now(),
+        outcome,
+        status,
+        cached,
+        wallMs: performance.now() - startedAt,
+        ttfbMs: firstByteAt === null ? null : firstByteAt - startedAt,
+        promptBytes: byteLength(prompt),
+        responseBytes,
+        promptTokens: usage?.promptTokenCount ?? 0,
+        responseTokens: usage?.candidatesTokenCount ?? 0,
+        totalTokens: usage?.totalTokenCount ?? 0
+      });
+    }
+  };
+};
+
+export const aiFailureOutcome = (error) => (isAbortError(error) ? 'aborted' : 'error');
+
+export const summarizeLatencies = (calls, field) => {
+  const values = calls.map(call => call[field]).filter(value => value != null).sort((a, b) => a - b);
+  const at = (p) => (values.length ? Math.round(values[Math.min(values.length - 1, Math.floor(p * values.length))]) : null);
+  return { samples: values.length, p50: at(0.5), p95: at(0.95), p99: at(0.99) };
+};
+
+// Latency percentiles cover completed network calls only; cache hits and
+// failures would skew them.
+const summarizeRecentCalls = (calls) => {
+  const network = calls.filter(call => !call.cached && call.outcome === 'ok');
+  return { wallMs: summarizeLatencies(network, 'wallMs'), ttfbMs: summarizeLatencies(network, 'ttfbMs') };
+};
+
+export const getAiMetrics = ({ includeCalls = false } = {}) => ({
+  window: AI_METRICS_WINDOW,
+  latencyBucketsMs: AI_LATENCY_BUCKETS_MS,
+  overall: summarizeRecentCalls(aiCallLog),
+  callers: Object.fromEntries([...aiCallerTotals.keys()].sort().map(caller => {
+    const totals = aiCallerTotals.get(caller);
+    return [caller, {
+      ...totals,
+      latencyBuckets: [...totals.latencyBuckets],
+      recent: summarizeRecentCalls(aiCallLog.filter(call => call.caller === caller))
+    }];
+  })),
+  ...(includeCalls ? { calls: aiCallLog.map(call => ({ ...call })) } : {})
+});
+
+// Prometheus text exposition, for scraping or diffing without a collector.
+export const formatAiMetricsText = () => {
+  const lines = [];
+  const metric = (name, type, help) => lines.push(`# HELP ${name} ${help}`, `# TYPE ${name} ${type}`);
+
+  metric('trip_ai_calls_total', 'counter', 'Model calls by caller and outcome.');
+  aiCallerTotals.forEach((totals, caller) => {
+    [['ok', totals.ok], ['error', totals.errors], ['aborted', totals.aborted], ['cache_hit', totals.cacheHits]]
+      .forEach(([outcome, value]) => lines.push(`trip_ai_calls_total{caller="${caller}",outcome="${outcome}"} ${value}`));
+  });
+  metric('trip_ai_tokens_total', 'counter', 'Tokens reported in usageMetadata.');
+  aiCallerTotals.forEach((totals, caller) => {
+    lines.push(`trip_ai_tokens_total{caller="${caller}",type="prompt"} ${totals.promptTokens}`);
+    lines.push(`trip_ai_tokens_total{caller="${caller}",type="response"} ${totals.responseTokens}`);
+  });
+  metric('trip_ai_bytes_total', 'counter', 'Prompt and response payload bytes.');
+  aiCallerTotals.forEach((totals, caller) => {
+    lines.push(`trip_ai_bytes_total{caller="${caller}",direction="prompt"} ${totals.promptBytes}`);
+    lines.push(`trip_ai_bytes_total{caller="${caller}",direction="response"} ${totals.responseBytes}`);
+  });
+  metric('trip_ai_latency_ms', 'histogram', 'Wall time of completed network model calls.');
+  aiCallerTotals.forEach((totals, caller) => {
+    let cumulative = 0;
+    totals.latencyBuckets.forEach((count, i) => {
+      cumulative += count;
+      const le = i < AI_LATENCY_BUCKETS_MS.length ? AI_LATENCY_BUCKETS_MS[i] : '+Inf';
+      lines.push(`trip_ai_latency_ms_bucket{caller="${caller}",le="${le}"} ${cumulative}`);
+    });
+    lines.push(`trip_ai_latency_ms_count{caller="${caller}"} ${cumulative}`);
+  });
+  return `${lines.join('\n')}\n`;
+};
+
+export const exportAiMetrics = () =>
+  downloadJson(`ai-metrics-${new Date().toISOString().replace(/[:.]/g, '-')}.json`, getAiMetrics({ includeCalls: true }));
+
+export const resetAiMetrics = () => {
+  aiCallLog = [];
+  aiCallerTotals.clear();
+};
@@ -0,0 +1,204 @@
+import { createAbortError } from './requests.js';
+import { summarizeLatencies } from './aiMetrics.js';
+
+// --- Request Scheduler ---
+// Model calls take a slot before they touch the network. Slots are limited by
+// a token bucket sized to the API quota and by a concurrency cap. Queued
+// interactive requests (itinerary generation) always dispatch before queued
+// background ones (tip enrichment). Background work must also leave
+// `interactiveReserve` slots and tokens free, so a Magic Plan never waits
+// behind a burst of Sparkles clicks. Requests already in flight are not
+// cancelled to make room: they have already spent quota. Every network
+// attempt costs a token: the first comes with the slot, and each retry or
+// hedge of a running request takes another through acquireAiToken. Those
+// go ahead of queued requests, since finishing them is what frees slots.
+
+export const AI_SCHEDULER_POLICY = {
+  bucketCapacity: 10,   // burst size
+  refillPerSecond: 1,   // sustained rate: 60 requests per minute
+  maxConcurrent: 4,
+  interactiveReserve: 1,
+  planDaysInFlight: 3   // per Magic Plan; see planDayConcurrency
+};
+const AI_SCHEDULER_WAIT_SAMPLES = 200;
+
+const aiQueues = { retry: [], interactive: [], background: [] };
+const tokenBucket = { tokens: AI_SCHEDULER_POLICY.bucketCapacity, refilledAt: 0 };
+const aiSchedulerStats = {
+  active: 0,
+  maxQueueDepth: 0,
+  dispatched: { interactive: 0, background: 0 },
+  cancelled: 0,
+  deduplicated: 0,
+  extraAttempts: 0,
+  waits: { interactive: [], background: [] }
+};
+let aiSchedulerTimer = null;
+
+const refillTokenBucket = () => {
+  const now = performance.now();
+  const elapsed = tokenBucket.refilledAt ? (now - tokenBucket.refilledAt) / 1000 : 0;
+  tokenBucket.tokens = Math.min(
+    AI_SCHEDULER_POLICY.bucketCapacity,
+    tokenBucket.tokens + elapsed * AI_SCHEDULER_POLICY.refillPerSecond
+  );
+  tokenBucket.refilledAt = now;
+};
+
+const dispatchAiRequests = () => {
+  refillTokenBucket();
+  for (;;) {
+    const priority = ['retry', 'interactive', 'background'].find(name => aiQueues[name].length);
+    if (!priority) return;
+
+    const extraAttempt = priority === 'retry'; // holds its slot already
+    const reserve = priority === 'background' ? AI_SCHEDULER_POLICY.interactiveReserve : 0;
+    // A full house is retried when a slot is released.
+    if (!extraAttempt && aiSchedulerStats.active >= AI_SCHEDULER_POLICY.maxConcurrent - reserve) return;
+    const needed = 1 + reserve;
+    if (tokenBucket.tokens < needed) {
+      if (!aiSchedulerTimer) {
+        const waitMs = ((needed - tokenBucket.tokens) / AI_SCHEDULER_POLICY.refillPerSecond) * 1000;
+        aiSchedulerTimer = setTimeout(() => {
+          aiSchedulerTimer = null;
+          dispatchAiRequests();
+        }, Math.ceil(waitMs));
+      }
+      return;
+    }
+
+    const job = aiQueues[priority].shift();
+    tokenBucket.tokens -= 1;
+    if (extraAttempt) {
+      aiSchedulerStats.extraAttempts++;
+    } else {
+      aiSchedulerStats.active++;
+      aiSchedulerStats.dispatched[priority]++;
+      const waits = aiSchedulerStats.waits[priority];
+      waits.push({ waitMs: performance.now() - job.enqueuedAt });
+      if (waits.length > AI_SCHEDULER_WAIT_SAMPLES) waits.shift();
+    }
+    job.start();
+  }
+};
+
+// Queues a job and resolves with onStart() once it is dispatched, or rejects
+// with an AbortError if `signal` fires while it is still queued.
+const enqueueAiJob = (queue, signal, onStart) => new Promise((resolve, reject) => {
+  if (signal?.aborted) return reject(createAbortError());
+  const onAbort = () => {
+    const index = queue.indexOf(job);
+    if (index < 0) return;
+    queue.splice(index, 1);
+    aiSchedulerStats.cancelled++;
+    reject(createAbortError());
+  };
+  const job = {
+    enqueuedAt: performance.now(),
+    start: () => {
+      signal?.removeEventListener('abort', onAbort);
+      resolve(onStart());
+    }
+  };
+  signal?.addEventListener('abort', onAbort, { once: true });
+  queue.push(job);
+  aiSchedulerStats.maxQueueDepth = Math.max(
+    aiSchedulerStats.maxQueueDepth,
+    aiQueues.interactive.length + aiQueues.background.length
+  );
+  dispatchAiRequests();
+});
+
+// Resolves to a release function once the request may run; call it after the
+// response has been fully read.
+export const acquireAiSlot = ({ priority = 'background', signal } = {}) =>
+  enqueueAiJob(aiQueues[priority] || aiQueues.background, signal, () => {
+    let released = false;
+    return () => {
+      if (released) return;
+      released = true;
+      aiSchedulerStats.active--;
+      dispatchAiRequests();
+    };
+  });
+
+// Resolves once a request that holds a slot may send another attempt.
+export const acquireAiToken = ({ signal } = {}) => enqueueAiJob(aiQueues.retry, signal, () => {});
+
+// Identical requests issued while one is in flight share its result. `start`
+// receives the shared request's signal, which aborts only once every caller
+// that joined has aborted; an aborting caller gets null, as the model helpers
+// return on failure. A caller that joins without a signal can never abort, so
+// it holds the request until it finishes. Omit `start` to join a request known
+// to be in flight.
+export const inFlightAiRequests = new Map(); // key -> { promise, controller, callers, held }
+
+export const joinInFlight = (key, signal, start) => {
+  let entry = inFlightAiRequests.get(key);
+  if (entry) {
+    aiSchedulerStats.deduplicated++;
+  } else {
+    const controller = new AbortController();
+    entry = { controller, callers: 0, held: false };
+    entry.promise = start(controller.signal).finally(() => {
+      if (inFlightAiRequests.get(key) === entry) inFlightAiRequests.delete(key);
+    });
+    inFlightAiRequests.set(key, entry);
+  }
+
+  const joined = entry;
+  if (!signal) {
+    joined.held = true;
+    return joined.promise;
+  }
+  const leave = () => {
+    if (--joined.callers > 0 || joined.held) return;
+    if (inFlightAiRequests.get(key) === joined) inFlightAiRequests.delete(key);
+    joined.controller.abort();
+  };
+  joined.callers++;
+  if (signal.aborted) {
+    leave();
+    return Promise.resolve(null);
+  }
+
+  return new Promise((resolve) => {
+    const onAbort = () => {
+      leave();
+      resolve(null);
+    };
+    signal.addEventListener('abort', onAbort, { once: true });
+    joined.promise
+      .then(resolve, () => resolve(null))
+      .finally(() => signal.removeEventListener('abort', onAbort));
+  });
+};
+
+export const getAiSchedulerStats = () => {
+  refillTokenBucket();
+  return {
+    policy: { ...AI_SCHEDULER_POLICY },
+    tokens: Math.floor(tokenBucket.tokens * 100) / 100,
+    active: aiSchedulerStats.active,
+    queued: { retry: aiQueues.retry.length, interactive: aiQueues.interactive.length, background: aiQueues.background.length },
+    maxQueueDepth: aiSchedulerStats.maxQueueDepth,
+    dispatched: { ...aiSchedulerStats.dispatched },
+    cancelled: aiSchedulerStats.cancelled,
+    deduplicated: aiSchedulerStats.deduplicated,
+    extraAttempts: aiSchedulerStats.extraAttempts,
+    inFlight: inFlightAiRequests.size,
+    waitMs: {
+      interactive: summarizeLatencies(aiSchedulerStats.waits.interactive, 'waitMs'),
+      background: summarizeLatencies(aiSchedulerStats.waits.background, 'waitMs')
+    }
+  };
+};
+
+// Adjusts the limits at runtime, e.g. from the console while load testing.
+export const setAiSchedulerPolicy = (changes) => {
+  refillTokenBucket();
+  Object.assign(AI_SCHEDULER_POLICY, changes);
+  tokenBucket.tokens = Math.min(tokenBucket.tokens, AI_SCHEDULER_POLICY.bucketCapacity);
+  dispatchAiRequests();
+  return { ...AI_SCHEDULER_POLICY };
+};
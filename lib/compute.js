@@ -0,0 +1,346 @@
+import { DEFAULT_TRAVEL_MODE } from './travel.js';
+import { scheduleDays } from './schedule.js';
+import { DEFAULT_CURRENCY, summarizeStops } from './expenses.js';
+
+// --- Compute Worker ---
+// Trip-wide derived data is computed off the main thread: every loaded day's
+// schedule, which days cannot meet their constraints, and expense totals. A
+// compute engine keeps its own copy of the trip. Patch messages built from
+// the store's change events keep that copy current, and the engine answers
+// with results only for the days that changed. Their schedules come back as
+// Int32Array columns whose buffers are transferred rather than copied. The
+// conflict index places stops from these schedules, so loaded days are
+// scheduled here and nowhere else. Every patch carries a version. The engine
+// computes in short slices and applies newer patches between them, so a day
+// edited again mid-run is redone before anything is posted and superseded
+// results never reach the page. The open day's schedule stays on the main
+// thread (useIncrementalSchedule), since its cards must update in the same
+// frame as the edit.
+//
+// The worker's entry module is computeWorker.js, which loads only this
+// module and its inputs, none of the UI. Where a module worker cannot start,
+// the engine runs in-process behind the same messages.
+
+const COMPUTE_WORKER_NAME = 'trip-compute';
+export const COMPUTE_SLICE_MS = 8;
+const SCHEDULE_COLUMNS = ['starts', 'ends', 'travel', 'slack', 'overrun'];
+// What the page shows before the first result arrives.
+const EMPTY_COMPUTE_RESULT = { version: 0, infeasibleDayIds: [], currency: null, expenseTotal: 0, unparsed: 0 };
+
+// `post(message, transfer)` receives results.
+export const createComputeEngine = (post) => {
+  let travelMode = DEFAULT_TRAVEL_MODE;
+  let currency = DEFAULT_CURRENCY;
+  let dayIds = [];
+  const dayStops = new Map();   // dayId -> stops, for loaded days
+  const daySummaries = new Map(); // dayId -> { infeasible, expenseTotal, unparsed } as last posted
+  const dirty = new Set();
+  const computed = new Map();   // dayId -> result not yet posted
+  const removed = new Set();    // dayIds dropped since the last result
+  const stats = { patches: 0, daysComputed: 0, superseded: 0, results: 0 };
+  let replaced = false;         // reset since the last result
+  let version = 0;
+  let running = false;
+
+  const markDirty = (dayId) => {
+    if (computed.delete(dayId)) stats.superseded++;
+    dirty.add(dayId);
+  };
+
+  const apply = (message) => {
+    version = message.version;
+    stats.patches++;
+    if (message.type === 'reset') {
+      dayStops.clear();
+      daySummaries.clear();
+      computed.clear();
+      dirty.clear();
+      removed.clear();
+      replaced = true;
+    }
+    if (message.meta && (message.meta.travelMode !== travelMode || message.meta.currency !== currency)) {
+      ({ travelMode, currency } = message.meta);
+      dayStops.forEach((_, dayId) => markDirty(dayId));
+    }
+    if (message.dayIds) {
+      dayIds = message.dayIds;
+      const kept = new Set(dayIds);
+      [...dayStops.keys()].filter(dayId => !kept.has(dayId)).forEach(dayId => {
+        dayStops.delete(dayId);
+        daySummaries.delete(dayId);
+        computed.delete(dayId);
+        dirty.delete(dayId);
+        removed.add(dayId);
+      });
+    }
+    Object.entries(message.days || {}).forEach(([dayId, stops]) => {
+      dayStops.set(dayId, stops);
+      removed.delete(dayId);
+      markDirty(dayId);
+    });
+    // Arrays are replaced, not edited, since in-process they are the store's.
+    (message.stops || []).forEach(({ dayId, stop }) => {
+      const stops = dayStops.get(dayId);
+      const index = stops ? stops.findIndex(s => s.id === stop.id) : -1;
+      if (index < 0) return;
+      const next = stops.slice();
+      next[index] = stop;
+      dayStops.set(dayId, next);
+      markDirty(dayId);
+    });
+  };
+
+  const computeDay = (dayId) => {
+    const stops = dayStops.get(dayId);
+    const { starts, travel, slack, overrun, infeasible } = scheduleDays([{ stops }], travelMode);
+    const expenses = summarizeStops(stops, currency);
+    stats.daysComputed++;
+    return {
+      stopIds: stops.map(stop => stop.id),
+      starts,
+      ends: starts.map((start, i) => start + stops[i].duration),
+      travel,
+      slack,
+      overrun,
+      summary: { infeasible: infeasible[0] === 1, expenseTotal: expenses.total, unparsed: expenses.unparsed }
+    };
+  };
+
+  // Changed days as one set of columns; day d owns slots
+  // dayOffsets[d] .. dayOffsets[d + 1] - 1, as in scheduleDays.
+  const packSchedules = (changed) => {
+    const results = [...changed.values()];
+    const dayOffsets = new Int32Array(results.length + 1);
+    results.forEach((result, d) => {
+      dayOffsets[d + 1] = dayOffsets[d] + result.stopIds.length;
+    });
+    const packed = { dayIds: [...changed.keys()], stopIds: results.map(result => result.stopIds), dayOffsets };
+    SCHEDULE_COLUMNS.forEach(name => {
+      packed[name] = new Int32Array(dayOffsets[results.length]);
+      results.forEach((result, d) => packed[name].set(result[name], dayOffsets[d]));
+    });
+    return packed;
+  };
+
+  const publish = () => {
+    computed.forEach(({ summary }, dayId) => daySummaries.set(dayId, summary));
+    const schedules = packSchedules(computed);
+    computed.clear();
+    let expenseTotal = 0;
+    let unparsed = 0;
+    const infeasibleDayIds = [];
+    dayIds.forEach(dayId => {
+      const summary = daySummaries.get(dayId);
+      if (!summary) return;
+      if (summary.infeasible) infeasibleDayIds.push(dayId);
+      expenseTotal += summary.expenseTotal;
+      unparsed += summary.unparsed;
+    });
+    stats.results++;
+    post(
+      {
+        type: 'result',
+        version,
+        reset: replaced,
+        removedDayIds: [...removed],
+        schedules,
+        infeasibleDayIds,
+        currency,
+        expenseTotal,
+        unparsed,
+        stats: { ...stats }
+      },
+      [schedules.dayOffsets.buffer, ...SCHEDULE_COLUMNS.map(name => schedules[name].buffer)]
+    );
+    replaced = false;
+    removed.clear();
+  };
+
+  const runSlice = () => {
+    const deadline = performance.now() + COMPUTE_SLICE_MS;
+    while (dirty.size && performance.now() < deadline) {
+      const [dayId] = dirty;
+      dirty.delete(dayId);
+      if (dayStops.has(dayId)) computed.set(dayId, computeDay(dayId));
+    }
+    if (dirty.size) {
+      setTimeout(runSlice, 0);
+      return;
+    }
+    running = false;
+    publish();
+  };
+
+  return {
+    receive(message) {
+      apply(message);
+      if (running) return;
+      running = true;
+      setTimeout(runSlice, 0);
+    }
+  };
+};
+
+const sameIds = (a, b) => a.length === b.length && a.every((id, i) => id === b[i]);
+
+// Feeds a store's changes to a compute engine, in a worker when one can be
+// started, and holds its latest results. Like the conflict index, the client
+// attaches to the store when its first listener subscribes and stops the
+// engine when the last one leaves, so creating it has no side effects.
+// Changes made in the same task go out as one patch. The engine starts when
+// `startWhen(start)` calls back, right away by default; it may return a
+// function that cancels the start.
+export const createComputeClient = (store, { useWorker = true, startWhen = (start) => start() } = {}) => {
+  const listeners = new Set();
+  const schedules = new Map(); // dayId -> { stopIds, starts, ends, travel, slack, overrun }
+  const stats = { patches: 0, results: 0, bytesTransferred: 0, fallback: null, engine: null };
+  let snapshot = EMPTY_COMPUTE_RESULT;
+  let sentVersion = 0;
+  let queued = null;
+  let worker = null;
+  let engine = null;
+  let detach = null;
+
+  const receive = (message) => {
+    if (message.type !== 'result' || message.version < snapshot.version) return;
+    const packed = message.schedules;
+    if (message.reset) schedules.clear();
+    message.removedDayIds.forEach(dayId => schedules.delete(dayId));
+    packed.dayIds.forEach((dayId, d) => {
+      const from = packed.dayOffsets[d];
+      const to = packed.dayOffsets[d + 1];
+      const schedule = { stopIds: packed.stopIds[d] };
+      SCHEDULE_COLUMNS.forEach(name => {
+        schedule[name] = packed[name].subarray(from, to);
+      });
+      schedules.set(dayId, schedule);
+    });
+    stats.results++;
+    stats.engine = message.stats;
+    stats.bytesTransferred += SCHEDULE_COLUMNS.reduce((sum, name) => sum + packed[name].byteLength, packed.dayOffsets.byteLength);
+    snapshot = {
+      version: message.version,
+      infeasibleDayIds: sameIds(snapshot.infeasibleDayIds, message.infeasibleDayIds) ? snapshot.infeasibleDayIds : message.infeasibleDayIds,
+      currency: message.currency,
+      expenseTotal: message.expenseTotal,
+      unparsed: message.unparsed
+    };
+    listeners.forEach(listener => listener());
+  };
+
+  const send = (message) => (worker ? worker.postMessage(message) : engine.receive(message));
+
+  const settings = () => {
+    const meta = store.getMeta();
+    return { travelMode: meta.travelMode || DEFAULT_TRAVEL_MODE, currency: meta.currency || DEFAULT_CURRENCY };
+  };
+
+  const sendReset = () => {
+    const dayIds = store.getDayIds();
+    sendPatch({
+      type: 'reset',
+      meta: settings(),
+      dayIds,
+      days: Object.fromEntries(dayIds.filter(store.isDayLoaded).map(dayId => [dayId, store.getDayStops(dayId)]))
+    });
+  };
+
+  const sendPatch = (patch) => {
+    stats.patches++;
+    send({ ...patch, version: ++sentVersion });
+  };
+
+  const flushChanges = () => {
+    const changes = queued;
+    queued = null;
+    if (!changes || (!worker && !engine)) return;
+    const patch = { type: 'patch', days: {}, stops: [] };
+    changes.forEach(({ kind, id }) => {
+      if (kind === 'trip') {
+        patch.meta = settings();
+        patch.dayIds = store.getDayIds();
+      } else if ((kind === 'day' || kind === 'load') && store.isDayLoaded(id)) {
+        patch.days[id] = store.getDayStops(id);
+      } else if (kind === 'stop') {
+        const stop = store.getStop(id);
+        const dayId = store.getDayOfStop(id);
+        if (stop && dayId) patch.stops.push({ dayId, stop });
+      }
+    });
+    // Stops of a day that is sent whole need no entries of their own.
+    patch.stops = patch.stops.filter(({ dayId }) => !patch.days[dayId]);
+    sendPatch(patch);
+  };
+
+  // Results of an engine that has since been stopped are dropped.
+  const startInProcess = (reason) => {
+    stats.fallback = reason;
+    const own = createComputeEngine(message => engine === own && receive(message));
+    engine = own;
+  };
+
+  const start = () => {
+    if (worker || engine) return;
+    if (useWorker && typeof Worker !== 'undefined') {
+      try {
+        const own = new Worker(new URL('./computeWorker.js', import.meta.url), { type: 'module', name: COMPUTE_WORKER_NAME });
+        worker = own;
+        own.onmessage = (event) => worker === own && receive(event.data);
+        own.onerror = (event) => {
+          event.preventDefault();
+          if (worker !== own) return;
+          console.warn('Compute worker failed; computing in-process:', event.message);
+          own.terminate();
+          worker = null;
+          startInProcess(event.message || 'worker error');
+          sendReset();
+        };
+      } catch (error) {
+        worker = null;
+        startInProcess(error.message);
+      }
+    } else {
+      startInProcess(useWorker ? 'Worker unavailable' : 'disabled');
+    }
+    sendReset();
+  };
+
+  const attach = () => {
+    const unsubscribe = store.onChange(changes => {
+      if (!worker && !engine) return; // the reset sent on start covers them
+      if (!queued) {
+        queued = [];
+        queueMicrotask(flushChanges);
+      }
+      queued.push(...changes);
+    });
+    const cancelStart = startWhen(start);
+    return () => {
+      cancelStart?.();
+      unsubscribe();
+      worker?.terminate();
+      worker = null;
+      engine = null;
+      queued = null;
+    };
+  };
+
+  return {
+    subscribe(listener) {
+      if (!detach) detach = attach();
+      listeners.add(listener);
+      return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0 && detach) {
+          detach();
+          detach = null;
+        }
+      };
+    },
+    getSnapshot: () => snapshot,
+    // The last computed schedule of a loaded day, as typed columns in
+    // minutes from the day's midnight, or null.
+    getDaySchedule: (dayId) => schedules.get(dayId) || null,
+    getStats: () => ({ ...stats, sentVersion, resultVersion: snapshot.version, inWorker: !!worker })
+  };
+};
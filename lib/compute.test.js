@@ -0,0 +1,129 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createComputeEngine, createComputeClient } from './compute.js';
+import { createTripStore } from './tripStore.js';
+import { calculateSchedule } from './schedule.js';
+
+const stop = (id, fields) => ({ id, name: id, duration: 60, ...fields });
+
+const DAY_1 = [stop('a', { startTime: '08:00', expenses: '¥1,500' }), stop('b', { duration: 90 })];
+const DAY_2 = [stop('c'), stop('d', { fixedTime: true, startTime: '09:30', expenses: '¥800' })];
+
+// An engine whose results are awaited one at a time.
+const startEngine = () => {
+  const results = [];
+  let wake = null;
+  const engine = createComputeEngine(message => {
+    results.push(message);
+    wake?.();
+  });
+  const nextResult = async () => {
+    while (!results.length) await new Promise(resolve => { wake = resolve; });
+    return results.shift();
+  };
+  return { engine, results, nextResult };
+};
+
+// Day `dayId` of a packed result, as plain arrays.
+const unpack = (result, dayId) => {
+  const { schedules } = result;
+  const d = schedules.dayIds.indexOf(dayId);
+  if (d < 0) return null;
+  const from = schedules.dayOffsets[d];
+  const to = schedules.dayOffsets[d + 1];
+  const column = (name) => [...schedules[name].subarray(from, to)];
+  return { stopIds: schedules.stopIds[d], starts: column('starts'), ends: column('ends'), overrun: column('overrun') };
+};
+
+const expected = (stops) => {
+  const scheduled = calculateSchedule(stops);
+  return {
+    stopIds: stops.map(s => s.id),
+    starts: scheduled.map(s => s.startMinutes),
+    ends: scheduled.map(s => s.endMinutes),
+    overrun: scheduled.map(s => s.overrunMinutes)
+  };
+};
+
+test('engine schedules every loaded day and totals expenses', async () => {
+  const { engine, nextResult } = startEngine();
+  engine.receive({ type: 'reset', version: 1, meta: { travelMode: 'transit', currency: 'JPY' }, dayIds: ['d1', 'd2', 'd3'], days: { d1: DAY_1, d2: DAY_2 } });
+  const result = await nextResult();
+  assert.equal(result.version, 1);
+  assert.equal(result.reset, true);
+  assert.deepEqual(result.schedules.dayIds.slice().sort(), ['d1', 'd2']);
+  assert.deepEqual(unpack(result, 'd1'), expected(DAY_1));
+  assert.deepEqual(unpack(result, 'd2'), expected(DAY_2));
+  assert.deepEqual(result.infeasibleDayIds, ['d2']);
+  assert.equal(result.expenseTotal, 2300);
+});
+
+test('engine answers a patch with only the days it changed', async () => {
+  const { engine, nextResult } = startEngine();
+  engine.receive({ type: 'reset', version: 1, meta: { travelMode: 'transit', currency: 'JPY' }, dayIds: ['d1', 'd2'], days: { d1: DAY_1, d2: DAY_2 } });
+  await nextResult();
+
+  const later = { ...DAY_2[1], startTime: '11:00' };
+  engine.receive({ type: 'patch', version: 2, stops: [{ dayId: 'd2', stop: later }] });
+  const patched = await nextResult();
+  assert.equal(patched.reset, false);
+  assert.deepEqual(patched.schedules.dayIds, ['d2']);
+  assert.deepEqual(unpack(patched, 'd2'), expected([DAY_2[0], later]));
+  assert.deepEqual(patched.infeasibleDayIds, []);
+  assert.equal(patched.expenseTotal, 2300);
+
+  engine.receive({ type: 'patch', version: 3, dayIds: ['d2'] });
+  const removed = await nextResult();
+  assert.deepEqual(removed.removedDayIds, ['d1']);
+  assert.equal(removed.expenseTotal, 800);
+});
+
+test('engine folds patches that arrive before it runs into one result', async () => {
+  const { engine, results, nextResult } = startEngine();
+  engine.receive({ type: 'reset', version: 1, meta: { travelMode: 'transit', currency: 'JPY' }, dayIds: ['d1'], days: { d1: DAY_1 } });
+  const edited = [DAY_1[0], { ...DAY_1[1], duration: 30 }];
+  engine.receive({ type: 'patch', version: 2, days: { d1: edited } });
+  engine.receive({ type: 'patch', version: 3, meta: { travelMode: 'walk', currency: 'USD' } });
+  const result = await nextResult();
+  assert.equal(result.version, 3);
+  assert.equal(result.currency, 'USD');
+  assert.deepEqual(unpack(result, 'd1').ends, [540, 600]);
+  await new Promise(resolve => setTimeout(resolve, 20));
+  assert.equal(results.length, 0);
+});
+
+test('client keeps schedules of loaded days current in-process', async () => {
+  const store = createTripStore({
+    id: 't1', title: 'Trip', startDate: '2024-04-10', travelMode: 'transit', currency: 'JPY',
+    days: [{ id: 'd1', date: '2024-04-10', stops: DAY_1 }, { id: 'd2', date: '2024-04-11', stops: null }]
+  });
+  const client = createComputeClient(store, { useWorker: false });
+  let wake = null;
+  const unsubscribe = client.subscribe(() => wake?.());
+  const nextUpdate = () => new Promise(resolve => { wake = resolve; });
+
+  await nextUpdate();
+  assert.equal(client.getStats().fallback, 'disabled');
+  assert.deepEqual({ stopIds: client.getDaySchedule('d1').stopIds, starts: [...client.getDaySchedule('d1').starts] },
+    { stopIds: ['a', 'b'], starts: expected(DAY_1).starts });
+  assert.equal(client.getDaySchedule('d2'), null);
+  assert.equal(client.getSnapshot().expenseTotal, 1500);
+
+  store.hydrateDayStops('d2', DAY_2);
+  await nextUpdate();
+  assert.deepEqual([...client.getDaySchedule('d2').ends], expected(DAY_2).ends);
+  assert.deepEqual(client.getSnapshot().infeasibleDayIds, ['d2']);
+
+  store.updateStop('d', current => ({ ...current, startTime: '11:00' }));
+  store.updateStop('a', current => ({ ...current, expenses: '¥2,000' }));
+  await nextUpdate();
+  assert.deepEqual(client.getSnapshot().infeasibleDayIds, []);
+  assert.equal(client.getSnapshot().expenseTotal, 2800);
+  assert.equal(client.getStats().resultVersion, client.getStats().sentVersion);
+
+  unsubscribe();
+  const version = client.getSnapshot().version;
+  store.updateStop('b', current => ({ ...current, duration: 5 }));
+  await new Promise(resolve => setTimeout(resolve, 20));
+  assert.equal(client.getSnapshot().version, version);
+});
@@ -0,0 +1,7 @@
+// Entry module of the compute worker: answers engine messages (see
+// compute.js). It imports none of the UI.
+
+import { createComputeEngine } from './compute.js';
+
+const engine = createComputeEngine((message, transfer) => self.postMessage(message, transfer));
+self.onmessage = (event) => engine.receive(event.data);
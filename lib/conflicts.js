@@ -0,0 +1,234 @@
+import { MINUTES_PER_DAY } from './schedule.js';
+
+// --- Conflict Index ---
+// An interval tree over the scheduled time of every loaded stop, in minutes
+// from midnight of the trip's start date, so a late evening on one day can
+// collide with the next morning. The tree is a treap ordered by start and
+// augmented with the largest end in each subtree, which answers overlap and
+// point queries in O(log n + k) and inserts or removes in O(log n).
+
+export const createIntervalTree = () => {
+  let root = null;
+  const nodes = new Map(); // id -> node
+
+  const maxEnd = (node) => (node ? node.maxEnd : -Infinity);
+  const update = (node) => {
+    node.maxEnd = Math.max(node.end, maxEnd(node.left), maxEnd(node.right));
+    return node;
+  };
+  const before = (node, start, id) => node.start < start || (node.start === start && node.id < id);
+
+  // Nodes ordered before (start, id) go left, the rest right.
+  const split = (node, start, id) => {
+    if (!node) return [null, null];
+    if (before(node, start, id)) {
+      const [left, right] = split(node.right, start, id);
+      node.right = left;
+      return [update(node), right];
+    }
+    const [left, right] = split(node.left, start, id);
+    node.left = right;
+    return [left, update(node)];
+  };
+
+  const merge = (a, b) => {
+    if (!a) return b;
+    if (!b) return a;
+    if (a.priority > b.priority) {
+      a.right = merge(a.right, b);
+      return update(a);
+    }
+    b.left = merge(a, b.left);
+    return update(b);
+  };
+
+  const removeNode = (node, target) => {
+    if (node === target) return merge(node.left, node.right);
+    if (before(target, node.start, node.id)) node.left = removeNode(node.left, target);
+    else node.right = removeNode(node.right, target);
+    return update(node);
+  };
+
+  const collect = (node, start, end, out) => {
+    if (!node || node.maxEnd <= start) return;
+    collect(node.left, start, end, out);
+    if (node.start >= end) return;
+    if (node.end > start) out.push(node.id);
+    collect(node.right, start, end, out);
+  };
+
+  const tree = {
+    insert(id, start, end) {
+      tree.remove(id);
+      const node = { id, start, end, maxEnd: end, priority: Math.random(), left: null, right: null };
+      nodes.set(id, node);
+      const [left, right] = split(root, start, id);
+      root = merge(merge(left, node), right);
+    },
+    remove(id) {
+      const node = nodes.get(id);
+      if (!node) return;
+      nodes.delete(id);
+      root = removeNode(root, node);
+    },
+    // Ids of intervals overlapping [start, end).
+    overlapping(start, end) {
+      const out = [];
+      collect(root, start, end, out);
+      return out;
+    },
+    at: (minute) => tree.overlapping(minute, minute + 1),
+    size: () => nodes.size
+  };
+  return tree;
+};
+
+// Minutes from the trip's start date to midnight of a day, falling back to
+// the day's position when either date is unusable.
+const dayBaseMinutes = (store, dayId) => {
+  const day = store.getDay(dayId);
+  if (!day) return undefined;
+  const offset = Math.round((Date.parse(day.date) - Date.parse(store.getMeta().startDate)) / 86400000);
+  return (Number.isFinite(offset) ? offset : store.getDayIds().indexOf(dayId)) * MINUTES_PER_DAY;
+};
+
+const sameConflict = (a, b) =>
+  a.dayId === b.dayId && a.pastMidnight === b.pastMidnight && a.overlaps.length === b.overlaps.length
+  && a.overlaps.every((other, i) => other.id === b.overlaps[i].id && other.name === b.overlaps[i].name);
+
+// Keeps per-stop conflicts ({ dayId, overlaps: [{ id, name }], pastMidnight })
+// for a trip store. Day schedules come from `schedules`, a compute client
+// (see compute.js), so the index schedules nothing itself: each result
+// re-places only the days whose schedule or date changed. Conflict entries
+// keep their identity while unchanged, so memoized cards can compare them by
+// reference. Subscribing attaches to the client; the index catches up with a
+// full sync if it was detached.
+export const createConflictIndex = (store, schedules) => {
+  const tree = createIntervalTree();
+  const intervals = new Map(); // stopId -> { dayId, base, start, end }
+  const partners = new Map();  // stopId -> Set of overlapping stopIds
+  const conflicts = new Map(); // stopId -> conflict
+  const dayConflictCounts = new Map(); // dayId -> stops with a conflict
+  const synced = new Map();    // dayId -> { schedule, base }
+  const listeners = new Set();
+  let conflictDayIds = [];
+  let version = 0;
+  let detach = null;
+
+  const removeInterval = (stopId, touched) => {
+    tree.remove(stopId);
+    intervals.delete(stopId);
+    (partners.get(stopId) || []).forEach(other => {
+      partners.get(other)?.delete(stopId);
+      touched.add(other);
+    });
+    partners.delete(stopId);
+    touched.add(stopId);
+  };
+
+  const placeInterval = (stopId, dayId, base, start, end, touched) => {
+    touched.add(stopId);
+    const current = intervals.get(stopId);
+    if (current && current.dayId === dayId && current.base === base && current.start === start && current.end === end) return;
+    if (current) removeInterval(stopId, touched);
+    intervals.set(stopId, { dayId, base, start, end });
+    tree.insert(stopId, start, end);
+    const overlapping = tree.overlapping(start, end).filter(other => other !== stopId);
+    partners.set(stopId, new Set(overlapping));
+    overlapping.forEach(other => {
+      partners.get(other).add(stopId);
+      touched.add(other);
+    });
+  };
+
+  const syncDay = (dayId, touched) => {
+    const base = dayBaseMinutes(store, dayId);
+    const schedule = base === undefined ? null : schedules.getDaySchedule(dayId);
+    const last = synced.get(dayId);
+    if (last && last.schedule === schedule && last.base === base) return;
+
+    // Stops that left the day, unless another day already claimed them.
+    (last ? last.schedule.stopIds : []).forEach(stopId => {
+      if (store.getDayOfStop(stopId) !== dayId && intervals.get(stopId)?.dayId === dayId) {
+        removeInterval(stopId, touched);
+      }
+    });
+    if (!schedule) {
+      synced.delete(dayId);
+      return;
+    }
+    synced.set(dayId, { schedule, base });
+    const { stopIds, starts, ends } = schedule;
+    stopIds.forEach((stopId, i) => placeInterval(stopId, dayId, base, base + starts[i], base + ends[i], touched));
+  };
+
+  const countConflict = (dayId, delta) => {
+    const before = dayConflictCounts.get(dayId) || 0;
+    dayConflictCounts.set(dayId, before + delta);
+    return (before === 0) !== (before + delta === 0);
+  };
+
+  const refreshConflicts = (touched) => {
+    let daysChanged = false;
+    let changed = false;
+    touched.forEach(stopId => {
+      const previous = conflicts.get(stopId);
+      const interval = intervals.get(stopId);
+      let next = null;
+      if (interval) {
+        const overlaps = [...partners.get(stopId)].map(id => ({ id, name: store.getStop(id)?.name || '' }));
+        const pastMidnight = interval.end > interval.base + MINUTES_PER_DAY;
+        if (overlaps.length || pastMidnight) next = { dayId: interval.dayId, overlaps, pastMidnight };
+      }
+      if (previous && next && sameConflict(previous, next)) return;
+      if (!previous && !next) return;
+      changed = true;
+      if (previous) daysChanged = countConflict(previous.dayId, -1) || daysChanged;
+      if (next) {
+        daysChanged = countConflict(next.dayId, 1) || daysChanged;
+        conflicts.set(stopId, next);
+      } else {
+        conflicts.delete(stopId);
+      }
+    });
+    if (daysChanged) conflictDayIds = store.getDayIds().filter(dayId => dayConflictCounts.get(dayId) > 0);
+    return changed || daysChanged;
+  };
+
+  const syncDays = (dayIds) => {
+    const touched = new Set();
+    dayIds.forEach(dayId => syncDay(dayId, touched));
+    if (!refreshConflicts(touched)) return;
+    version++;
+    listeners.forEach(listener => listener());
+  };
+
+  // Every day the index knows or the store has, so removed days are dropped.
+  // Unchanged days cost a lookup: their schedule keeps its identity.
+  const syncAll = () => syncDays(new Set([...synced.keys(), ...store.getDayIds()]));
+
+  const index = {
+    subscribe(listener) {
+      if (!detach) {
+        detach = schedules.subscribe(syncAll);
+        syncAll();
+      }
+      listeners.add(listener);
+      return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0 && detach) {
+          detach();
+          detach = null;
+        }
+      };
+    },
+    getVersion: () => version,
+    getStopConflict: (stopId) => conflicts.get(stopId) || null,
+    getConflictDayIds: () => conflictDayIds,
+    // Stops scheduled during a trip-relative minute, or overlapping a range.
+    stopsAt: (minute) => tree.at(minute),
+    stopsBetween: (start, end) => tree.overlapping(start, end),
+    size: () => tree.size()
+  };
+  return index;
+};
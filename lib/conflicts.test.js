@@ -0,0 +1,111 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createIntervalTree, createConflictIndex } from './conflicts.js';
+import { createTripStore } from './tripStore.js';
+
+// Small deterministic PRNG (mulberry32), as in the benchmarks.
+const seededRandom = (seed) => () => {
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+const sorted = (ids) => [...ids].sort();
+
+test('interval tree answers overlap queries like a linear scan', () => {
+  const random = seededRandom(7);
+  const tree = createIntervalTree();
+  const live = new Map(); // id -> [start, end)
+  const scan = (start, end) => [...live].filter(([, [s, e]]) => s < end && e > start).map(([id]) => id);
+
+  for (let step = 0; step < 3000; step++) {
+    const id = `s${Math.floor(random() * 200)}`;
+    if (random() < 0.25) {
+      tree.remove(id);
+      live.delete(id);
+    } else {
+      // Insert or move; equal starts are common, as with fixed appointments.
+      const start = Math.floor(random() * 100) * 15;
+      const end = start + 1 + Math.floor(random() * 240);
+      tree.insert(id, start, end);
+      live.set(id, [start, end]);
+    }
+    if (step % 10 === 0) {
+      const start = Math.floor(random() * 1600);
+      const end = start + Math.floor(random() * 120) + 1;
+      assert.deepEqual(sorted(tree.overlapping(start, end)), sorted(scan(start, end)));
+      assert.deepEqual(sorted(tree.at(start)), sorted(scan(start, start + 1)));
+    }
+  }
+  assert.equal(tree.size(), live.size);
+});
+
+test('interval tree treats intervals as half-open', () => {
+  const tree = createIntervalTree();
+  tree.insert('a', 600, 660);
+  tree.insert('b', 660, 720);
+  assert.deepEqual(tree.at(659), ['a']);
+  assert.deepEqual(tree.at(660), ['b']);
+  assert.deepEqual(tree.overlapping(540, 600), []);
+  assert.deepEqual(sorted(tree.overlapping(650, 670)), ['a', 'b']);
+});
+
+// Stands in for the compute client: fixed schedules, pushed on demand.
+const createSchedules = (byDay) => {
+  const listeners = new Set();
+  return {
+    subscribe(listener) {
+      listeners.add(listener);
+      return () => listeners.delete(listener);
+    },
+    getDaySchedule: (dayId) => byDay.get(dayId) || null,
+    set(dayId, schedule) {
+      byDay.set(dayId, schedule);
+      listeners.forEach(listener => listener());
+    }
+  };
+};
+
+const stop = (id) => ({ id, name: id.toUpperCase(), duration: 60 });
+
+test('conflict index finds overlaps across midnight and follows schedule changes', () => {
+  const store = createTripStore({
+    startDate: '2024-04-10',
+    days: [
+      { id: 'd1', date: '2024-04-10', stops: [stop('a'), stop('b')] },
+      { id: 'd2', date: '2024-04-11', stops: [stop('c')] }
+    ]
+  });
+  const schedules = createSchedules(new Map([
+    // b runs from 23:00 to 01:00, into the first stop of the next day.
+    ['d1', { stopIds: ['a', 'b'], starts: [600, 1380], ends: [700, 1500] }],
+    ['d2', { stopIds: ['c'], starts: [30], ends: [90] }]
+  ]));
+  const index = createConflictIndex(store, schedules);
+  let notified = 0;
+  const unsubscribe = index.subscribe(() => notified++);
+
+  assert.equal(index.getStopConflict('a'), null);
+  assert.deepEqual(index.getStopConflict('b'), { dayId: 'd1', overlaps: [{ id: 'c', name: 'C' }], pastMidnight: true });
+  assert.deepEqual(index.getStopConflict('c'), { dayId: 'd2', overlaps: [{ id: 'b', name: 'B' }], pastMidnight: false });
+  assert.deepEqual(index.getConflictDayIds(), ['d1', 'd2']);
+  assert.deepEqual(sorted(index.stopsBetween(1440, 1441)), ['b']);
+
+  // A recomputed but equal schedule keeps the entries, and listeners quiet.
+  const conflict = index.getStopConflict('b');
+  schedules.set('d2', { stopIds: ['c'], starts: [30], ends: [90] });
+  assert.equal(index.getStopConflict('b'), conflict);
+  assert.equal(notified, 0);
+
+  schedules.set('d2', { stopIds: ['c'], starts: [120], ends: [180] });
+  assert.equal(notified, 1);
+  assert.deepEqual(index.getStopConflict('b'), { dayId: 'd1', overlaps: [], pastMidnight: true });
+  assert.equal(index.getStopConflict('c'), null);
+  assert.deepEqual(index.getConflictDayIds(), ['d1']);
+
+  schedules.set('d1', { stopIds: ['a', 'b'], starts: [600, 1300], ends: [700, 1400] });
+  assert.equal(index.getStopConflict('b'), null);
+  assert.deepEqual(index.getConflictDayIds(), []);
+  unsubscribe();
+});
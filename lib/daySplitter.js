@@ -0,0 +1,336 @@
+import {
+  DEFAULT_TRAVEL_MINUTES, DEFAULT_TRAVEL_MODE, EARTH_RADIUS_KM, DEG_TO_RAD, TRAVEL_PROFILES,
+  hasLocation, travelMinutesForKm
+} from './travel.js';
+import { DEFAULT_DAY_START } from './schedule.js';
+import { optimizeDayOrder } from './route.js';
+
+// --- Day Splitter ---
+// Spreads a long list of places over days. Stops are grouped by location
+// with capacity-constrained k-means: each day's load (visit durations plus an
+// allowance for travel between nearby places) may not exceed an equal share
+// of the total by more than DAY_SPLIT_TOLERANCE. Centres start from
+// farthest-point seeding, so the result is deterministic. Each round assigns
+// the stops with the most to lose first (largest gap between their nearest
+// and second-nearest centre) to the nearest centre with room left. Days are
+// then chained nearest-first and each is routed with optimizeDayOrder. Stops
+// without coordinates go to the lightest days last.
+
+const DEFAULT_DAY_BUDGET_MINUTES = 8 * 60;
+const DAY_SPLIT_TOLERANCE = 0.1;
+const DAY_SPLIT_MAX_ROUNDS = 30;
+const DAY_SPLIT_PATIENCE = 3;
+const DAY_SPLIT_CANDIDATES = 8;
+const DAY_SPLIT_TRAVEL_SAMPLE = 200;
+const DAY_SPLIT_ROUTE_LIMIT = 60;
+
+// Local plane in km around the stops' mean latitude; fine at city and
+// region scale.
+const projectStops = (stops) => {
+  const n = stops.length;
+  const x = new Float64Array(n);
+  const y = new Float64Array(n);
+  const meanLat = stops.reduce((sum, stop) => sum + stop.location.lat, 0) / n;
+  const kmPerDegLat = EARTH_RADIUS_KM * DEG_TO_RAD;
+  const kmPerDegLng = kmPerDegLat * Math.cos(meanLat * DEG_TO_RAD);
+  stops.forEach((stop, i) => {
+    x[i] = stop.location.lng * kmPerDegLng;
+    y[i] = stop.location.lat * kmPerDegLat;
+  });
+  return { x, y };
+};
+
+// Typical minutes to the nearest other stop, from a sample of stops; this is
+// the travel a stop adds to whichever day it lands on.
+const typicalTravelMinutes = ({ x, y }, profile) => {
+  const n = x.length;
+  if (n < 2) return 0;
+  const step = Math.max(1, Math.floor(n / DAY_SPLIT_TRAVEL_SAMPLE));
+  const nearestKm = [];
+  for (let i = 0; i < n; i += step) {
+    let best = Infinity;
+    for (let j = 0; j < n; j++) {
+      if (j === i) continue;
+      const d2 = (x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2;
+      if (d2 < best) best = d2;
+    }
+    nearestKm.push(Math.sqrt(best));
+  }
+  nearestKm.sort((a, b) => a - b);
+  return travelMinutesForKm(nearestKm[nearestKm.length >> 1], profile);
+};
+
+// Picks k well-spread starting centres: the stop farthest from the mean, then
+// repeatedly the stop farthest from every centre chosen so far.
+const seedCentres = ({ x, y }, k) => {
+  const n = x.length;
+  const cx = new Float64Array(k);
+  const cy = new Float64Array(k);
+  const gap = new Float64Array(n).fill(Infinity);
+  let meanX = 0;
+  let meanY = 0;
+  for (let i = 0; i < n; i++) {
+    meanX += x[i] / n;
+    meanY += y[i] / n;
+  }
+  let next = 0;
+  for (let i = 1; i < n; i++) {
+    if ((x[i] - meanX) ** 2 + (y[i] - meanY) ** 2 > (x[next] - meanX) ** 2 + (y[next] - meanY) ** 2) next = i;
+  }
+  for (let c = 0; c < k; c++) {
+    cx[c] = x[next];
+    cy[c] = y[next];
+    let farthest = 0;
+    for (let i = 0; i < n; i++) {
+      gap[i] = Math.min(gap[i], (x[i] - cx[c]) ** 2 + (y[i] - cy[c]) ** 2);
+      if (gap[i] > gap[farthest]) farthest = i;
+    }
+    next = farthest;
+  }
+  return { cx, cy };
+};
+
+const lightest = (loads) => {
+  let index = 0;
+  for (let c = 1; c < loads.length; c++) if (loads[c] < loads[index]) index = c;
+  return index;
+};
+
+// Cluster index per point, every cluster's load within `capacity`. Returns
+// the assignment as an Int32Array and the number of rounds run.
+export const capacitatedKMeans = (points, loads, k, capacity) => {
+  const { x, y } = points;
+  const n = x.length;
+  const { cx, cy } = seedCentres(points, k);
+  const m = Math.min(k, DAY_SPLIT_CANDIDATES);
+  const candidates = new Int32Array(n * m); // nearest centres per stop, nearest first
+  const candidateDist = new Float64Array(m);
+  const regret = new Float64Array(n);
+  const order = new Int32Array(n);
+  const clusterLoad = new Float64Array(k);
+  const counts = new Int32Array(k);
+  const assignment = new Int32Array(n).fill(-1);
+  let best = assignment.slice();
+  let bestOverflow = Infinity;
+  let bestCost = Infinity;
+  let stale = 0;
+
+  let round = 0;
+  while (round < DAY_SPLIT_MAX_ROUNDS) {
+    round++;
+    for (let i = 0; i < n; i++) {
+      candidateDist.fill(Infinity);
+      for (let c = 0; c < k; c++) {
+        const dx = x[i] - cx[c];
+        const dy = y[i] - cy[c];
+        const d = dx * dx + dy * dy;
+        if (d >= candidateDist[m - 1]) continue;
+        let j = m - 1;
+        for (; j > 0 && candidateDist[j - 1] > d; j--) {
+          candidateDist[j] = candidateDist[j - 1];
+          candidates[i * m + j] = candidates[i * m + j - 1];
+        }
+        candidateDist[j] = d;
+        candidates[i * m + j] = c;
+      }
+      regret[i] = m > 1 ? candidateDist[1] - candidateDist[0] : 0;
+      order[i] = i;
+    }
+    order.sort((a, b) => regret[b] - regret[a]);
+
+    clusterLoad.fill(0);
+    let moved = 0;
+    for (const i of order) {
+      // Nearest centre with room, looking further than the candidates only
+      // when they are all full; with no room anywhere (a stop longer than the
+      // share), the least loaded centre.
+      let target = -1;
+      for (let j = 0; j < m && target < 0; j++) {
+        const c = candidates[i * m + j];
+        if (clusterLoad[c] + loads[i] <= capacity) target = c;
+      }
+      if (target < 0) {
+        let nearest = Infinity;
+        for (let c = 0; c < k; c++) {
+          const d = (x[i] - cx[c]) ** 2 + (y[i] - cy[c]) ** 2;
+          if (clusterLoad[c] + loads[i] <= capacity && d < nearest) {
+            nearest = d;
+            target = c;
+          }
+        }
+      }
+      if (target < 0) target = lightest(clusterLoad);
+      clusterLoad[target] += loads[i];
+      if (assignment[i] !== target) {
+        assignment[i] = target;
+        moved++;
+      }
+    }
+
+    cx.fill(0);
+    cy.fill(0);
+    counts.fill(0);
+    for (let i = 0; i < n; i++) {
+      cx[assignment[i]] += x[i];
+      cy[assignment[i]] += y[i];
+      counts[assignment[i]]++;
+    }
+    for (let c = 0; c < k; c++) {
+      if (!counts[c]) continue;
+      cx[c] /= counts[c];
+      cy[c] /= counts[c];
+    }
+
+    // Capacity limits can keep stops swapping between neighbouring days
+    // indefinitely, so keep the best split seen (least load over capacity,
+    // then tightest) and stop once rounds stop improving on it.
+    let overflow = 0;
+    for (let c = 0; c < k; c++) overflow += Math.max(0, clusterLoad[c] - capacity);
+    let cost = 0;
+    for (let i = 0; i < n; i++) cost += (x[i] - cx[assignment[i]]) ** 2 + (y[i] - cy[assignment[i]]) ** 2;
+    if (overflow < bestOverflow || (overflow === bestOverflow && cost < bestCost)) {
+      bestOverflow = overflow;
+      bestCost = cost;
+      best = assignment.slice();
+      stale = 0;
+    } else if (++stale === DAY_SPLIT_PATIENCE) {
+      break;
+    }
+    if (moved === 0) break;
+  }
+  return { assignment: best, rounds: round };
+};
+
+// Tops up days left below `floor` with the nearest stops that neighbouring
+// days can spare without dropping below it themselves.
+const fillLightClusters = (points, loads, assignment, k, floor, capacity) => {
+  const { x, y } = points;
+  const n = x.length;
+  const clusterLoad = new Float64Array(k);
+  const sx = new Float64Array(k);
+  const sy = new Float64Array(k);
+  const counts = new Int32Array(k);
+  for (let i = 0; i < n; i++) {
+    clusterLoad[assignment[i]] += loads[i];
+    sx[assignment[i]] += x[i];
+    sy[assignment[i]] += y[i];
+    counts[assignment[i]]++;
+  }
+  let moves = 0;
+  for (let c = 0; c < k; c++) {
+    while (clusterLoad[c] < floor && counts[c] > 0) {
+      const cx = sx[c] / counts[c];
+      const cy = sy[c] / counts[c];
+      let pick = -1;
+      let nearest = Infinity;
+      for (let i = 0; i < n; i++) {
+        const from = assignment[i];
+        if (from === c || clusterLoad[from] - loads[i] < floor || clusterLoad[c] + loads[i] > capacity) continue;
+        const d = (x[i] - cx) ** 2 + (y[i] - cy) ** 2;
+        if (d < nearest) {
+          nearest = d;
+          pick = i;
+        }
+      }
+      if (pick < 0) break;
+      const from = assignment[pick];
+      clusterLoad[from] -= loads[pick];
+      sx[from] -= x[pick];
+      sy[from] -= y[pick];
+      counts[from]--;
+      assignment[pick] = c;
+      clusterLoad[c] += loads[pick];
+      sx[c] += x[pick];
+      sy[c] += y[pick];
+      counts[c]++;
+      moves++;
+    }
+  }
+  return moves;
+};
+
+// Visits clusters nearest-first, starting from the one holding the first
+// located stop, so consecutive days are next to each other.
+const chainClusters = (groups, points) => {
+  const centre = (group) => {
+    let sx = 0;
+    let sy = 0;
+    group.forEach(i => {
+      sx += points.x[i];
+      sy += points.y[i];
+    });
+    return [sx / group.length, sy / group.length];
+  };
+  const remaining = groups.filter(group => group.length).map(group => ({ group, at: centre(group) }));
+  const chained = [];
+  let current = remaining.findIndex(({ group }) => group.includes(0));
+  while (remaining.length) {
+    const [next] = remaining.splice(current, 1);
+    chained.push(next.group);
+    current = 0;
+    remaining.forEach(({ at }, r) => {
+      const d = (at[0] - next.at[0]) ** 2 + (at[1] - next.at[1]) ** 2;
+      const best = (remaining[current].at[0] - next.at[0]) ** 2 + (remaining[current].at[1] - next.at[1]) ** 2;
+      if (d < best) current = r;
+    });
+  }
+  return chained;
+};
+
+// Splits `stops` into day groups. `days` fixes the number of days; otherwise
+// it is the fewest days that fit `budgetMinutes` each. Returns { days, loads,
+// travelAllowance, rounds }, where `days` holds each day's stops, routed when
+// there are few enough, and `loads` its estimated minutes. Every day starts at
+// DEFAULT_DAY_START unless its first stop has a fixed time.
+export const splitStopsIntoDays = (stops, {
+  days = null,
+  budgetMinutes = DEFAULT_DAY_BUDGET_MINUTES,
+  travelMode = DEFAULT_TRAVEL_MODE
+} = {}) => {
+  const profile = TRAVEL_PROFILES[travelMode] || TRAVEL_PROFILES[DEFAULT_TRAVEL_MODE];
+  const located = stops.filter(hasLocation);
+  const unlocated = stops.filter(stop => !hasLocation(stop));
+  const points = located.length ? projectStops(located) : { x: new Float64Array(0), y: new Float64Array(0) };
+  const travelAllowance = typicalTravelMinutes(points, profile);
+  const loadOf = (stop, allowance) => (stop.duration || 0) + allowance;
+
+  const total = stops.reduce((sum, stop) => sum + loadOf(stop, hasLocation(stop) ? travelAllowance : DEFAULT_TRAVEL_MINUTES), 0);
+  const k = Math.max(1, Math.min(stops.length, days || Math.ceil(total / budgetMinutes)));
+
+  let groups = [];
+  let rounds = 0;
+  if (located.length) {
+    const loads = new Float64Array(located.map(stop => loadOf(stop, travelAllowance)));
+    const clusters = Math.min(k, located.length);
+    const capacity = (total / k) * (1 + DAY_SPLIT_TOLERANCE);
+    const result = capacitatedKMeans(points, loads, clusters, capacity);
+    fillLightClusters(points, loads, result.assignment, clusters, (total / k) * (1 - DAY_SPLIT_TOLERANCE), capacity);
+    rounds = result.rounds;
+    const byCluster = Array.from({ length: clusters }, () => []);
+    result.assignment.forEach((c, i) => byCluster[c].push(i));
+    groups = chainClusters(byCluster, points).map(group => group.map(i => located[i]));
+  }
+  while (groups.length < k) groups.push([]);
+
+  const loads = groups.map(group => group.reduce((sum, stop) => sum + loadOf(stop, travelAllowance), 0));
+  unlocated.forEach(stop => {
+    const lightest = loads.indexOf(Math.min(...loads));
+    groups[lightest].push(stop);
+    loads[lightest] += loadOf(stop, DEFAULT_TRAVEL_MINUTES);
+  });
+
+  const routeDay = (group) => {
+    const routed = group.length > 2 && group.length <= DAY_SPLIT_ROUTE_LIMIT
+      ? optimizeDayOrder(group, travelMode).stops
+      : group;
+    if (!routed.length || routed[0].fixedTime || routed[0].startTime === DEFAULT_DAY_START) return routed;
+    return [{ ...routed[0], startTime: DEFAULT_DAY_START }, ...routed.slice(1)];
+  };
+
+  return {
+    days: groups.map(routeDay),
+    loads,
+    travelAllowance,
+    rounds
+  };
+};
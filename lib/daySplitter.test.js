@@ -0,0 +1,103 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { capacitatedKMeans, splitStopsIntoDays } from './daySplitter.js';
+import { DEFAULT_DAY_START } from './schedule.js';
+
+// Small deterministic PRNG (mulberry32), as in the benchmarks.
+const seededRandom = (seed) => () => {
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+// `count` stops scattered within about 1 km of a centre.
+const cluster = (prefix, lat, lng, count, random, duration = 60) => Array.from({ length: count }, (_, i) => ({
+  id: `${prefix}${i}`,
+  name: `${prefix} ${i}`,
+  duration,
+  location: { lat: lat + (random() - 0.5) * 0.02, lng: lng + (random() - 0.5) * 0.02 }
+}));
+
+const clusterLoads = (assignment, loads, k) => {
+  const totals = new Float64Array(k);
+  assignment.forEach((c, i) => { totals[c] += loads[i]; });
+  return [...totals];
+};
+
+test('capacitated k-means keeps every cluster within capacity', () => {
+  const random = seededRandom(3);
+  [[200, 5], [97, 7], [40, 12]].forEach(([n, k]) => {
+    const x = Float64Array.from({ length: n }, () => random() * 50);
+    const y = Float64Array.from({ length: n }, () => random() * 50);
+    const loads = Float64Array.from({ length: n }, () => 30 + Math.floor(random() * 90));
+    const total = loads.reduce((sum, load) => sum + load, 0);
+    const capacity = (total / k) * 1.1;
+    const { assignment, rounds } = capacitatedKMeans({ x, y }, loads, k, capacity);
+    assert.equal(assignment.length, n);
+    assert.ok(assignment.every(c => c >= 0 && c < k));
+    assert.ok(rounds >= 1);
+    clusterLoads(assignment, loads, k).forEach(load => assert.ok(load <= capacity, `${load} > ${capacity}`));
+  });
+});
+
+test('capacitated k-means follows the geography when capacity allows', () => {
+  const random = seededRandom(5);
+  const x = new Float64Array(30);
+  const y = new Float64Array(30);
+  for (let i = 0; i < 30; i++) {
+    x[i] = (i % 3) * 100 + random();
+    y[i] = random();
+  }
+  const { assignment } = capacitatedKMeans({ x, y }, new Float64Array(30).fill(1), 3, 11);
+  for (let i = 3; i < 30; i++) assert.equal(assignment[i], assignment[i % 3]);
+  assert.equal(new Set(assignment).size, 3);
+});
+
+test('splits separate areas into separate days', () => {
+  const random = seededRandom(9);
+  const stops = [
+    ...cluster('tokyo', 35.68, 139.76, 6, random),
+    ...cluster('kyoto', 35.01, 135.77, 6, random),
+    ...cluster('osaka', 34.69, 135.50, 6, random)
+  ];
+  const { days } = splitStopsIntoDays(stops, { days: 3 });
+  assert.equal(days.length, 3);
+  const areas = days.map(day => new Set(day.map(stop => stop.id.replace(/\d+$/, ''))));
+  areas.forEach(area => assert.equal(area.size, 1));
+  assert.deepEqual(new Set(areas.map(area => [...area][0])), new Set(['tokyo', 'kyoto', 'osaka']));
+});
+
+test('balances an oversized area across days and keeps every stop once', () => {
+  const random = seededRandom(13);
+  const stops = [...cluster('big', 35.68, 139.76, 30, random), ...cluster('small', 35.01, 135.77, 10, random)];
+  const { days, loads } = splitStopsIntoDays(stops, { days: 4 });
+  assert.deepEqual(days.flat().map(stop => stop.id).sort(), stops.map(stop => stop.id).sort());
+  const share = loads.reduce((sum, load) => sum + load, 0) / loads.length;
+  loads.forEach(load => assert.ok(Math.abs(load - share) <= share * 0.1 + 1e-9, `${load} vs ${share}`));
+});
+
+test('picks the number of days from the budget and is deterministic', () => {
+  const random = seededRandom(17);
+  const stops = cluster('walk', 35.68, 139.76, 20, random, 90);
+  const split = splitStopsIntoDays(stops, { budgetMinutes: 8 * 60, travelMode: 'walk' });
+  const perStop = 90 + split.travelAllowance;
+  assert.equal(split.days.length, Math.ceil((20 * perStop) / (8 * 60)));
+  assert.deepEqual(
+    splitStopsIntoDays(stops, { budgetMinutes: 8 * 60, travelMode: 'walk' }).days.map(day => day.map(stop => stop.id)),
+    split.days.map(day => day.map(stop => stop.id))
+  );
+});
+
+test('puts stops without coordinates on the lightest days and starts each day on time', () => {
+  const random = seededRandom(21);
+  const stops = [
+    ...cluster('a', 35.68, 139.76, 5, random),
+    ...cluster('b', 35.01, 135.77, 3, random),
+    { id: 'nowhere', name: 'Somewhere', duration: 60, location: { lat: 0, lng: 0 } }
+  ];
+  const { days } = splitStopsIntoDays(stops, { days: 2 });
+  const lighter = days.findIndex(day => day.some(stop => stop.id.startsWith('b')));
+  assert.ok(days[lighter].some(stop => stop.id === 'nowhere'));
+  days.forEach(day => assert.equal(day[0].startTime, DEFAULT_DAY_START));
+});
@@ -0,0 +1,164 @@
+import { createLruCache } from './cache.js';
+
+// --- Expenses ---
+// Free-text costs ("¥2,000", "$25", "Free") are parsed once per distinct
+// value into { currency, minor } (integer minor units; currency null when the
+// text names none, in which case it counts in the display currency). Totals
+// convert through an offline USD rate table.
+
+export const FX_RATES_AS_OF = '2024-04-01';
+export const DEFAULT_CURRENCY = 'JPY';
+
+const CURRENCIES = {
+  JPY: { symbol: '¥', words: ['yen'], exponent: 0, usdRate: 0.0066 },
+  USD: { symbol: '$', words: ['dollar', 'dollars'], exponent: 2, usdRate: 1 },
+  EUR: { symbol: '€', words: ['euro', 'euros'], exponent: 2, usdRate: 1.08 },
+  GBP: { symbol: '£', words: ['pound', 'pounds'], exponent: 2, usdRate: 1.27 },
+  KRW: { symbol: '₩', words: ['won'], exponent: 0, usdRate: 0.00074 },
+  THB: { symbol: '฿', words: ['baht'], exponent: 2, usdRate: 0.027 },
+  INR: { symbol: '₹', words: ['rupee', 'rupees'], exponent: 2, usdRate: 0.012 }
+};
+const CURRENCY_CODES = Object.keys(CURRENCIES);
+export const EXPENSE_CATEGORIES = ['transport', 'hotel', 'food', 'sight', 'coffee', 'default'];
+const UNKNOWN_CURRENCY_EXPONENT = 2;
+
+const exponentOf = (code) => (code ? CURRENCIES[code].exponent : UNKNOWN_CURRENCY_EXPONENT);
+
+const detectCurrency = (text) => {
+  const lower = text.toLowerCase();
+  for (const code of CURRENCY_CODES) {
+    const { symbol, words } = CURRENCIES[code];
+    if (text.includes(symbol)) return code;
+    if ([code.toLowerCase(), ...words].some(word => new RegExp(`\\b${word}\\b`).test(lower))) return code;
+  }
+  return null;
+};
+
+// Returns { currency, minor }, or null when no amount can be read. Ranges
+// ("$20-30") count their lower bound.
+export const parseExpense = (text) => {
+  const value = text.trim();
+  if (!value) return null;
+  if (/^(free|none)\b/i.test(value)) return { currency: null, minor: 0 };
+  const match = value.match(/\d[\d,]*(?:\.\d+)?/);
+  if (!match) return null;
+  const currency = detectCurrency(value);
+  const amount = Number(match[0].replace(/,/g, ''));
+  return { currency, minor: Math.round(amount * 10 ** exponentOf(currency)) };
+};
+
+const expenseParseCache = createLruCache(5000);
+
+const getStopExpense = (stop) => {
+  if (!stop.expenses) return null;
+  let parsed = expenseParseCache.get(stop.expenses);
+  if (parsed === undefined) {
+    parsed = parseExpense(stop.expenses);
+    expenseParseCache.set(stop.expenses, parsed);
+  }
+  return parsed;
+};
+
+export const convertMinor = (minor, from, to) => {
+  const major = minor / 10 ** exponentOf(from);
+  const rate = from ? CURRENCIES[from].usdRate / CURRENCIES[to].usdRate : 1;
+  return Math.round(major * rate * 10 ** CURRENCIES[to].exponent);
+};
+
+const moneyFormatters = new Map();
+
+export const formatMoney = (minor, currency) => {
+  let formatter = moneyFormatters.get(currency);
+  if (!formatter) {
+    formatter = new Intl.NumberFormat(undefined, { style: 'currency', currency });
+    moneyFormatters.set(currency, formatter);
+  }
+  return formatter.format(minor / 10 ** CURRENCIES[currency].exponent);
+};
+
+// Per-day summaries are memoized on the day's stop array, which the trip
+// store keeps stable until one of that day's stops changes.
+const daySummaryCache = new WeakMap();
+
+export const summarizeStops = (stops, currency) => {
+  let byCurrency = daySummaryCache.get(stops);
+  if (!byCurrency) {
+    byCurrency = new Map();
+    daySummaryCache.set(stops, byCurrency);
+  }
+  let summary = byCurrency.get(currency);
+  if (!summary) {
+    summary = { total: 0, byCategory: {}, unparsed: 0 };
+    stops.forEach(stop => {
+      const parsed = getStopExpense(stop);
+      if (!parsed) {
+        if (stop.expenses) summary.unparsed++;
+        return;
+      }
+      const amount = convertMinor(parsed.minor, parsed.currency, currency);
+      const category = EXPENSE_CATEGORIES.includes(stop.category) ? stop.category : 'default';
+      summary.total += amount;
+      summary.byCategory[category] = (summary.byCategory[category] || 0) + amount;
+    });
+    byCurrency.set(currency, summary);
+  }
+  return summary;
+};
+
+export const summarizeTripExpenses = (store, currency) => {
+  const summary = { total: 0, byDay: {}, byCategory: {}, unparsed: 0 };
+  store.getDayIds().forEach(dayId => {
+    const day = summarizeStops(store.getDayStops(dayId), currency);
+    summary.total += day.total;
+    summary.unparsed += day.unparsed;
+    summary.byDay[dayId] = day.total;
+    Object.entries(day.byCategory).forEach(([category, amount]) => {
+      summary.byCategory[category] = (summary.byCategory[category] || 0) + amount;
+    });
+  });
+  return summary;
+};
+
+// Flattens many trips into typed columns (one row per priced stop) so totals
+// can be recomputed for any currency without touching the strings again.
+export const packTripExpenses = (trips) => {
+  const rows = [];
+  trips.forEach((trip, tripIndex) => trip.days.forEach(day => day.stops.forEach(stop => {
+    const parsed = getStopExpense(stop);
+    if (parsed) rows.push([tripIndex, parsed, EXPENSE_CATEGORIES.indexOf(stop.category)]);
+  })));
+
+  const amounts = new Float64Array(rows.length);
+  const currencies = new Uint8Array(rows.length);
+  const categories = new Uint8Array(rows.length);
+  const tripIndexes = new Uint32Array(rows.length);
+  rows.forEach(([tripIndex, parsed, category], i) => {
+    amounts[i] = parsed.minor / 10 ** exponentOf(parsed.currency);
+    currencies[i] = parsed.currency ? CURRENCY_CODES.indexOf(parsed.currency) : CURRENCY_CODES.length;
+    categories[i] = category < 0 ? EXPENSE_CATEGORIES.indexOf('default') : category;
+    tripIndexes[i] = tripIndex;
+  });
+  return { tripCount: trips.length, amounts, currencies, categories, tripIndexes };
+};
+
+// One pass over packed columns. Returns per-trip totals and a row-major
+// trips x EXPENSE_CATEGORIES matrix, both in minor units of `currency`.
+export const aggregatePackedExpenses = (packed, currency) => {
+  const scale = 10 ** CURRENCIES[currency].exponent;
+  const rates = new Float64Array(CURRENCY_CODES.length + 1);
+  CURRENCY_CODES.forEach((code, i) => {
+    rates[i] = CURRENCIES[code].usdRate / CURRENCIES[currency].usdRate * scale;
+  });
+  rates[CURRENCY_CODES.length] = scale;
+
+  const categoryCount = EXPENSE_CATEGORIES.length;
+  const totals = new Float64Array(packed.tripCount);
+  const byCategory = new Float64Array(packed.tripCount * categoryCount);
+  const { amounts, currencies, categories, tripIndexes } = packed;
+  for (let i = 0; i < amounts.length; i++) {
+    const value = amounts[i] * rates[currencies[i]];
+    totals[tripIndexes[i]] += value;
+    byCategory[tripIndexes[i] * categoryCount + categories[i]] += value;
+  }
+  return { totals: totals.map(Math.round), byCategory: byCategory.map(Math.round), categories: EXPENSE_CATEGORIES };
+};
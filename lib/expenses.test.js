@@ -0,0 +1,76 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import {
+  parseExpense, convertMinor, summarizeStops, summarizeTripExpenses, packTripExpenses, aggregatePackedExpenses
+} from './expenses.js';
+import { createTripStore } from './tripStore.js';
+
+test('parseExpense reads amounts in integer minor units', () => {
+  const cases = [
+    ['¥2,000', { currency: 'JPY', minor: 2000 }],
+    ['1,200 JPY', { currency: 'JPY', minor: 1200 }],
+    ['2000 yen', { currency: 'JPY', minor: 2000 }],
+    ['$25', { currency: 'USD', minor: 2500 }],
+    ['USD 12.5', { currency: 'USD', minor: 1250 }],
+    ['€14.50', { currency: 'EUR', minor: 1450 }],
+    ['about 5 euros', { currency: 'EUR', minor: 500 }],
+    ['£8', { currency: 'GBP', minor: 800 }],
+    ['₩15,000', { currency: 'KRW', minor: 15000 }],
+    ['50 baht', { currency: 'THB', minor: 5000 }],
+    ['$20-30', { currency: 'USD', minor: 2000 }],
+    ['12.34', { currency: null, minor: 1234 }],
+    ['Free', { currency: null, minor: 0 }],
+    ['none needed', { currency: null, minor: 0 }]
+  ];
+  cases.forEach(([text, expected]) => assert.deepEqual(parseExpense(text), expected, text));
+});
+
+test('parseExpense returns null when there is no amount', () => {
+  ['', '   ', 'n/a', 'tbd', 'cheap'].forEach(text => assert.equal(parseExpense(text), null, text));
+});
+
+test('convertMinor converts through the USD rate table', () => {
+  assert.equal(convertMinor(2500, 'USD', 'USD'), 2500);
+  assert.equal(convertMinor(1000, 'JPY', 'USD'), 660);
+  assert.equal(convertMinor(100, 'USD', 'JPY'), 152);
+  assert.equal(convertMinor(1000, 'EUR', 'GBP'), 850);
+  // No currency named: the amount is taken as the display currency's.
+  assert.equal(convertMinor(1250, null, 'USD'), 1250);
+  assert.equal(convertMinor(1200, null, 'JPY'), 12);
+});
+
+const DAY = [
+  { id: 'a', category: 'food', expenses: '¥1,200' },
+  { id: 'b', category: 'food', expenses: '$10' },
+  { id: 'c', category: 'sight', expenses: 'Free' },
+  { id: 'd', category: 'hotel', expenses: 'ask at desk' },
+  { id: 'e', category: 'unknown', expenses: '¥500' },
+  { id: 'f', category: 'sight' }
+];
+
+test('summarizeStops totals a day by category and counts unreadable costs', () => {
+  const summary = summarizeStops(DAY, 'JPY');
+  assert.deepEqual(summary, { total: 1200 + 1515 + 500, byCategory: { food: 2715, sight: 0, default: 500 }, unparsed: 1 });
+  assert.equal(summarizeStops(DAY, 'JPY'), summary, 'memoized per stop array and currency');
+  assert.equal(summarizeStops(DAY, 'USD').total, 792 + 1000 + 330);
+});
+
+test('trip totals and packed aggregation agree', () => {
+  const trips = [
+    { days: [{ id: 'd1', stops: DAY }, { id: 'd2', stops: [{ id: 'g', category: 'transport', expenses: '€14.50' }] }] },
+    { days: [{ id: 'd3', stops: [{ id: 'h', category: 'coffee', expenses: '£8' }] }] }
+  ];
+  ['JPY', 'USD', 'EUR'].forEach(currency => {
+    const perTrip = trips.map(trip => summarizeTripExpenses(createTripStore(trip), currency));
+    const packed = aggregatePackedExpenses(packTripExpenses(trips), currency);
+    perTrip.forEach((summary, i) => {
+      // The packed pass rounds once per trip rather than once per stop.
+      assert.ok(Math.abs(packed.totals[i] - summary.total) <= 2, `${currency} trip ${i}`);
+    });
+  });
+  const store = createTripStore(trips[0]);
+  const summary = summarizeTripExpenses(store, 'JPY');
+  assert.deepEqual(Object.keys(summary.byDay), ['d1', 'd2']);
+  assert.equal(summary.total, summary.byDay.d1 + summary.byDay.d2);
+  assert.equal(summary.unparsed, 1);
+});
@@ -0,0 +1,528 @@
+import { createLruCache } from './cache.js';
+import { isAbortError, createAbortError, resilientFetch } from './requests.js';
+import { byteLength, startAiCall, aiFailureOutcome } from './aiMetrics.js';
+import {
+  AI_SCHEDULER_POLICY, acquireAiSlot, acquireAiToken, inFlightAiRequests, joinInFlight
+} from './aiScheduler.js';
+
+// --- Gemini API Helpers ---
+
+const GEMINI_MODEL = 'gemini-2.5-flash-preview-09-2025';
+export let geminiApiBase = 'https://generativelanguage.googleapis.com/v1beta';
+
+// Points all model calls at another server, e.g. a local fake endpoint in tests.
+const setGeminiApiBase = (baseUrl) => {
+  geminiApiBase = baseUrl.replace(/\/$/, '');
+};
+
+const geminiUrl = (method, query = '') => {
+  const apiKey = ""; // Runtime injection
+  return `${geminiApiBase}/models/${GEMINI_MODEL}:${method}?${query}key=${apiKey}`;
+};
+
+const postGemini = (url, prompt, schema, options) => {
+  const payload = {
+    contents: [{ parts: [{ text: prompt }] }],
+    generationConfig: {
+      responseMimeType: schema ? "application/json" : "text/plain",
+    }
+  };
+
+  if (schema) {
+    payload.generationConfig.responseSchema = schema;
+  }
+
+  // The slot paid for the first attempt; every retry or hedge takes a token.
+  return resilientFetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload)
+  }, { ...options, beforeAttempt: (signal) => acquireAiToken({ signal }) });
+};
+
+const reportGeminiError = (error) => {
+  // Cancellation is expected (closed modal, removed stop), not a failure.
+  if (!isAbortError(error)) console.error("Gemini API Error:", error);
+};
+
+const requestGeminiContent = async (prompt, schema, options) => {
+  let release = null;
+  let call = null;
+  let done = null;
+  try {
+    release = await acquireAiSlot(options);
+    call = startAiCall(options?.caller, 'generate', prompt);
+    const attempt = await postGemini(geminiUrl('generateContent'), prompt, schema, options);
+    ({ done } = attempt);
+    const { response } = attempt;
+    call.firstByte();
+    if (!response.ok) {
+      call.finish({ outcome: 'error', status: response.status });
+      response.body?.cancel().catch(() => {});
+      throw new Error(`HTTP ${response.status}`);
+    }
+
+    const body = await response.text();
+    const data = JSON.parse(body);
+    call.finish({ status: response.status, responseBytes: byteLength(body), usage: data.usageMetadata });
+    const text = data.candidates?.[0]?.content?.parts?.[0]?.text;
+    
+    if (schema && text) {
+      return JSON.parse(text);
+    }
+    return text;
+  } catch (error) {
+    call?.finish({ outcome: aiFailureOutcome(error) });
+    reportGeminiError(error);
+    return null;
+  } finally {
+    done?.();
+    release?.();
+  }
+};
+
+const STREAM_IDLE_TIMEOUT_MS = 20000;
+
+// Streams a response over server-sent events, calling onText with each text
+// fragment as it arrives. Resolves to the full text, or null on failure. The
+// stream is abandoned if no bytes arrive for STREAM_IDLE_TIMEOUT_MS.
+const requestGeminiStream = async (prompt, schema, onText, options) => {
+  let release = null;
+  let call = null;
+  let done = null;
+  try {
+    release = await acquireAiSlot(options);
+    call = startAiCall(options?.caller, 'stream', prompt);
+    // A healthy stream may outlast the request deadline; readChunk's idle
+    // timeout catches a stalled one.
+    const attempt = await postGemini(geminiUrl('streamGenerateContent', 'alt=sse&'), prompt, schema, { ...options, bodyTimeout: false });
+    ({ done } = attempt);
+    const { response } = attempt;
+    if (!response.ok) {
+      call.finish({ outcome: 'error', status: response.status });
+      response.body?.cancel().catch(() => {});
+      throw new Error(`HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = '';
+    let fullText = '';
+    let responseBytes = 0;
+    let usage = null;
+    const handleLine = (line) => {
+      if (!line.startsWith('data:')) return;
+      const data = JSON.parse(line.slice(5));
+      // Usage arrives with the final chunks and is cumulative.
+      if (data.usageMetadata) usage = data.usageMetadata;
+      const text = data.candidates?.[0]?.content?.parts?.[0]?.text;
+      if (text) {
+        fullText += text;
+        onText(text);
+      }
+    };
+    const readChunk = () => {
+      let timer;
+      const idle = new Promise((_, reject) => {
+        timer = setTimeout(() => reject(new Error('Stream stalled')), STREAM_IDLE_TIMEOUT_MS);
+      });
+      return Promise.race([reader.read(), idle]).finally(() => clearTimeout(timer));
+    };
+
+    try {
+      for (;;) {
+        if (options?.signal?.aborted) throw createAbortError();
+        const { done, value } = await readChunk();
+        if (value) {
+          call.firstByte();
+          responseBytes += value.length;
+        }
+        pending += decoder.decode(value, { stream: !done });
+        const lines = pending.split('\n');
+        pending = done ? '' : lines.pop();
+        lines.forEach(line => handleLine(line.trim()));
+        if (done) break;
+      }
+    } catch (error) {
+      reader.cancel().catch(() => {});
+      throw error;
+    }
+    call.finish({ status: response.status, responseBytes, usage });
+    return fullText;
+  } catch (error) {
+    call?.finish({ outcome: aiFailureOutcome(error) });
+    reportGeminiError(error);
+    return null;
+  } finally {
+    done?.();
+    release?.();
+  }
+};
+
+// --- Response Cache ---
+// Responses are keyed by a SHA-256 of (model, prompt, schema). Lookups hit an
+// in-memory LRU first, then localStorage, whose entries expire after a TTL and
+// are evicted least-recently-used once the tier grows past its byte budget.
+// Sizes and timestamps of the stored entries live in one index entry, so
+// eviction never has to parse the responses themselves. Where Web Crypto is
+// unavailable (non-secure origins) requests simply go uncached.
+
+const RESPONSE_CACHE_PREFIX = 'gemini-cache:';
+const RESPONSE_CACHE_TTL_MS = 7 * 24 * 60 * 60 * 1000;
+const RESPONSE_CACHE_MAX_BYTES = 2 * 1024 * 1024;
+const RESPONSE_CACHE_INDEX_KEY = 'gemini-cache-index';
+
+const responseMemoryCache = createLruCache(200);
+const responseCacheStats = { memoryHits: 0, diskHits: 0, misses: 0, evictions: 0 };
+
+// Null when the request cannot be hashed, i.e. it cannot be cached.
+const hashRequest = async (model, prompt, schema) => {
+  if (typeof crypto === 'undefined' || !crypto.subtle) return null;
+  try {
+    const bytes = new TextEncoder().encode(JSON.stringify([model, prompt, schema]));
+    const digest = await crypto.subtle.digest('SHA-256', bytes);
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+  } catch {
+    return null;
+  }
+};
+
+export const getResponseStorage = () => {
+  try {
+    return typeof localStorage === 'undefined' ? null : localStorage;
+  } catch {
+    return null; // Access can throw when storage is disabled.
+  }
+};
+
+const readDiskEntry = (storage, key) => {
+  try {
+    return JSON.parse(storage.getItem(key));
+  } catch {
+    return null;
+  }
+};
+
+// hash -> { bytes, storedAt, usedAt } for every response in storage. Read
+// once per session; a missing or unreadable index is rebuilt by scanning the
+// stored responses.
+let diskResponseIndex = null;
+
+const loadDiskIndex = (storage) => {
+  if (diskResponseIndex) return diskResponseIndex;
+  diskResponseIndex = readDiskEntry(storage, RESPONSE_CACHE_INDEX_KEY);
+  if (diskResponseIndex && typeof diskResponseIndex === 'object') return diskResponseIndex;
+  diskResponseIndex = {};
+  for (let i = 0; i < storage.length; i++) {
+    const key = storage.key(i);
+    if (!key?.startsWith(RESPONSE_CACHE_PREFIX)) continue;
+    const entry = readDiskEntry(storage, key);
+    if (!entry) continue;
+    diskResponseIndex[key.slice(RESPONSE_CACHE_PREFIX.length)] = {
+      bytes: key.length + storage.getItem(key).length,
+      storedAt: entry.storedAt,
+      usedAt: entry.usedAt ?? entry.storedAt
+    };
+  }
+  return diskResponseIndex;
+};
+
+const saveDiskIndex = (storage) => {
+  try {
+    storage.setItem(RESPONSE_CACHE_INDEX_KEY, JSON.stringify(diskResponseIndex));
+  } catch {
+    // Rebuilt from the entries on the next load if this is lost.
+  }
+};
+
+const removeDiskResponse = (storage, hash) => {
+  storage.removeItem(RESPONSE_CACHE_PREFIX + hash);
+  delete loadDiskIndex(storage)[hash];
+  responseCacheStats.evictions++;
+};
+
+const evictDiskResponses = (storage) => {
+  const index = loadDiskIndex(storage);
+  const now = Date.now();
+  let totalBytes = 0;
+  Object.entries(index).forEach(([hash, meta]) => {
+    if (now - meta.storedAt > RESPONSE_CACHE_TTL_MS) removeDiskResponse(storage, hash);
+    else totalBytes += meta.bytes;
+  });
+
+  const byRecency = Object.entries(index).sort((a, b) => a[1].usedAt - b[1].usedAt);
+  for (const [hash, meta] of byRecency) {
+    if (totalBytes <= RESPONSE_CACHE_MAX_BYTES) break;
+    removeDiskResponse(storage, hash);
+    totalBytes -= meta.bytes;
+  }
+  saveDiskIndex(storage);
+};
+
+// Returns undefined on a miss; cached values are never null.
+const readCachedResponse = (hash) => {
+  const memoryValue = responseMemoryCache.get(hash);
+  if (memoryValue !== undefined) {
+    responseCacheStats.memoryHits++;
+    return memoryValue;
+  }
+
+  const storage = getResponseStorage();
+  const key = RESPONSE_CACHE_PREFIX + hash;
+  const entry = storage && readDiskEntry(storage, key);
+  if (!entry || Date.now() - entry.storedAt > RESPONSE_CACHE_TTL_MS) {
+    if (entry) {
+      removeDiskResponse(storage, hash);
+      saveDiskIndex(storage);
+    }
+    responseCacheStats.misses++;
+    return undefined;
+  }
+
+  responseCacheStats.diskHits++;
+  responseMemoryCache.set(hash, entry.value);
+  const meta = loadDiskIndex(storage)[hash];
+  if (meta) {
+    meta.usedAt = Date.now();
+    saveDiskIndex(storage);
+  }
+  return entry.value;
+};
+
+const writeCachedResponse = (hash, value) => {
+  responseMemoryCache.set(hash, value);
+  const storage = getResponseStorage();
+  if (!storage) return;
+  const now = Date.now();
+  const key = RESPONSE_CACHE_PREFIX + hash;
+  const serialized = JSON.stringify({ value, storedAt: now });
+  try {
+    storage.setItem(key, serialized);
+  } catch {
+    // Quota exceeded: make room and try once more.
+    evictDiskResponses(storage);
+    try {
+      storage.setItem(key, serialized);
+    } catch {
+      return;
+    }
+  }
+  loadDiskIndex(storage)[hash] = { bytes: key.length + serialized.length, storedAt: now, usedAt: now };
+  evictDiskResponses(storage);
+};
+
+export const getResponseCacheStats = () => {
+  const { memoryHits, diskHits, misses } = responseCacheStats;
+  const lookups = memoryHits + diskHits + misses;
+  return {
+    ...responseCacheStats,
+    memoryEntries: responseMemoryCache.size,
+    hitRate: lookups ? (memoryHits + diskHits) / lookups : 0
+  };
+};
+
+export const clearResponseCache = () => {
+  responseMemoryCache.clear();
+  const storage = getResponseStorage();
+  if (!storage) return;
+  for (let i = storage.length - 1; i >= 0; i--) {
+    const key = storage.key(i);
+    if (key?.startsWith(RESPONSE_CACHE_PREFIX)) storage.removeItem(key);
+  }
+  storage.removeItem(RESPONSE_CACHE_INDEX_KEY);
+  diskResponseIndex = {};
+};
+
+// Cached front door for all model calls. Pass `{ cache: false }` to force a
+// fresh response; failures (null) are never cached, and identical cached
+// requests in flight are joined. `caller` tags the call in the AI metrics,
+// `priority` ('interactive' or 'background', the default) picks its scheduler
+// queue, and `signal` and `timeoutMs` are forwarded to resilientFetch.
+export const generateGeminiContent = async (prompt, schema = null, { cache = true, ...options } = {}) => {
+  if (!cache) return requestGeminiContent(prompt, schema, options);
+
+  const hash = await hashRequest(GEMINI_MODEL, prompt, schema);
+  if (hash === null) return requestGeminiContent(prompt, schema, options);
+  const cached = readCachedResponse(hash);
+  if (cached !== undefined) {
+    startAiCall(options.caller, 'generate', prompt).finish({ cached: true });
+    return cached;
+  }
+
+  return joinInFlight(hash, options.signal, async (signal) => {
+    const result = await requestGeminiContent(prompt, schema, { ...options, signal });
+    if (result != null) writeCachedResponse(hash, result);
+    return result;
+  });
+};
+
+// --- Streaming Generation ---
+
+// Incremental parser for a streamed top-level JSON array. Feed it text
+// fragments; it calls onItem with each element object as soon as its closing
+// brace arrives and keeps only the unfinished element buffered.
+export const createJsonArrayParser = (onItem) => {
+  let buffer = '';
+  let depth = 0;
+  let inString = false;
+  let escaped = false;
+  let itemStart = -1;
+
+  return (chunk) => {
+    const offset = buffer.length;
+    buffer += chunk;
+    for (let i = offset; i < buffer.length; i++) {
+      const ch = buffer[i];
+      if (inString) {
+        if (escaped) escaped = false;
+        else if (ch === '\\') escaped = true;
+        else if (ch === '"') inString = false;
+      } else if (ch === '"') {
+        inString = true;
+      } else if (ch === '{' || ch === '[') {
+        if (depth === 1 && ch === '{') itemStart = i;
+        depth++;
+      } else if (ch === '}' || ch === ']') {
+        depth--;
+        if (depth === 1 && ch === '}' && itemStart >= 0) {
+          onItem(JSON.parse(buffer.slice(itemStart, i + 1)));
+          itemStart = -1;
+        }
+      }
+    }
+    if (itemStart < 0) {
+      buffer = '';
+    } else {
+      buffer = buffer.slice(itemStart);
+      itemStart = 0;
+    }
+  };
+};
+
+// Streams a JSON-array response, calling onItem per element. Goes through the
+// response cache like generateGeminiContent; a cache hit replays the items,
+// as does joining an identical stream already in flight once it completes.
+// Resolves to all items, or null if the request failed.
+export const streamGeminiArray = async (prompt, schema, onItem, { cache = true, ...options } = {}) => {
+  // A stream this caller started lives on for callers that joined it after
+  // this one aborts, but its items stop reaching this caller.
+  const collect = async (signal) => {
+    const items = [];
+    const parse = createJsonArrayParser(item => {
+      items.push(item);
+      if (!options.signal?.aborted) onItem(item);
+    });
+    const text = await requestGeminiStream(prompt, schema, parse, { ...options, signal });
+    return text == null ? null : items;
+  };
+  if (!cache) return collect(options.signal);
+
+  const hash = await hashRequest(GEMINI_MODEL, prompt, schema);
+  if (hash === null) return collect(options.signal);
+  const cached = readCachedResponse(hash);
+  if (Array.isArray(cached)) {
+    startAiCall(options.caller, 'stream', prompt).finish({ cached: true });
+    cached.forEach(onItem);
+    return cached;
+  }
+
+  const key = `stream:${hash}`;
+  if (inFlightAiRequests.has(key)) {
+    const items = await joinInFlight(key, options.signal);
+    items?.forEach(onItem);
+    return items;
+  }
+
+  return joinInFlight(key, options.signal, async (signal) => {
+    const items = await collect(signal);
+    if (items) writeCachedResponse(hash, items);
+    return items;
+  });
+};
+
+// --- AI Enrichment ---
+
+const ENRICH_BATCH_SIZE = 25;
+
+export const appendTip = (stop, tip) => {
+  const currentRemarks = stop.remarks || "";
+  const separator = currentRemarks ? "\n" : "";
+  return { ...stop, remarks: `${currentRemarks}${separator}✨ Tip: ${tip}` };
+};
+
+// Fetches tips for many stops with one structured request per chunk of
+// ENRICH_BATCH_SIZE stops. Resolves to { [stopId]: tip }; failed chunks are
+// simply missing from the result.
+export const fetchTipsForStops = async (stops, options) => {
+  const chunks = [];
+  for (let i = 0; i < stops.length; i += ENRICH_BATCH_SIZE) {
+    chunks.push(stops.slice(i, i + ENRICH_BATCH_SIZE));
+  }
+
+  const results = await Promise.all(chunks.map(chunk => {
+    const schema = {
+      type: "OBJECT",
+      properties: Object.fromEntries(chunk.map(stop => [stop.id, { type: "STRING" }])),
+      required: chunk.map(stop => stop.id)
+    };
+    const places = chunk.map(stop => `- ${stop.id}: ${stop.name}`).join('\n');
+    const prompt = `For each place below, give one interesting, insider travel tip, fun fact, or "must-eat" recommendation. Keep each short (max 20 words). Answer with an object mapping every id to its tip.\n${places}`;
+    return generateGeminiContent(prompt, schema, options);
+  }));
+
+  return Object.assign({}, ...results.filter(Boolean));
+};
+
+// --- Trip Planning ---
+
+export const MAX_PLAN_DAYS = 14;
+
+// Days of one plan in flight at once: the policy's planDaysInFlight, but
+// always at least one slot short of maxConcurrent, so a long plan cannot hold
+// every slot and tips and streams still get through.
+export const planDayConcurrency = () => Math.max(1, Math.min(
+  AI_SCHEDULER_POLICY.planDaysInFlight,
+  AI_SCHEDULER_POLICY.maxConcurrent - 1
+));
+
+// Runs worker(item) for every item with at most `limit` in flight, starting
+// the next as soon as any finishes.
+export const runWithConcurrency = async (items, limit, worker) => {
+  const results = new Array(items.length);
+  let next = 0;
+  const lane = async () => {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await worker(items[index], index);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, lane));
+  return results;
+};
+
+// Schema for structured JSON response
+export const ITINERARY_SCHEMA = {
+  type: "ARRAY",
+  items: {
+    type: "OBJECT",
+    properties: {
+      name: { type: "STRING" },
+      category: { type: "STRING", enum: ["sight", "food", "hotel", "transport", "coffee"] },
+      duration: { type: "INTEGER" },
+      remarks: { type: "STRING" },
+      expenses: { type: "STRING", description: "Estimated cost (e.g. $20, ¥1000)" }
+    },
+    required: ["name", "duration", "category"]
+  }
+};
+
+export const buildDayPlanPrompt = (location, vibe, dayNumber, dayCount) =>
+  dayCount === 1
+    ? `Create a realistic travel itinerary for 1 day in ${location} with a "${vibe}" theme. Return exactly 4 items.`
+    : `Create a realistic travel itinerary for day ${dayNumber} of a ${dayCount}-day trip to ${location} with a "${vibe}" theme. Each day of the trip covers a different area or set of highlights, so pick ones that suit day ${dayNumber}. Return exactly 4 items.`;
+
+export const addDaysToDate = (dateStr, offset) => {
+  const dateObj = new Date(dateStr);
+  dateObj.setDate(dateObj.getDate() + offset);
+  return dateObj.toISOString().split('T')[0];
+};
@@ -0,0 +1,43 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createJsonArrayParser } from './gemini.js';
+
+const ITEMS = [
+  { name: 'Senso-ji', remarks: 'Go early: {crowds} [after 10]', duration: 60 },
+  { name: 'Say "kanpai"', tags: ['izakaya', { price: '¥¥' }], nested: { deeper: [[1, 2], { x: '}' }] } },
+  { name: 'Back\\slash \\" and ] and }', duration: 30 },
+  { name: '東京タワー', remarks: 'Tower — night view', duration: 45 }
+];
+const TEXT = JSON.stringify(ITEMS, null, 2);
+
+const parseInChunks = (text, size) => {
+  const items = [];
+  const parse = createJsonArrayParser(item => items.push(item));
+  for (let i = 0; i < text.length; i += size) parse(text.slice(i, i + size));
+  return items;
+};
+
+test('yields every element however the text is split', () => {
+  [1, 2, 3, 7, 64, TEXT.length].forEach(size => {
+    assert.deepEqual(parseInChunks(TEXT, size), ITEMS, `chunks of ${size}`);
+  });
+});
+
+test('emits an element as soon as its closing brace arrives', () => {
+  const items = [];
+  const parse = createJsonArrayParser(item => items.push(item));
+  parse('[{"a": 1}, {"b": "}');
+  assert.deepEqual(items, [{ a: 1 }]);
+  parse('"}');
+  assert.deepEqual(items, [{ a: 1 }, { b: '}' }]);
+  parse(']');
+  assert.equal(items.length, 2);
+});
+
+test('ignores nested arrays and non-object elements at the top level', () => {
+  assert.deepEqual(parseInChunks('[1, "x", [ {"inner": true} ], {"kept": 1}]', 5), [{ kept: 1 }]);
+});
+
+test('yields nothing for an empty array', () => {
+  assert.deepEqual(parseInChunks('[ ]', 1), []);
+});
@@ -0,0 +1,374 @@
+import { createLruCache } from './cache.js';
+import { EARTH_RADIUS_KM, DEG_TO_RAD, hasLocation } from './travel.js';
+import { tokenizeSearchText } from './search.js';
+
+// --- Geocoding ---
+// Offline coordinates for stops. A Google Maps link is read first: a place
+// pin (!3d…!4d…), a map centre (@lat,lng) or coordinates in q/query/ll/
+// destination give the location directly, and a text query stands in for the
+// name. Text resolves against a bundled gazetteer, matching places whose full
+// name or alias appears in it (the most specific name wins, then places over
+// areas over cities). Ties go to the place nearest the other stops of the
+// day, found with a k-d tree that also answers reverse lookups. Results are
+// memoized, so re-resolving a day or a whole trip is cheap.
+//
+// Coverage is what is bundled below, roughly a hundred names in all: about 50
+// landmarks, mostly in Japan, 13 districts of Tokyo, Kyoto and Osaka, and
+// some 40 cities worldwide. A stop elsewhere resolves only from its Maps
+// link, or to the centre of its city when the name mentions one, and
+// otherwise keeps no location until it is set by hand.
+
+const GEOCODE_CACHE_SIZE = 5000;
+const GEOCODE_KIND_RANK = { place: 0, area: 1, city: 2 };
+
+// name|lat|lng|aliases separated by ;
+export const GAZETTEER_PLACES = `
+Narita Airport|35.7720|140.3929|成田空港;NRT
+Haneda Airport|35.5494|139.7798|羽田空港;HND
+Tokyo Station|35.6812|139.7671|東京駅
+Shinjuku Station|35.6896|139.7006|新宿駅
+Shibuya Station|35.6580|139.7016|渋谷駅
+Shibuya Crossing|35.6595|139.7005|Shibuya Scramble;渋谷スクランブル交差点
+Meiji Jingu|35.6764|139.6993|Meiji Shrine;Meiji Jingu Shrine;明治神宮
+Tsukiji Outer Market|35.6655|139.7707|Tsukiji;築地場外市場
+Toyosu Market|35.6456|139.7847|豊洲市場
+TeamLab Planets|35.6491|139.7898|チームラボプラネッツ
+Senso-ji|35.7148|139.7967|Sensoji;Asakusa Temple;浅草寺
+Tokyo Skytree|35.7101|139.8107|東京スカイツリー
+Tokyo Tower|35.6586|139.7454|東京タワー
+Imperial Palace|35.6852|139.7528|皇居
+Ueno Park|35.7156|139.7745|上野公園
+Tokyo National Museum|35.7188|139.7765|東京国立博物館
+Ameyoko|35.7100|139.7744|Ameya-Yokocho;アメ横
+Takeshita Street|35.6715|139.7031|竹下通り
+Shinjuku Gyoen|35.6852|139.7100|新宿御苑
+Omoide Yokocho|35.6929|139.6995|思い出横丁
+Golden Gai|35.6938|139.7049|ゴールデン街
+Roppongi Hills|35.6605|139.7292|六本木ヒルズ
+Tokyo Disneyland|35.6329|139.8804|東京ディズニーランド
+Ghibli Museum|35.6962|139.5704|ジブリ美術館
+Yanaka Ginza|35.7275|139.7660|谷中銀座
+Mount Takao|35.6251|139.2437|Takaosan;高尾山
+Fushimi Inari Taisha|34.9671|135.7727|Fushimi Inari;伏見稲荷大社
+Kinkaku-ji|35.0394|135.7292|Kinkakuji;Golden Pavilion;金閣寺
+Ginkaku-ji|35.0270|135.7982|Ginkakuji;Silver Pavilion;銀閣寺
+Kiyomizu-dera|34.9949|135.7850|Kiyomizudera;清水寺
+Arashiyama Bamboo Grove|35.0170|135.6713|Arashiyama;嵐山
+Nishiki Market|35.0050|135.7649|錦市場
+Kyoto Station|34.9858|135.7588|京都駅
+Dotonbori|34.6687|135.5013|Dōtonbori;道頓堀
+Osaka Castle|34.6873|135.5262|大阪城
+Kuromon Market|34.6654|135.5064|黒門市場
+Universal Studios Japan|34.6654|135.4323|USJ;ユニバーサル・スタジオ・ジャパン
+Todai-ji|34.6890|135.8398|Todaiji;東大寺
+Nara Park|34.6851|135.8430|奈良公園
+Hiroshima Peace Memorial|34.3955|132.4536|Atomic Bomb Dome;原爆ドーム
+Itsukushima Shrine|34.2959|132.3199|Miyajima;厳島神社
+Mount Fuji|35.3606|138.7274|Fujisan;富士山
+Eiffel Tower|48.8584|2.2945|Tour Eiffel
+Louvre|48.8606|2.3376|Musée du Louvre
+Colosseum|41.8902|12.4922|Colosseo
+Sagrada Familia|41.4036|2.1744|Sagrada Família
+Big Ben|51.5007|-0.1246
+Statue of Liberty|40.6892|-74.0445
+Golden Gate Bridge|37.8199|-122.4783
+Sydney Opera House|-33.8568|151.2153
+`;
+
+const GAZETTEER_AREAS = `
+Shinjuku|35.6938|139.7034|新宿
+Shibuya|35.6595|139.7005|渋谷
+Harajuku|35.6702|139.7027|原宿
+Asakusa|35.7119|139.7983|浅草
+Akihabara|35.6984|139.7731|秋葉原
+Ginza|35.6717|139.7650|銀座
+Roppongi|35.6628|139.7314|六本木
+Odaiba|35.6300|139.7760|お台場
+Ueno|35.7138|139.7773|上野
+Ikebukuro|35.7295|139.7109|池袋
+Gion|35.0037|135.7788|祇園
+Namba|34.6659|135.5013|難波
+Umeda|34.7025|135.4959|梅田
+`;
+
+const GAZETTEER_CITIES = `
+Tokyo|35.6812|139.7671|東京
+Kyoto|35.0116|135.7681|京都
+Osaka|34.6937|135.5023|大阪
+Nara|34.6851|135.8048|奈良
+Hiroshima|34.3853|132.4553|広島
+Yokohama|35.4437|139.6380|横浜
+Kamakura|35.3192|139.5467|鎌倉
+Hakone|35.2324|139.1069|箱根
+Nikko|36.7199|139.6982|日光
+Kanazawa|36.5613|136.6562|金沢
+Sapporo|43.0618|141.3545|札幌
+Fukuoka|33.5904|130.4017|福岡
+Seoul|37.5665|126.9780|서울
+Busan|35.1796|129.0756|부산
+Taipei|25.0330|121.5654|台北
+Hong Kong|22.3193|114.1694|香港
+Shanghai|31.2304|121.4737|上海
+Beijing|39.9042|116.4074|北京
+Bangkok|13.7563|100.5018
+Singapore|1.3521|103.8198
+Hanoi|21.0278|105.8342
+Ho Chi Minh City|10.8231|106.6297|Saigon
+Bali|-8.6705|115.2126|Denpasar
+Sydney|-33.8688|151.2093
+Melbourne|-37.8136|144.9631
+Auckland|-36.8485|174.7633
+London|51.5074|-0.1278
+Paris|48.8566|2.3522
+Rome|41.9028|12.4964|Roma
+Barcelona|41.3874|2.1686
+Madrid|40.4168|-3.7038
+Berlin|52.5200|13.4050
+Amsterdam|52.3676|4.9041
+Prague|50.0755|14.4378
+Vienna|48.2082|16.3738
+Istanbul|41.0082|28.9784
+Dubai|25.2048|55.2708
+New York|40.7128|-74.0060|NYC
+San Francisco|37.7749|-122.4194
+Los Angeles|34.0522|-118.2437
+Vancouver|49.2827|-123.1207
+Mexico City|19.4326|-99.1332
+Honolulu|21.3069|-157.8583
+`;
+
+export const parseGazetteer = (table, kind) => table.trim().split('\n').map(line => {
+  const [name, lat, lng, aliases] = line.split('|');
+  return { name, kind, lat: Number(lat), lng: Number(lng), aliases: aliases ? aliases.split(';') : [] };
+});
+
+const isValidCoordinate = (lat, lng) =>
+  Number.isFinite(lat) && Number.isFinite(lng) && Math.abs(lat) <= 90 && Math.abs(lng) <= 180 && (lat !== 0 || lng !== 0);
+
+const COORDINATE_PAIR = /^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$/;
+
+// { lat, lng } or { query } from a Google Maps URL, or null. Short links
+// (goo.gl, maps.app.goo.gl) cannot be expanded offline.
+const parseGoogleLink = (link) => {
+  let url;
+  try {
+    url = new URL(link);
+  } catch {
+    return null;
+  }
+  let decoded = url.pathname + url.hash;
+  try {
+    decoded = decodeURIComponent(decoded);
+  } catch {
+    // Malformed escapes (a bare "%"): read the raw path.
+  }
+  const coordinates = (lat, lng) => (isValidCoordinate(Number(lat), Number(lng)) ? { lat: Number(lat), lng: Number(lng) } : null);
+
+  const pin = decoded.match(/!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)/);
+  const pinned = pin && coordinates(pin[1], pin[2]);
+  if (pinned) return pinned;
+
+  for (const param of ['q', 'query', 'll', 'destination', 'daddr']) {
+    const value = url.searchParams.get(param);
+    if (!value) continue;
+    const pair = value.match(COORDINATE_PAIR);
+    if (pair) {
+      const found = coordinates(pair[1], pair[2]);
+      if (found) return found;
+    } else if (param !== 'll') {
+      return { query: value };
+    }
+  }
+
+  const centre = decoded.match(/@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)/);
+  const centred = centre && coordinates(centre[1], centre[2]);
+  if (centred) return centred;
+
+  const place = decoded.match(/\/place\/([^/]+)/);
+  return place ? { query: place[1].replace(/\+/g, ' ') } : null;
+};
+
+const toUnitVector = (lat, lng) => {
+  const phi = lat * DEG_TO_RAD;
+  const lambda = lng * DEG_TO_RAD;
+  return [Math.cos(phi) * Math.cos(lambda), Math.cos(phi) * Math.sin(lambda), Math.sin(phi)];
+};
+
+// Static k-d tree over points on the globe, stored as unit vectors so the
+// nearest point by chord length is the nearest by great-circle distance, with
+// no special cases at the poles or the antimeridian.
+export const createKdTree = (points) => {
+  const vectors = points.map(point => toUnitVector(point.lat, point.lng));
+  const build = (ids, depth) => {
+    if (ids.length === 0) return null;
+    const axis = depth % 3;
+    ids.sort((a, b) => vectors[a][axis] - vectors[b][axis]);
+    const mid = ids.length >> 1;
+    return { id: ids[mid], axis, left: build(ids.slice(0, mid), depth + 1), right: build(ids.slice(mid + 1), depth + 1) };
+  };
+  const root = build(points.map((_, i) => i), 0);
+
+  // Up to k points that pass `filter`, nearest first, as [{ point, km }].
+  const nearest = (lat, lng, { k = 1, filter = null, maxKm = Infinity } = {}) => {
+    const query = toUnitVector(lat, lng);
+    const maxChord = 2 * Math.sin(Math.min(Math.PI, maxKm / EARTH_RADIUS_KM) / 2);
+    let bound = maxChord * maxChord;
+    const best = []; // { id, d2 }, nearest first
+    const visit = (node) => {
+      if (!node) return;
+      const vector = vectors[node.id];
+      const d2 = (vector[0] - query[0]) ** 2 + (vector[1] - query[1]) ** 2 + (vector[2] - query[2]) ** 2;
+      if (d2 <= bound && (!filter || filter(points[node.id]))) {
+        let i = best.length;
+        while (i > 0 && best[i - 1].d2 > d2) i--;
+        best.splice(i, 0, { id: node.id, d2 });
+        if (best.length > k) best.pop();
+        if (best.length === k) bound = best[k - 1].d2;
+      }
+      const delta = query[node.axis] - vector[node.axis];
+      visit(delta < 0 ? node.left : node.right);
+      if (delta * delta <= bound) visit(delta < 0 ? node.right : node.left);
+    };
+    visit(root);
+    return best.map(({ id, d2 }) => ({
+      point: points[id],
+      km: 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(d2) / 2))
+    }));
+  };
+
+  return { nearest, size: points.length };
+};
+
+export const createGeocoder = (places) => {
+  const tree = createKdTree(places);
+  const names = [];                // name id -> { place, termCount }
+  const namesByTerm = new Map();   // term -> [name id]
+  places.forEach(place => [place.name, ...place.aliases].forEach(name => {
+    const terms = [...new Set(tokenizeSearchText(name))];
+    if (terms.length === 0) return;
+    const id = names.length;
+    names.push({ place, termCount: terms.length });
+    terms.forEach(term => {
+      if (!namesByTerm.has(term)) namesByTerm.set(term, []);
+      namesByTerm.get(term).push(id);
+    });
+  }));
+  const cache = createLruCache(GEOCODE_CACHE_SIZE);
+  const stats = { lookups: 0, cacheHits: 0, fromLink: 0, fromGazetteer: 0, unresolved: 0 };
+
+  // The best place named in full by `text`, or null.
+  const matchText = (text, near) => {
+    const hits = new Map(); // name id -> terms of that name found in the text
+    new Set(tokenizeSearchText(text)).forEach(term =>
+      (namesByTerm.get(term) || []).forEach(id => hits.set(id, (hits.get(id) || 0) + 1)));
+
+    let bestScore = -Infinity;
+    let best = new Set();
+    hits.forEach((count, id) => {
+      const { place, termCount } = names[id];
+      if (count < termCount) return;
+      const score = termCount * 4 - GEOCODE_KIND_RANK[place.kind];
+      if (score > bestScore) {
+        bestScore = score;
+        best = new Set([place]);
+      } else if (score === bestScore) {
+        best.add(place);
+      }
+    });
+    if (best.size <= 1 || !near) return best.values().next().value || null;
+    return tree.nearest(near.lat, near.lng, { filter: place => best.has(place) })[0]?.point || null;
+  };
+
+  // { lat, lng, source, place? } for a stop's googleLink and name, or null.
+  // `near` ({ lat, lng }) breaks ties between equally good places.
+  const resolve = ({ name = '', googleLink = '' }, { near = null } = {}) => {
+    stats.lookups++;
+    const key = `${googleLink}\n${name}\n${near ? `${near.lat.toFixed(1)},${near.lng.toFixed(1)}` : ''}`;
+    const cached = cache.get(key);
+    if (cached !== undefined) {
+      stats.cacheHits++;
+      return cached;
+    }
+
+    const link = googleLink ? parseGoogleLink(googleLink) : null;
+    let result = null;
+    if (link?.lat !== undefined) {
+      result = { lat: link.lat, lng: link.lng, source: 'link' };
+      stats.fromLink++;
+    } else {
+      const place = (link?.query && matchText(link.query, near)) || (name && matchText(name, near));
+      if (place) {
+        result = { lat: place.lat, lng: place.lng, source: 'gazetteer', place: place.name };
+        stats.fromGazetteer++;
+      } else {
+        stats.unresolved++;
+      }
+    }
+    cache.set(key, result);
+    return result;
+  };
+
+  return {
+    resolve,
+    // Gazetteer places within maxKm of a point, nearest first.
+    reverse: (lat, lng, { k = 1, maxKm = 2 } = {}) => tree.nearest(lat, lng, { k, maxKm }),
+    getStats: () => ({ ...stats, cached: cache.size, places: places.length }),
+    clearCache: () => cache.clear()
+  };
+};
+
+// Built on first use, so the gazetteer is not parsed during startup.
+let sharedGeocoder = null;
+export const getGeocoder = () => {
+  if (!sharedGeocoder) {
+    sharedGeocoder = createGeocoder([
+      ...parseGazetteer(GAZETTEER_PLACES, 'place'),
+      ...parseGazetteer(GAZETTEER_AREAS, 'area'),
+      ...parseGazetteer(GAZETTEER_CITIES, 'city')
+    ]);
+  }
+  return sharedGeocoder;
+};
+
+// Mean position of the stops that have coordinates, or null.
+export const stopsCentroid = (stops) => {
+  let lat = 0;
+  let lng = 0;
+  let count = 0;
+  stops.forEach(stop => {
+    if (!hasLocation(stop)) return;
+    lat += stop.location.lat;
+    lng += stop.location.lng;
+    count++;
+  });
+  return count ? { lat: lat / count, lng: lng / count } : null;
+};
+
+const withGeocodedLocation = (stop, near) => {
+  const found = getGeocoder().resolve(stop, { near });
+  return found ? { ...stop, location: { lat: found.lat, lng: found.lng } } : stop;
+};
+
+// Fills in coordinates for every stop without them in one pass, biased
+// towards the ones that have them. Returns `stops` itself if none resolved.
+export const locateStops = (stops, near = stopsCentroid(stops)) => {
+  let changed = false;
+  const located = stops.map(stop => {
+    if (hasLocation(stop)) return stop;
+    const next = withGeocodedLocation(stop, near);
+    if (next !== stop) changed = true;
+    return next;
+  });
+  return changed ? located : stops;
+};
+
+// A saved stop's coordinates: looked up when it has none or its link changed,
+// otherwise kept, since they may have been set by hand. A changed link that
+// no longer resolves leaves the stop without a location rather than at the
+// old link's place.
+export const locateEditedStop = (stop, previous, near) => {
+  const linkChanged = !!previous && previous.googleLink !== stop.googleLink;
+  if (hasLocation(stop) && previous && !linkChanged) return stop;
+  const located = withGeocodedLocation(stop, near);
+  return located === stop && linkChanged ? { ...stop, location: { lat: 0, lng: 0 } } : located;
+};
@@ -0,0 +1,102 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createKdTree, createGeocoder, getGeocoder, locateStops, locateEditedStop } from './geocoding.js';
+import { EARTH_RADIUS_KM, DEG_TO_RAD } from './travel.js';
+
+// Small deterministic PRNG (mulberry32), as in the benchmarks.
+const seededRandom = (seed) => () => {
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+const greatCircleKm = (a, b) => {
+  const dLat = (b.lat - a.lat) * DEG_TO_RAD;
+  const dLng = (b.lng - a.lng) * DEG_TO_RAD;
+  const h = Math.sin(dLat / 2) ** 2 + Math.cos(a.lat * DEG_TO_RAD) * Math.cos(b.lat * DEG_TO_RAD) * Math.sin(dLng / 2) ** 2;
+  return 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(h)));
+};
+
+test('k-d tree finds the same nearest points as a linear scan', () => {
+  const random = seededRandom(11);
+  const randomPoint = () => ({ lat: Math.asin(2 * random() - 1) / (Math.PI / 180), lng: random() * 360 - 180 });
+  // Uniform over the globe, plus clusters at a pole and on the antimeridian.
+  const points = [
+    ...Array.from({ length: 400 }, randomPoint),
+    ...Array.from({ length: 50 }, () => ({ lat: 89 + random(), lng: random() * 360 - 180 })),
+    ...Array.from({ length: 50 }, () => ({ lat: random() * 10 - 5, lng: random() < 0.5 ? 179.9 + random() * 0.1 : -180 + random() * 0.1 }))
+  ].map((point, id) => ({ ...point, id }));
+  const tree = createKdTree(points);
+
+  const queries = [...Array.from({ length: 100 }, randomPoint), { lat: 90, lng: 0 }, { lat: 0, lng: 180 }, { lat: 1, lng: -179.99 }];
+  queries.forEach(query => {
+    const scan = points
+      .map(point => ({ id: point.id, km: greatCircleKm(query, point) }))
+      .sort((a, b) => a.km - b.km);
+    const found = tree.nearest(query.lat, query.lng, { k: 5 });
+    assert.deepEqual(found.map(hit => hit.point.id), scan.slice(0, 5).map(hit => hit.id));
+    found.forEach((hit, i) => assert.ok(Math.abs(hit.km - scan[i].km) < 1e-6));
+
+    const within = tree.nearest(query.lat, query.lng, { k: 1000, maxKm: 1500 });
+    assert.deepEqual(within.map(hit => hit.point.id), scan.filter(hit => hit.km <= 1500).map(hit => hit.id));
+
+    const even = tree.nearest(query.lat, query.lng, { filter: point => point.id % 2 === 0 });
+    assert.equal(even[0].point.id, scan.find(hit => hit.id % 2 === 0).id);
+  });
+});
+
+test('geocoder reads coordinates from Google Maps links', () => {
+  const geocoder = getGeocoder();
+  const resolve = (googleLink) => geocoder.resolve({ googleLink });
+  assert.deepEqual(
+    resolve('https://www.google.com/maps/place/Kinkaku-ji/@35.0394,135.7292,17z/data=!3d35.039370!4d135.729243'),
+    { lat: 35.03937, lng: 135.729243, source: 'link' }
+  );
+  assert.deepEqual(resolve('https://www.google.com/maps/@-33.8568,151.2153,15z'), { lat: -33.8568, lng: 151.2153, source: 'link' });
+  assert.deepEqual(resolve('https://maps.google.com/?q=35.6586,139.7454'), { lat: 35.6586, lng: 139.7454, source: 'link' });
+  assert.equal(resolve('https://maps.google.com/?q=Tokyo+Tower').place, 'Tokyo Tower');
+  assert.equal(resolve('https://www.google.com/maps/place/Osaka+Castle/').place, 'Osaka Castle');
+  assert.equal(resolve('https://maps.app.goo.gl/AbCdEf'), null);
+  assert.equal(resolve('not a link'), null);
+});
+
+test('geocoder prefers the most specific name, then places over cities', () => {
+  const geocoder = getGeocoder();
+  assert.equal(geocoder.resolve({ name: 'Sunset at Tokyo Tower' }).place, 'Tokyo Tower');
+  assert.equal(geocoder.resolve({ name: 'Dinner in Tokyo' }).place, 'Tokyo');
+  assert.equal(geocoder.resolve({ name: 'Shopping in Shibuya' }).place, 'Shibuya');
+  assert.equal(geocoder.resolve({ name: '成田空港 到着' }).place, 'Narita Airport');
+  assert.equal(geocoder.resolve({ name: 'Somewhere unlisted' }), null);
+});
+
+test('geocoder breaks ties by distance to the other stops', () => {
+  const geocoder = createGeocoder([
+    { name: 'Central Station', kind: 'place', lat: 35.68, lng: 139.76, aliases: [] },
+    { name: 'Central Station', kind: 'place', lat: 34.70, lng: 135.49, aliases: [] }
+  ]);
+  assert.equal(geocoder.resolve({ name: 'Central Station' }, { near: { lat: 34.6, lng: 135.5 } }).lat, 34.70);
+  assert.equal(geocoder.resolve({ name: 'Central Station' }, { near: { lat: 35.7, lng: 139.7 } }).lat, 35.68);
+  assert.deepEqual(geocoder.reverse(35.681, 139.761).map(hit => hit.point.lat), [35.68]);
+  assert.deepEqual(geocoder.reverse(35.0, 137.0), []);
+});
+
+test('locateStops fills in missing locations and keeps the array when nothing resolves', () => {
+  const known = { id: 'a', name: 'Hotel', location: { lat: 35.69, lng: 139.70 } };
+  const stops = [known, { id: 'b', name: 'Meiji Jingu', location: { lat: 0, lng: 0 } }];
+  const located = locateStops(stops);
+  assert.equal(located[0], known);
+  assert.ok(Math.abs(located[1].location.lat - 35.676) < 0.01);
+  const unknown = [known, { id: 'c', name: 'Nowhere in particular', location: { lat: 0, lng: 0 } }];
+  assert.equal(locateStops(unknown), unknown);
+});
+
+test('locateEditedStop keeps hand-set locations unless the link changed', () => {
+  const previous = { name: 'Lunch', googleLink: 'https://maps.google.com/?q=35.1,135.1', location: { lat: 35.1, lng: 135.1 } };
+  const moved = { ...previous, location: { lat: 35.2, lng: 135.2 } };
+  assert.equal(locateEditedStop(moved, previous), moved);
+  const relinked = locateEditedStop({ ...moved, googleLink: 'https://maps.google.com/?q=34.9,135.8' }, previous);
+  assert.deepEqual(relinked.location, { lat: 34.9, lng: 135.8 });
+  const broken = locateEditedStop({ ...moved, googleLink: 'https://maps.app.goo.gl/x' }, previous);
+  assert.deepEqual(broken.location, { lat: 0, lng: 0 });
+});
@@ -0,0 +1,185 @@
+import { getResponseStorage } from './gemini.js';
+
+// --- Persistence ---
+// Trips are stored in IndexedDB as rows: one per trip, day and stop, so a
+// single edited stop rewrites a single row. Writes go through a write-behind
+// queue that coalesces repeated edits to the same row and commits everything
+// pending in one transaction after PERSIST_DEBOUNCE_MS of quiet. A batch
+// that fails to commit goes back into the queue, behind any newer write to
+// the same row, and is retried after PERSIST_RETRY_MS. Trips load as a
+// skeleton of days; each day's stops are read when the day is opened.
+
+const TRIP_DB_NAME = 'trip-planner';
+const TRIP_DB_VERSION = 1;
+export const PERSISTED_STORES = ['trips', 'days', 'stops'];
+const PERSIST_DEBOUNCE_MS = 400;
+const PERSIST_RETRY_MS = 5000;
+const LAST_TRIP_KEY = 'trip-last-opened';
+
+export const idbRequest = (request) => new Promise((resolve, reject) => {
+  request.onsuccess = () => resolve(request.result);
+  request.onerror = () => reject(request.error);
+});
+
+export const openTripDatabase = () => {
+  if (typeof indexedDB === 'undefined') return Promise.reject(new Error('IndexedDB is not available'));
+  const request = indexedDB.open(TRIP_DB_NAME, TRIP_DB_VERSION);
+  request.onupgradeneeded = () => {
+    const db = request.result;
+    db.createObjectStore('trips', { keyPath: 'id' });
+    db.createObjectStore('days', { keyPath: 'id' }).createIndex('tripId', 'tripId');
+    db.createObjectStore('stops', { keyPath: 'id' }).createIndex('dayId', 'dayId');
+  };
+  return idbRequest(request);
+};
+
+const createWriteBehindQueue = (db, delayMs = PERSIST_DEBOUNCE_MS) => {
+  const pending = new Map(); // "store:id" -> { storeName, key, value }; value undefined deletes
+  const stats = { queued: 0, written: 0, transactions: 0, failed: 0 };
+  let timer = null;
+  let flushing = Promise.resolve(true);
+
+  const commit = (batch) => new Promise((resolve, reject) => {
+    const tx = db.transaction(PERSISTED_STORES, 'readwrite');
+    batch.forEach(({ storeName, key, value }) => {
+      const objectStore = tx.objectStore(storeName);
+      if (value === undefined) objectStore.delete(key);
+      else objectStore.put(value);
+    });
+    tx.oncomplete = () => {
+      stats.written += batch.length;
+      stats.transactions++;
+      resolve();
+    };
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+
+  const schedule = (ms) => {
+    clearTimeout(timer);
+    timer = setTimeout(flush, ms);
+  };
+
+  // Resolves to true once everything queued so far is stored, or false if a
+  // commit failed; the failed rows stay queued.
+  const flush = () => {
+    clearTimeout(timer);
+    timer = null;
+    if (pending.size > 0) {
+      const batch = [...pending.values()];
+      pending.clear();
+      flushing = flushing
+        .then(() => commit(batch))
+        .then(() => true, error => {
+          console.error('Trip save failed:', error);
+          stats.failed++;
+          batch.forEach(entry => {
+            const id = `${entry.storeName}:${entry.key}`;
+            if (!pending.has(id)) pending.set(id, entry);
+          });
+          if (!timer) schedule(PERSIST_RETRY_MS);
+          return false;
+        });
+    }
+    return flushing;
+  };
+
+  const enqueue = (storeName, key, value) => {
+    pending.set(`${storeName}:${key}`, { storeName, key, value });
+    stats.queued++;
+    schedule(delayMs);
+  };
+
+  return {
+    put: (storeName, value) => enqueue(storeName, value.id, value),
+    delete: (storeName, key) => enqueue(storeName, key, undefined),
+    flush,
+    getStats: () => ({ ...stats, pending: pending.size })
+  };
+};
+
+// The trip to resume on the next load, e.g. one opened from a share link. Kept
+// in localStorage so it is known before the database opens.
+export const getLastOpenedTripId = () => {
+  try {
+    return getResponseStorage()?.getItem(LAST_TRIP_KEY) || null;
+  } catch {
+    return null;
+  }
+};
+
+export const setLastOpenedTripId = (tripId) => {
+  try {
+    getResponseStorage()?.setItem(LAST_TRIP_KEY, tripId);
+  } catch {
+    // Storage disabled: the next load starts from the initial trip.
+  }
+};
+
+// Nested trip with every day's `stops: null`, or null if the trip is unsaved.
+export const loadTripSkeleton = async (db, tripId) => {
+  const tx = db.transaction(['trips', 'days'], 'readonly');
+  const trip = await idbRequest(tx.objectStore('trips').get(tripId));
+  if (!trip) return null;
+  const dayRows = await idbRequest(tx.objectStore('days').index('tripId').getAll(tripId));
+  const daysById = new Map(dayRows.map(day => [day.id, day]));
+  const { dayIds, ...meta } = trip;
+  return {
+    ...meta,
+    days: dayIds.filter(id => daysById.has(id)).map(id => {
+      const { tripId: _tripId, stopIds: _stopIds, ...day } = daysById.get(id);
+      return { ...day, stops: null };
+    })
+  };
+};
+
+const loadDayStops = async (db, dayId) => {
+  const tx = db.transaction(['days', 'stops'], 'readonly');
+  const day = await idbRequest(tx.objectStore('days').get(dayId));
+  const rows = await idbRequest(tx.objectStore('stops').index('dayId').getAll(dayId));
+  const stopsById = new Map(rows.map(({ dayId: _dayId, ...stop }) => [stop.id, stop]));
+  return (day?.stopIds || []).filter(id => stopsById.has(id)).map(id => stopsById.get(id));
+};
+
+// Mirrors store changes into the write-behind queue.
+export const connectTripPersistence = (store, db) => {
+  const queue = createWriteBehindQueue(db);
+  const tripId = store.getMeta().id;
+
+  const writeTrip = () => queue.put('trips', { ...store.getMeta(), dayIds: store.getDayIds() });
+  const writeDay = (dayId) => {
+    const day = store.getDay(dayId);
+    if (day) queue.put('days', { ...day, tripId, stopIds: store.getDayStopIds(dayId) });
+    else queue.delete('days', dayId);
+  };
+  const writeStop = (stopId) => {
+    const stop = store.getStop(stopId);
+    if (stop) queue.put('stops', { ...stop, dayId: store.getDayOfStop(stopId) });
+    else queue.delete('stops', stopId);
+  };
+
+  const unsubscribe = store.onChange(changes => changes.forEach(({ kind, id }) => {
+    if (kind === 'trip') writeTrip();
+    else if (kind === 'day') writeDay(id);
+    else if (kind === 'stop') writeStop(id);
+  }));
+
+  return {
+    queue,
+    loadDay: (dayId) => loadDayStops(db, dayId),
+    // Writes every loaded row, e.g. the first time a trip is saved.
+    saveAll() {
+      writeTrip();
+      store.getDayIds().forEach(dayId => {
+        if (!store.isDayLoaded(dayId)) return;
+        writeDay(dayId);
+        store.getDayStopIds(dayId).forEach(writeStop);
+      });
+      return queue.flush();
+    },
+    disconnect() {
+      unsubscribe();
+      return queue.flush();
+    }
+  };
+};
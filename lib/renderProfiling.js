@@ -0,0 +1,134 @@
+import { downloadJson } from './aiMetrics.js';
+
+// --- Render Profiling ---
+// Opt-in React Profiler instrumentation, switched on by ?profile in the URL or
+// by enableRenderProfiling() and a reload. Profiled components report every
+// commit with its duration, and handlers wrapped in traceHandler name the
+// interaction that caused it, including commits made after an await. When
+// profiling is off, neither the Profiler wrappers nor the tracing are
+// installed.
+
+const RENDER_PROFILE_KEY = 'trip-planner:profile';
+const RENDER_PROFILE_VERSION = 1;
+const RENDER_SAMPLE_SIZE = 256;
+const RENDER_LOG_SIZE = 500;
+
+const isRenderProfilingRequested = () => {
+  try {
+    return new URLSearchParams(window.location.search).has('profile')
+      || localStorage.getItem(RENDER_PROFILE_KEY) === '1';
+  } catch {
+    return false;
+  }
+};
+
+export const RENDER_PROFILING = typeof window !== 'undefined' && isRenderProfilingRequested();
+
+const renderStats = new Map();  // profiler id -> totals and recent samples
+const triggerStats = new Map(); // trigger name -> commits it caused, per profiler id
+let renderLog = [];             // most recent commits, oldest first
+let syncTrigger = null;
+const asyncTriggers = new Map(); // handler name -> calls still pending
+
+const currentTrigger = () => syncTrigger || [...asyncTriggers.keys()].join('+') || 'other';
+
+// Wraps an event handler so the commits it causes are attributed to `name`.
+export const traceHandler = (name, handler) => {
+  if (!RENDER_PROFILING) return handler;
+  return (...args) => {
+    syncTrigger = name;
+    setTimeout(() => {
+      if (syncTrigger === name) syncTrigger = null;
+    }, 0);
+    const result = handler(...args);
+    if (result && typeof result.then === 'function') {
+      asyncTriggers.set(name, (asyncTriggers.get(name) || 0) + 1);
+      const settle = () => {
+        const pending = asyncTriggers.get(name) - 1;
+        if (pending > 0) asyncTriggers.set(name, pending);
+        else asyncTriggers.delete(name);
+      };
+      result.then(settle, settle);
+    }
+    return result;
+  };
+};
+
+// onRender callback for <Profiler>.
+export const recordRender = (id, phase, actualDuration, baseDuration, startTime, commitTime) => {
+  let stats = renderStats.get(id);
+  if (!stats) {
+    stats = { renders: 0, mounts: 0, updates: 0, totalMs: 0, maxMs: 0, samples: new Float64Array(RENDER_SAMPLE_SIZE) };
+    renderStats.set(id, stats);
+  }
+  stats.samples[stats.renders % RENDER_SAMPLE_SIZE] = actualDuration;
+  stats.renders++;
+  if (phase === 'mount') stats.mounts++;
+  else stats.updates++;
+  stats.totalMs += actualDuration;
+  stats.maxMs = Math.max(stats.maxMs, actualDuration);
+
+  const trigger = currentTrigger();
+  let byTrigger = triggerStats.get(trigger);
+  if (!byTrigger) {
+    byTrigger = { renders: 0, totalMs: 0, components: new Map() };
+    triggerStats.set(trigger, byTrigger);
+  }
+  byTrigger.renders++;
+  byTrigger.totalMs += actualDuration;
+  byTrigger.components.set(id, (byTrigger.components.get(id) || 0) + 1);
+
+  renderLog.push({ id, phase, actualMs: actualDuration, baseMs: baseDuration, commitTime, trigger });
+  if (renderLog.length > RENDER_LOG_SIZE) renderLog = renderLog.slice(-RENDER_LOG_SIZE);
+};
+
+const roundMs = (ms) => Math.round(ms * 1000) / 1000;
+
+const samplePercentile = (samples, count, p) => {
+  const n = Math.min(count, samples.length);
+  if (n === 0) return 0;
+  const sorted = samples.slice(0, n).sort();
+  return sorted[Math.min(n - 1, Math.floor(p * n))];
+};
+
+const sortedEntries = (map) => [...map.entries()].sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0));
+
+// A JSON-ready snapshot with sorted keys, so exports from two builds diff cleanly.
+// The App entry covers every commit in the tree, since profilers nest.
+export const getRenderProfile = ({ includeLog = false } = {}) => ({
+  version: RENDER_PROFILE_VERSION,
+  enabled: RENDER_PROFILING,
+  components: Object.fromEntries(sortedEntries(renderStats).map(([id, stats]) => [id, {
+    renders: stats.renders,
+    mounts: stats.mounts,
+    updates: stats.updates,
+    totalMs: roundMs(stats.totalMs),
+    meanMs: roundMs(stats.totalMs / stats.renders),
+    p95Ms: roundMs(samplePercentile(stats.samples, stats.renders, 0.95)),
+    maxMs: roundMs(stats.maxMs)
+  }])),
+  triggers: Object.fromEntries(sortedEntries(triggerStats).map(([name, stats]) => [name, {
+    renders: stats.renders,
+    totalMs: roundMs(stats.totalMs),
+    components: Object.fromEntries(sortedEntries(stats.components))
+  }])),
+  ...(includeLog ? {
+    log: renderLog.map(entry => ({ ...entry, actualMs: roundMs(entry.actualMs), baseMs: roundMs(entry.baseMs), commitTime: roundMs(entry.commitTime) }))
+  } : {})
+});
+
+export const resetRenderProfile = () => {
+  renderStats.clear();
+  triggerStats.clear();
+  renderLog = [];
+};
+
+export const exportRenderProfile = () =>
+  downloadJson(`render-profile-${new Date().toISOString().replace(/[:.]/g, '-')}.json`, getRenderProfile({ includeLog: true }));
+
+// Takes effect on the next load.
+export const enableRenderProfiling = (enabled = true) => {
+  if (enabled) localStorage.setItem(RENDER_PROFILE_KEY, '1');
+  else localStorage.removeItem(RENDER_PROFILE_KEY);
+  return enabled ? 'Render profiling is on from the next reload' : 'Render profiling is off from the next reload';
+};
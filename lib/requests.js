@@ -0,0 +1,230 @@
+// --- Resilient Requests ---
+// Every model call goes through resilientFetch: a per-attempt deadline,
+// caller cancellation via AbortSignal, jittered exponential backoff on 429/5xx
+// and network errors, optional hedging once latency passes the observed p95,
+// and a circuit breaker that fails fast while the endpoint keeps failing. The
+// deadline and cancellation cover reading the body too, until the caller
+// calls the done() it gets back with the response. Streams opt out of the
+// body deadline (bodyTimeout: false) and time out on idleness instead.
+
+const REQUEST_POLICY = {
+  timeoutMs: 30000,
+  maxRetries: 3,
+  baseBackoffMs: 500,
+  maxBackoffMs: 8000,
+  hedge: false,
+  hedgeMinSamples: 20,
+  breakerThreshold: 5,
+  breakerCooldownMs: 30000
+};
+
+const circuitBreaker = { state: 'closed', failures: 0, openedAt: 0 };
+const latencySamples = [];
+const MAX_LATENCY_SAMPLES = 100;
+
+export const isAbortError = (error) => error?.name === 'AbortError';
+
+export const createAbortError = () => {
+  const error = new Error('The request was aborted');
+  error.name = 'AbortError';
+  return error;
+};
+
+export const sleep = (ms, signal) => new Promise((resolve, reject) => {
+  if (signal?.aborted) return reject(createAbortError());
+  const timer = setTimeout(resolve, ms);
+  signal?.addEventListener('abort', () => {
+    clearTimeout(timer);
+    reject(createAbortError());
+  }, { once: true });
+});
+
+const recordLatency = (ms) => {
+  latencySamples.push(ms);
+  if (latencySamples.length > MAX_LATENCY_SAMPLES) latencySamples.shift();
+};
+
+const latencyPercentile = (p) => {
+  if (latencySamples.length === 0) return null;
+  const sorted = [...latencySamples].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+};
+
+const isRetryableStatus = (status) => status === 429 || status >= 500;
+
+const backoffDelay = (attempt, response) => {
+  const retryAfter = Number(response?.headers?.get('Retry-After'));
+  if (retryAfter > 0) return retryAfter * 1000;
+  // Full jitter: uniform in [0, capped exponential].
+  return Math.random() * Math.min(REQUEST_POLICY.maxBackoffMs, REQUEST_POLICY.baseBackoffMs * 2 ** attempt);
+};
+
+// Returns true when this request is the half-open trial. While the trial is
+// out, other requests fail fast as if the circuit were still open.
+const checkCircuit = () => {
+  if (circuitBreaker.state === 'closed') return false;
+  if (circuitBreaker.state === 'half-open' || Date.now() - circuitBreaker.openedAt < REQUEST_POLICY.breakerCooldownMs) {
+    throw new Error('Circuit open: AI service is unavailable, try again shortly');
+  }
+  circuitBreaker.state = 'half-open'; // Let one trial request through.
+  return true;
+};
+
+const recordCircuitResult = (ok) => {
+  if (ok) {
+    circuitBreaker.state = 'closed';
+    circuitBreaker.failures = 0;
+    return;
+  }
+  circuitBreaker.failures++;
+  if (circuitBreaker.state === 'half-open' || circuitBreaker.failures >= REQUEST_POLICY.breakerThreshold) {
+    circuitBreaker.state = 'open';
+    circuitBreaker.openedAt = Date.now();
+  }
+};
+
+// Every attempt goes through this fetch-compatible function, so load tests can
+// answer requests in process (see dev/geminiStandIn.js). null restores fetch.
+let requestTransport = null;
+
+export const setRequestTransport = (fetchImpl) => {
+  requestTransport = fetchImpl;
+};
+
+// One attempt: resolves with { response, done } once headers arrive, or
+// rejects on deadline, network error or caller abort. The caller's signal
+// keeps covering the body until done() is called, so Cancel still works, and
+// so does the deadline unless `bodyTimeout` is false, so a stalled body fails.
+// `controller` aborts this attempt only.
+const fetchAttempt = async (url, init, { timeoutMs, bodyTimeout, signal }, controller = new AbortController()) => {
+  const abort = () => controller.abort();
+  const expire = () => controller.abort(new Error(`Request timed out after ${timeoutMs}ms`));
+  signal?.addEventListener('abort', abort, { once: true });
+  const timer = setTimeout(expire, timeoutMs);
+  const done = () => {
+    clearTimeout(timer);
+    signal?.removeEventListener('abort', abort);
+  };
+  const startedAt = performance.now();
+  try {
+    const response = await (requestTransport || fetch)(url, { ...init, signal: controller.signal });
+    recordLatency(performance.now() - startedAt);
+    if (!bodyTimeout) clearTimeout(timer);
+    return { response, done };
+  } catch (error) {
+    done();
+    if (signal?.aborted) throw createAbortError();
+    if (isAbortError(error)) throw new Error(`Request timed out after ${timeoutMs}ms`);
+    throw error;
+  }
+};
+
+// Drops an attempt whose response will not be read.
+const discardAttempt = ({ response, done }) => {
+  response.body?.cancel().catch(() => {});
+  done();
+};
+
+// Starts a duplicate attempt if the first has not answered by the p95 latency
+// (and beforeAttempt lets it go); the first response wins and the loser is
+// aborted. A wait in beforeAttempt is called off through its signal once the
+// first attempt settles.
+const hedgedAttempt = (url, init, attemptOptions, beforeAttempt) => {
+  const { signal } = attemptOptions;
+  const hedgeAfter = latencySamples.length >= REQUEST_POLICY.hedgeMinSamples && latencyPercentile(0.95);
+  if (!REQUEST_POLICY.hedge || !hedgeAfter) return fetchAttempt(url, init, attemptOptions);
+
+  const controllers = [new AbortController(), new AbortController()];
+  const hedgeWait = new AbortController();
+  return new Promise((resolve, reject) => {
+    let settled = false;
+    let failures = 0;
+    let launched = 1;
+    let timer = null;
+    const stopHedge = () => {
+      clearTimeout(timer);
+      hedgeWait.abort();
+    };
+    const settle = () => {
+      settled = true;
+      stopHedge();
+      signal?.removeEventListener('abort', stopHedge);
+    };
+    const launch = (index) => {
+      fetchAttempt(url, init, attemptOptions, controllers[index]).then(attempt => {
+        if (settled) return discardAttempt(attempt);
+        settle();
+        controllers.forEach((c, i) => i !== index && c.abort());
+        resolve(attempt);
+      }, error => {
+        if (settled) return;
+        if (++failures === launched || signal?.aborted) {
+          settle();
+          reject(error);
+        }
+      });
+    };
+    launch(0);
+    timer = setTimeout(async () => {
+      if (settled) return;
+      try {
+        await beforeAttempt?.(hedgeWait.signal);
+      } catch {
+        return; // settled or aborted while waiting
+      }
+      if (settled) return;
+      launched = 2;
+      launch(1);
+    }, hedgeAfter);
+    signal?.addEventListener('abort', stopHedge, { once: true });
+  });
+};
+
+// Resolves with { response, done }; call done() once the body has been read
+// (or abandoned). Responses that are retried are cancelled here. Retries and
+// hedges first await `beforeAttempt(signal)`, e.g. to take a rate-limit token;
+// it should stop waiting when `signal` aborts.
+// `timeoutMs` bounds each attempt until done(), or only until headers arrive
+// when `bodyTimeout` is false.
+export const resilientFetch = async (url, init, { signal, timeoutMs = REQUEST_POLICY.timeoutMs, bodyTimeout = true, beforeAttempt } = {}) => {
+  const trial = checkCircuit();
+  const attemptOptions = { timeoutMs, bodyTimeout, signal };
+  try {
+    for (let attempt = 0; ; attempt++) {
+      let result = null;
+      try {
+        result = await hedgedAttempt(url, init, attemptOptions, beforeAttempt);
+        if (!isRetryableStatus(result.response.status)) {
+          recordCircuitResult(true);
+          return result;
+        }
+      } catch (error) {
+        if (isAbortError(error)) throw error;
+        if (attempt >= REQUEST_POLICY.maxRetries) {
+          recordCircuitResult(false);
+          throw error;
+        }
+      }
+      if (result && attempt >= REQUEST_POLICY.maxRetries) {
+        recordCircuitResult(false);
+        return result;
+      }
+      const delay = backoffDelay(attempt, result?.response);
+      if (result) discardAttempt(result);
+      await sleep(delay, signal);
+      await beforeAttempt?.(signal);
+    }
+  } catch (error) {
+    // An abandoned trial proves nothing: let the next request try instead.
+    if (trial && isAbortError(error) && circuitBreaker.state === 'half-open') circuitBreaker.state = 'open';
+    throw error;
+  }
+};
+
+export const getRequestHealth = () => ({
+  circuit: circuitBreaker.state,
+  consecutiveFailures: circuitBreaker.failures,
+  p50Ms: latencyPercentile(0.5),
+  p95Ms: latencyPercentile(0.95),
+  samples: latencySamples.length
+});
@@ -0,0 +1,135 @@
+import { DEFAULT_TRAVEL_MODE, buildTravelMatrix } from './travel.js';
+
+// --- Route Optimizer ---
+// Reorders a day to cut total travel time. Anchored stops (hotels, an opening
+// transport leg, fixed-time appointments, anything marked `pinned`) keep their
+// positions; the free stops between two anchors are seeded by nearest
+// neighbour and then improved with 2-opt and Or-opt moves until neither finds
+// a shorter path.
+
+const MAX_IMPROVEMENT_PASSES = 50;
+
+const isAnchorStop = (stop, index) =>
+  !!stop.pinned || !!stop.fixedTime || stop.category === 'hotel' || (index === 0 && stop.category === 'transport');
+
+const totalTravelMinutes = (order, matrix, n) => {
+  let total = 0;
+  for (let i = 1; i < order.length; i++) total += matrix[order[i - 1] * n + order[i]];
+  return total;
+};
+
+const reverseRange = (path, i, j) => {
+  for (; i < j; i++, j--) [path[i], path[j]] = [path[j], path[i]];
+};
+
+// Endpoints path[0] and path[path.length - 1] never move.
+const twoOptPass = (path, cost) => {
+  let improved = false;
+  const last = path.length - 2;
+  for (let i = 1; i < last; i++) {
+    for (let j = i + 1; j <= last; j++) {
+      const delta = cost(path[i - 1], path[j]) + cost(path[i], path[j + 1])
+        - cost(path[i - 1], path[i]) - cost(path[j], path[j + 1]);
+      if (delta < 0) {
+        reverseRange(path, i, j);
+        improved = true;
+      }
+    }
+  }
+  return improved;
+};
+
+// Moves runs of 1-3 stops (optionally reversed) to a cheaper gap.
+const orOptPass = (path, cost) => {
+  let improved = false;
+  for (let len = 1; len <= 3; len++) {
+    for (let i = 1; i + len <= path.length - 1; i++) {
+      const j = i + len - 1;
+      const head = path[i];
+      const tail = path[j];
+      const removeGain = cost(path[i - 1], head) + cost(tail, path[j + 1]) - cost(path[i - 1], path[j + 1]);
+      for (let k = 0; k < path.length - 1; k++) {
+        if (k >= i - 1 && k <= j) continue;
+        const base = cost(path[k], path[k + 1]);
+        const forward = cost(path[k], head) + cost(tail, path[k + 1]) - base;
+        const reversed = cost(path[k], tail) + cost(head, path[k + 1]) - base;
+        if (Math.min(forward, reversed) < removeGain) {
+          const segment = path.splice(i, len);
+          if (reversed < forward) segment.reverse();
+          path.splice(k < i ? k + 1 : k + 1 - len, 0, ...segment);
+          improved = true;
+          break;
+        }
+      }
+    }
+  }
+  return improved;
+};
+
+// Orders `free` between two anchors; -1 stands for an open end.
+const optimizeSegment = (start, free, end, matrix, n) => {
+  const cost = (a, b) => (a < 0 || b < 0 ? 0 : matrix[a * n + b]);
+
+  // Grow the nearest-neighbour chain from whichever end is fixed.
+  const fromEnd = start < 0 && end >= 0;
+  const remaining = free.slice();
+  const seeded = [];
+  let current = fromEnd ? end : start;
+  while (remaining.length) {
+    let best = 0;
+    if (current >= 0) {
+      for (let k = 1; k < remaining.length; k++) {
+        if (cost(current, remaining[k]) < cost(current, remaining[best])) best = k;
+      }
+    }
+    current = remaining[best];
+    seeded.push(current);
+    remaining[best] = remaining[remaining.length - 1];
+    remaining.pop();
+  }
+  if (fromEnd) seeded.reverse();
+
+  const path = [start, ...seeded, end];
+  for (let pass = 0; pass < MAX_IMPROVEMENT_PASSES; pass++) {
+    const twoOpt = twoOptPass(path, cost);
+    const orOpt = orOptPass(path, cost);
+    if (!twoOpt && !orOpt) break;
+  }
+  return path.slice(1, -1);
+};
+
+// Returns the reordered stops plus travel minutes before and after. The
+// original array comes back untouched when no shorter order is found.
+export const optimizeDayOrder = (stops, travelMode = DEFAULT_TRAVEL_MODE) => {
+  const n = stops.length;
+  const matrix = buildTravelMatrix(stops, travelMode);
+  const beforeMinutes = totalTravelMinutes(stops.map((_, i) => i), matrix, n);
+
+  const order = [];
+  let segmentStart = -1;
+  let free = [];
+  const flush = (end) => {
+    if (free.length) order.push(...optimizeSegment(segmentStart, free, end, matrix, n));
+    free = [];
+  };
+  stops.forEach((stop, i) => {
+    if (isAnchorStop(stop, i)) {
+      flush(i);
+      order.push(i);
+      segmentStart = i;
+    } else {
+      free.push(i);
+    }
+  });
+  flush(-1);
+
+  const afterMinutes = totalTravelMinutes(order, matrix, n);
+  if (afterMinutes >= beforeMinutes) {
+    return { stops, beforeMinutes, afterMinutes: beforeMinutes, savedMinutes: 0 };
+  }
+
+  const reordered = order.map(i => stops[i]);
+  // The first stop anchors the day's start time, whichever stop that now is.
+  if (reordered[0] !== stops[0]) reordered[0] = { ...reordered[0], startTime: stops[0].startTime };
+  return { stops: reordered, beforeMinutes, afterMinutes, savedMinutes: beforeMinutes - afterMinutes };
+};
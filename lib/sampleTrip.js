@@ -0,0 +1,54 @@
+// --- Sample Trip ---
+
+export const INITIAL_TRIP = {
+  id: 'trip-1',
+  title: 'Weekend in Tokyo',
+  startDate: '2024-04-10',
+  travelMode: 'transit',
+  currency: 'JPY',
+  days: [
+    {
+      id: 'day-1',
+      date: '2024-04-10',
+      label: 'Day 1',
+      stops: [
+        { 
+          id: 's1', 
+          type: 'transport', 
+          name: 'Arrive at Narita Airport', 
+          startTime: '10:00', 
+          fixedTime: true,
+          duration: 60, 
+          category: 'transport',
+          ticketInfo: 'Flight JL123',
+          remarks: 'Pick up pocket WiFi at terminal',
+          expenses: '¥2,000',
+          location: { lat: 35.7720, lng: 140.3929 }
+        },
+        { 
+          id: 's2', 
+          type: 'visit', 
+          name: 'Check-in Hotel Shinjuku', 
+          startTime: '12:00', 
+          duration: 45, 
+          category: 'hotel',
+          googleLink: 'https://maps.google.com/?q=Shinjuku+Hotel',
+          expenses: '¥15,000',
+          location: { lat: 35.6938, lng: 139.7034 }
+        },
+        { id: 's3', type: 'food', name: 'Ramen Lunch', startTime: '13:00', duration: 60, category: 'food', expenses: '¥1,200', location: { lat: 35.6905, lng: 139.7000 } },
+        { id: 's4', type: 'sight', name: 'Meiji Jingu Shrine', startTime: '14:30', duration: 90, category: 'sight', openingHours: { open: '05:00', close: '18:00' }, expenses: 'Free', location: { lat: 35.6764, lng: 139.6993 } },
+        { id: 's5', type: 'sight', name: 'Shibuya Crossing', startTime: '16:30', duration: 60, category: 'sight', location: { lat: 35.6595, lng: 139.7005 } },
+      ]
+    },
+    {
+      id: 'day-2',
+      date: '2024-04-11',
+      label: 'Day 2',
+      stops: [
+        { id: 's6', type: 'food', name: 'Breakfast at Tsukiji', startTime: '08:00', duration: 90, category: 'food', expenses: '¥3,500', location: { lat: 35.6655, lng: 139.7707 } },
+        { id: 's7', type: 'sight', name: 'TeamLab Planets', startTime: '10:00', fixedTime: true, duration: 120, category: 'sight', ticketInfo: 'QR Code saved in gallery', expenses: '¥3,200', location: { lat: 35.6491, lng: 139.7898 } },
+      ]
+    }
+  ]
+};
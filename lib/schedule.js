@@ -0,0 +1,213 @@
+import { DEFAULT_TRAVEL_MODE, travelLegMinutes } from './travel.js';
+
+// --- Schedule Engine ---
+// Times are kept as integer minutes from midnight of the trip's first day and
+// only turned into "HH:MM" strings when rendered.
+
+export const MINUTES_PER_DAY = 24 * 60;
+export const DEFAULT_DAY_START = '09:00';
+
+export const parseTime = (timeStr) => {
+  if (!timeStr) return 0;
+  const sep = timeStr.indexOf(':');
+  const mins = Number(timeStr.slice(0, sep)) * 60 + Number(timeStr.slice(sep + 1));
+  return Number.isFinite(mins) ? mins : 0;
+};
+
+export const formatTime = (mins) => {
+  const clock = ((mins % MINUTES_PER_DAY) + MINUTES_PER_DAY) % MINUTES_PER_DAY;
+  const h = Math.floor(clock / 60);
+  const m = clock % 60;
+  return `${h < 10 ? '0' : ''}${h}:${m < 10 ? '0' : ''}${m}`;
+};
+
+// Like formatTime, but marks times that run past midnight ("00:30 +1d").
+export const formatTimeLabel = (mins) => {
+  const overflow = Math.floor(mins / MINUTES_PER_DAY);
+  return overflow > 0 ? `${formatTime(mins)} +${overflow}d` : formatTime(mins);
+};
+
+export const formatDuration = (mins) =>
+  mins < 60 ? `${mins}m` : `${Math.floor(mins / 60)}h${mins % 60 ? ` ${mins % 60}m` : ''}`;
+
+// Stops may constrain when they start. `fixedTime: true` holds a stop at its
+// own startTime (a flight, a timed ticket) and `openingHours: { open, close }`
+// keeps it inside a window; every other stop starts as soon as it is reached.
+// Waiting for a fixed time or an opening is slack, and a stop that cannot meet
+// its constraint overruns it, which makes its day infeasible.
+
+// Start of a stop reached at `arrival`. Both are trip-relative minutes and
+// `dayBase` is the midnight of the stop's day.
+const constrainedStart = (stop, arrival, dayBase) => {
+  if (stop.fixedTime) return dayBase + parseTime(stop.startTime);
+  if (stop.openingHours) return Math.max(arrival, dayBase + parseTime(stop.openingHours.open));
+  return arrival;
+};
+
+// Minutes by which a stop misses its constraint: arriving after its fixed time
+// or still being there after closing. A close at or before the open time is
+// taken to be past midnight.
+const constraintOverrun = (stop, arrival, start, dayBase) => {
+  if (stop.fixedTime) return Math.max(0, arrival - start);
+  if (stop.openingHours) {
+    const open = parseTime(stop.openingHours.open);
+    let close = parseTime(stop.openingHours.close);
+    if (close <= open) close += MINUTES_PER_DAY;
+    return Math.max(0, start + stop.duration - (dayBase + close));
+  }
+  return 0;
+};
+
+// Schedules every stop of every day in one forward pass over flat typed
+// arrays. Day d owns slots dayOffsets[d] .. dayOffsets[d + 1] - 1 of `starts`
+// (trip-relative minutes), `travel` (the leg into each stop), `slack` and
+// `overrun`; `infeasible[d]` is 1 when any of its stops overruns.
+export const scheduleDays = (days, travelMode = DEFAULT_TRAVEL_MODE) => {
+  const dayOffsets = new Int32Array(days.length + 1);
+  for (let d = 0; d < days.length; d++) {
+    dayOffsets[d + 1] = dayOffsets[d] + days[d].stops.length;
+  }
+
+  const total = dayOffsets[days.length];
+  const starts = new Int32Array(total);
+  const travel = new Int32Array(total);
+  const slack = new Int32Array(total);
+  const overrun = new Int32Array(total);
+  const infeasible = new Uint8Array(days.length);
+
+  for (let d = 0; d < days.length; d++) {
+    const { stops } = days[d];
+    const base = dayOffsets[d];
+    const dayBase = d * MINUTES_PER_DAY;
+    if (stops.length === 0) continue;
+    let arrival = dayBase + parseTime(stops[0].startTime || DEFAULT_DAY_START);
+    for (let i = 0; i < stops.length; i++) {
+      const k = base + i;
+      if (i > 0) {
+        travel[k] = travelLegMinutes(stops[i - 1], stops[i], travelMode);
+        arrival = starts[k - 1] + stops[i - 1].duration + travel[k];
+      }
+      const start = constrainedStart(stops[i], arrival, dayBase);
+      starts[k] = start;
+      slack[k] = Math.max(0, start - arrival);
+      overrun[k] = constraintOverrun(stops[i], arrival, start, dayBase);
+      if (overrun[k] > 0) infeasible[d] = 1;
+    }
+  }
+
+  return { starts, travel, slack, overrun, dayOffsets, infeasible };
+};
+
+// Single-day view. Minutes are relative to the day's midnight.
+export const calculateSchedule = (stops, travelMode = DEFAULT_TRAVEL_MODE) => {
+  if (stops.length === 0) return [];
+
+  const { starts, travel, slack, overrun } = scheduleDays([{ stops }], travelMode);
+
+  return stops.map((stop, index) => ({
+    ...stop,
+    startMinutes: starts[index],
+    endMinutes: starts[index] + stop.duration,
+    travelToNext: index + 1 < stops.length ? travel[index + 1] : 0,
+    slackMinutes: slack[index],
+    overrunMinutes: overrun[index]
+  }));
+};
+
+// Remembered per stops array, so unchanged days are not rescheduled.
+const dayFeasibilityCache = new WeakMap();
+
+const isDayInfeasible = (stops, travelMode = DEFAULT_TRAVEL_MODE) => {
+  const cached = dayFeasibilityCache.get(stops);
+  if (cached && cached.travelMode === travelMode) return cached.infeasible;
+  const infeasible = stops.length > 0 && scheduleDays([{ stops }], travelMode).infeasible[0] === 1;
+  dayFeasibilityCache.set(stops, { travelMode, infeasible });
+  return infeasible;
+};
+
+// Ids of days whose constraints cannot all be met. The same array is returned
+// while the answer is unchanged, so it can be used as a store selector.
+const infeasibleDaysCache = new WeakMap();
+
+export const getInfeasibleDayIds = (store, travelMode) => {
+  const ids = store.getDayIds().filter(dayId => isDayInfeasible(store.getDayStops(dayId), travelMode));
+  const last = infeasibleDaysCache.get(store);
+  if (last && last.length === ids.length && last.every((id, i) => id === ids[i])) return last;
+  infeasibleDaysCache.set(store, ids);
+  return ids;
+};
+
+// --- Incremental Schedule ---
+// Keeps the per-stop steps scheduleDays uses: slot 0 holds the day's anchor
+// time and slot i the previous stop's duration plus travel. Editing stops
+// first..last refreshes only their steps and reschedules from `first`. The
+// pass stops as soon as a stop past the edit starts where it did before,
+// which a fixed-time stop guarantees, so an edit only ripples up to the next
+// appointment.
+
+const scheduleStep = (stops, index, travelMode) =>
+  index === 0
+    ? parseTime(stops[0].startTime || DEFAULT_DAY_START)
+    : stops[index - 1].duration + travelLegMinutes(stops[index - 1], stops[index], travelMode);
+
+export const EMPTY_SCHEDULE = { stops: [], travelMode: DEFAULT_TRAVEL_MODE, steps: new Int32Array(0), scheduled: [] };
+
+// Returns the next schedule state for `stops`. Scheduled entries whose stop,
+// timing and onward leg are unchanged keep their identity, so memoized cards
+// skip rendering.
+export const updateIncrementalSchedule = (state, stops, travelMode = DEFAULT_TRAVEL_MODE) => {
+  if (travelMode !== state.travelMode) state = { ...EMPTY_SCHEDULE, travelMode };
+  if (stops === state.stops) return state;
+  const prev = state.stops;
+
+  let first = 0;
+  const shared = Math.min(prev.length, stops.length);
+  while (first < shared && prev[first] === stops[first]) first++;
+  if (first === shared && prev.length === stops.length) return { ...state, stops };
+
+  let { steps } = state;
+  // Past `settled`, stops and steps match the previous schedule.
+  let settled = stops.length;
+  if (prev.length !== stops.length) {
+    steps = Int32Array.from(stops, (_, i) => scheduleStep(stops, i, travelMode));
+  } else {
+    let last = stops.length - 1;
+    while (last > first && prev[last] === stops[last]) last--;
+    // A stop's duration and location feed the step of the stop after it.
+    settled = Math.min(last + 1, stops.length - 1);
+    for (let i = first; i <= settled; i++) steps[i] = scheduleStep(stops, i, travelMode);
+  }
+
+  // The entry before `first` shows the leg into stop `first`, which may have changed.
+  const from = Math.max(0, first - 1);
+  const scheduled = state.scheduled.slice(0, from);
+  let prevStart = from > 0 ? state.scheduled[from - 1].startMinutes : 0;
+  for (let i = from; i < stops.length; i++) {
+    const stop = stops[i];
+    const arrival = i === 0 ? steps[0] : prevStart + steps[i];
+    const start = constrainedStart(stop, arrival, 0);
+    const slackMinutes = Math.max(0, start - arrival);
+    const overrunMinutes = constraintOverrun(stop, arrival, start, 0);
+    const travelToNext = i + 1 < stops.length ? steps[i + 1] - stop.duration : 0;
+    const reused = state.scheduled[i];
+    if (prev[i] === stop && reused.startMinutes === start && reused.travelToNext === travelToNext
+      && reused.slackMinutes === slackMinutes && reused.overrunMinutes === overrunMinutes) {
+      scheduled.push(reused);
+    } else {
+      scheduled.push({
+        ...stop,
+        startMinutes: start,
+        endMinutes: start + stop.duration,
+        travelToNext,
+        slackMinutes,
+        overrunMinutes
+      });
+    }
+    if (i > settled && reused.startMinutes === start) {
+      return { stops, travelMode, steps, scheduled: scheduled.concat(state.scheduled.slice(i + 1)) };
+    }
+    prevStart = start;
+  }
+
+  return { stops, travelMode, steps, scheduled };
+};
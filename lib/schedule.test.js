@@ -0,0 +1,146 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import {
+  MINUTES_PER_DAY, EMPTY_SCHEDULE, parseTime, formatTime, formatTimeLabel, formatDuration,
+  scheduleDays, calculateSchedule, getInfeasibleDayIds, updateIncrementalSchedule
+} from './schedule.js';
+import { DEFAULT_TRAVEL_MINUTES } from './travel.js';
+
+// Small deterministic PRNG (mulberry32), as in the benchmarks.
+const seededRandom = (seed) => () => {
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+// Stops without coordinates, so every leg takes DEFAULT_TRAVEL_MINUTES.
+const stop = (id, fields) => ({ id, name: id, duration: 60, ...fields });
+const LEG = DEFAULT_TRAVEL_MINUTES;
+
+test('parses and formats clock times', () => {
+  assert.equal(parseTime('09:30'), 570);
+  assert.equal(parseTime(''), 0);
+  assert.equal(parseTime('soon'), 0);
+  assert.equal(formatTime(570), '09:30');
+  assert.equal(formatTime(MINUTES_PER_DAY + 5), '00:05');
+  assert.equal(formatTime(-30), '23:30');
+  assert.equal(formatTimeLabel(600), '10:00');
+  assert.equal(formatTimeLabel(MINUTES_PER_DAY + 30), '00:30 +1d');
+  assert.deepEqual([45, 60, 90].map(formatDuration), ['45m', '1h', '1h 30m']);
+});
+
+test('chains stops from the day start and honours fixed times', () => {
+  const { starts, travel, slack, overrun, infeasible } = scheduleDays([{
+    stops: [
+      stop('a'),
+      stop('b'),
+      stop('flight', { fixedTime: true, startTime: '13:00' }),
+      stop('late', { fixedTime: true, startTime: '14:00' })
+    ]
+  }]);
+  assert.deepEqual([...starts], [540, 540 + 60 + LEG, 780, 840]);
+  assert.deepEqual([...travel], [0, LEG, LEG, LEG]);
+  assert.deepEqual([...slack], [0, 0, 780 - (630 + 60 + LEG), 0]);
+  assert.deepEqual([...overrun], [0, 0, 0, 780 + 60 + LEG - 840]);
+  assert.deepEqual([...infeasible], [1]);
+});
+
+test('waits for opening hours and flags stays past closing', () => {
+  const { starts, slack, overrun, infeasible } = scheduleDays([
+    { stops: [stop('museum', { startTime: '10:30', duration: 90, openingHours: { open: '11:00', close: '12:00' } })] },
+    { stops: [stop('club', { startTime: '19:00', duration: 300, openingHours: { open: '20:00', close: '02:00' } })] }
+  ]);
+  assert.deepEqual([...starts], [660, MINUTES_PER_DAY + 1200]);
+  assert.deepEqual([...slack], [30, 60]);
+  // The museum runs 30 minutes past closing; the club's close is past midnight.
+  assert.deepEqual([...overrun], [30, 0]);
+  assert.deepEqual([...infeasible], [1, 0]);
+});
+
+test('lays days out back to back, skipping empty ones', () => {
+  const { starts, dayOffsets } = scheduleDays([
+    { stops: [stop('a'), stop('b')] },
+    { stops: [] },
+    { stops: [stop('c', { startTime: '08:00' })] }
+  ]);
+  assert.deepEqual([...dayOffsets], [0, 2, 2, 3]);
+  assert.deepEqual([...starts], [540, 630, 2 * MINUTES_PER_DAY + 480]);
+});
+
+test('calculateSchedule reports each stop with its onward leg', () => {
+  const stops = [stop('a', { startTime: '08:00', duration: 45 }), stop('b', { location: { lat: 35.6586, lng: 139.7454 } })];
+  const [first, second] = calculateSchedule(stops);
+  assert.equal(first.name, 'a');
+  assert.deepEqual([first.startMinutes, first.endMinutes, first.travelToNext], [480, 525, LEG]);
+  assert.deepEqual([second.startMinutes, second.endMinutes, second.travelToNext], [555, 615, 0]);
+  assert.deepEqual(calculateSchedule([]), []);
+});
+
+test('getInfeasibleDayIds keeps its array while the answer holds', () => {
+  const days = {
+    d1: [stop('a')],
+    d2: [stop('b'), stop('c', { fixedTime: true, startTime: '09:30' })]
+  };
+  const store = { getDayIds: () => Object.keys(days), getDayStops: (dayId) => days[dayId] };
+  const ids = getInfeasibleDayIds(store);
+  assert.deepEqual(ids, ['d2']);
+  days.d1 = [stop('a', { duration: 30 })];
+  assert.equal(getInfeasibleDayIds(store), ids);
+  days.d2 = [stop('b')];
+  assert.deepEqual(getInfeasibleDayIds(store), []);
+});
+
+test('incremental schedule matches a full pass after every edit', () => {
+  const random = seededRandom(14);
+  let counter = 0;
+  const randomStop = () => {
+    const fields = { duration: 15 + Math.floor(random() * 12) * 15 };
+    const roll = random();
+    if (roll < 0.15) fields.fixedTime = true;
+    if (roll < 0.15) fields.startTime = formatTime(480 + Math.floor(random() * 40) * 15);
+    else if (roll < 0.3) fields.openingHours = { open: '10:00', close: roll < 0.2 ? '01:00' : '17:00' };
+    if (random() < 0.7) fields.location = { lat: 35.6 + random() * 0.1, lng: 139.6 + random() * 0.1 };
+    return stop(`s${counter++}`, fields);
+  };
+
+  ['walk', 'transit'].forEach(mode => {
+    let stops = Array.from({ length: 12 }, randomStop);
+    let state = updateIncrementalSchedule(EMPTY_SCHEDULE, stops, mode);
+    assert.deepEqual(state.scheduled, calculateSchedule(stops, mode));
+    for (let step = 0; step < 300; step++) {
+      const next = stops.slice();
+      const i = Math.floor(random() * next.length);
+      const roll = random();
+      if (roll < 0.5 && next.length > 0) next[i] = { ...randomStop(), id: next[i].id };
+      else if (roll < 0.7 || next.length < 3) next.splice(i, 0, randomStop());
+      else if (roll < 0.85) next.splice(i, 1);
+      else next.push(next.splice(i, 1)[0]);
+      stops = next;
+      state = updateIncrementalSchedule(state, stops, mode);
+      assert.deepEqual(state.scheduled, calculateSchedule(stops, mode), `${mode}, edit ${step}`);
+    }
+  });
+});
+
+test('an edit ripples only up to the next fixed-time stop', () => {
+  const stops = [
+    stop('a'), stop('b'), stop('c'),
+    stop('flight', { fixedTime: true, startTime: '15:00' }),
+    stop('d'), stop('e')
+  ];
+  const before = updateIncrementalSchedule(EMPTY_SCHEDULE, stops);
+  const edited = stops.slice();
+  edited[1] = { ...stops[1], duration: 90 };
+  const after = updateIncrementalSchedule(before, edited);
+
+  assert.deepEqual(after.scheduled, calculateSchedule(edited));
+  assert.equal(after.scheduled[0], before.scheduled[0]);
+  assert.notEqual(after.scheduled[1], before.scheduled[1]);
+  assert.notEqual(after.scheduled[2], before.scheduled[2]);
+  // The flight keeps its start and absorbs the change in its slack.
+  assert.equal(after.scheduled[3].startMinutes, before.scheduled[3].startMinutes);
+  assert.equal(after.scheduled[3].slackMinutes, before.scheduled[3].slackMinutes - 30);
+  [4, 5].forEach(i => assert.equal(after.scheduled[i], before.scheduled[i]));
+  assert.equal(updateIncrementalSchedule(after, edited), after);
+});
@@ -0,0 +1,280 @@
+import { sleep } from './requests.js';
+import { PERSISTED_STORES, idbRequest } from './persistence.js';
+
+// --- Search Index ---
+// An inverted index over the name, ticket info, remarks and Google link of
+// every stop: the live store's loaded stops, plus saved rows from IndexedDB
+// for days and trips that are not loaded. Latin text is folded to lowercase
+// without diacritics and split into words. CJK text has no spaces between
+// words, so it is indexed as overlapping character bigrams and any run of two
+// or more characters matches. A query matches stops containing all of its
+// terms, the last one also as a prefix while it is still being typed. Results
+// are ranked by BM25, with name matches weighted highest. Store changes
+// re-index only the touched stops. Every change bumps the index's version and
+// subscribers hear about it once per task, so open results can refresh.
+
+const SEARCH_FIELD_WEIGHTS = { name: 3, ticketInfo: 2, remarks: 1, googleLink: 1 };
+const SEARCH_PREFIX_KEY_LENGTH = 3;
+const SEARCH_BM25_K1 = 1.2;
+const SEARCH_BM25_B = 0.75;
+const SEARCH_PREFIX_BOOST = 0.7;
+const SEARCH_INDEX_BATCH = 2000;
+const SEARCH_LINK_NOISE = new Set(['http', 'https', 'www', 'google', 'com', 'maps', 'goo', 'gl', 'app', 'api', 'search', 'place', 'query', 'q']);
+
+const CJK_CHARS = '\\u3040-\\u30ff\\u31f0-\\u31ff\\u3400-\\u4dbf\\u4e00-\\u9fff\\uf900-\\ufaff\\uac00-\\ud7af';
+const SEARCH_TOKEN_PATTERN = new RegExp(`([${CJK_CHARS}]+)|[\\p{L}\\p{N}]+`, 'gu');
+const CJK_CHAR_PATTERN = new RegExp(`[${CJK_CHARS}]`, 'u');
+
+// Terms of a text, in order. Plain ASCII takes a fast path. Other text is
+// NFKC-folded first, which maps full-width Latin and half-width kana to their
+// usual forms; diacritics are then stripped from Latin words only, since
+// decomposing kana or Hangul would split them into pieces.
+export const tokenizeSearchText = (text) => {
+  const lower = String(text).toLowerCase();
+  if (!/[^\x00-\x7f]/.test(lower)) return lower.match(/[a-z0-9]+/g) || [];
+
+  const terms = [];
+  const folded = String(text).normalize('NFKC').toLowerCase();
+  SEARCH_TOKEN_PATTERN.lastIndex = 0;
+  let match;
+  while ((match = SEARCH_TOKEN_PATTERN.exec(folded)) !== null) {
+    const [token, cjk] = match;
+    if (!cjk) {
+      terms.push(/[^\x00-\x7f]/.test(token) ? token.normalize('NFD').replace(/\p{M}/gu, '') : token);
+    } else if (cjk.length === 1) {
+      terms.push(cjk);
+    } else {
+      for (let i = 0; i < cjk.length - 1; i++) terms.push(cjk.slice(i, i + 2));
+    }
+  }
+  return terms;
+};
+
+const linkSearchTerms = (link) => {
+  let text = link;
+  try {
+    text = decodeURIComponent(link.replace(/\+/g, ' '));
+  } catch {
+    // Malformed escapes: index the raw link.
+  }
+  return tokenizeSearchText(text).filter(term => !SEARCH_LINK_NOISE.has(term));
+};
+
+export const createSearchIndex = () => {
+  // Stops live in numbered slots, so posting lists key on small integers and
+  // per-stop lengths sit in a plain array. Freed slots are reused.
+  const slotOfKey = new Map(); // key -> slot
+  const slotTerms = [];        // slot -> Map(term -> weight), null when free
+  const slotLengths = [];      // slot -> term count
+  const slotMeta = [];         // slot -> meta returned with hits
+  const freeSlots = [];
+  const postings = new Map();  // term -> Map(slot -> field-weighted term frequency)
+  const prefixes = new Map();  // first 1..SEARCH_PREFIX_KEY_LENGTH chars -> Set of terms
+  let totalLength = 0;
+  let version = 0;
+  let notifyQueued = false;
+  const listeners = new Set();
+
+  const changed = () => {
+    version++;
+    if (notifyQueued || listeners.size === 0) return;
+    notifyQueued = true;
+    queueMicrotask(() => {
+      notifyQueued = false;
+      listeners.forEach(listener => listener());
+    });
+  };
+
+  const prefixKeys = (term) => {
+    const keys = [];
+    for (let n = 1; n <= Math.min(SEARCH_PREFIX_KEY_LENGTH, term.length); n++) keys.push(term.slice(0, n));
+    return keys;
+  };
+
+  const remove = (key) => {
+    const slot = slotOfKey.get(key);
+    if (slot === undefined) return;
+    slotTerms[slot].forEach((_, term) => {
+      const list = postings.get(term);
+      list.delete(slot);
+      if (list.size > 0) return;
+      postings.delete(term);
+      prefixKeys(term).forEach(prefix => {
+        const terms = prefixes.get(prefix);
+        terms.delete(term);
+        if (terms.size === 0) prefixes.delete(prefix);
+      });
+    });
+    totalLength -= slotLengths[slot];
+    slotTerms[slot] = null;
+    slotMeta[slot] = null;
+    slotOfKey.delete(key);
+    freeSlots.push(slot);
+    changed();
+  };
+
+  // Indexes (or re-indexes) one stop under `key`; `meta` is returned with hits.
+  const add = (key, stop, meta) => {
+    remove(key);
+    const terms = new Map();
+    let length = 0;
+    Object.entries(SEARCH_FIELD_WEIGHTS).forEach(([field, weight]) => {
+      const value = stop[field];
+      if (!value) return;
+      const fieldTerms = field === 'googleLink' ? linkSearchTerms(value) : tokenizeSearchText(value);
+      fieldTerms.forEach(term => terms.set(term, (terms.get(term) || 0) + weight));
+      length += fieldTerms.length;
+    });
+
+    const slot = freeSlots.length ? freeSlots.pop() : slotTerms.length;
+    terms.forEach((weight, term) => {
+      let list = postings.get(term);
+      if (!list) {
+        list = new Map();
+        postings.set(term, list);
+        prefixKeys(term).forEach(prefix => {
+          if (!prefixes.has(prefix)) prefixes.set(prefix, new Set());
+          prefixes.get(prefix).add(term);
+        });
+      }
+      list.set(slot, weight);
+    });
+    slotOfKey.set(key, slot);
+    slotTerms[slot] = terms;
+    slotLengths[slot] = length;
+    slotMeta[slot] = meta;
+    totalLength += length;
+    changed();
+  };
+
+  // The term itself plus every indexed term it is a prefix of. Single Latin
+  // letters would expand to most of the vocabulary, so they only match exactly.
+  const expand = (term) => {
+    if (term.length < 2 && !CJK_CHAR_PATTERN.test(term)) return [term];
+    const bucket = prefixes.get(term.slice(0, SEARCH_PREFIX_KEY_LENGTH));
+    if (!bucket) return [term];
+    const terms = term.length <= SEARCH_PREFIX_KEY_LENGTH ? [...bucket] : [...bucket].filter(t => t.startsWith(term));
+    return terms.includes(term) ? terms : [term, ...terms];
+  };
+
+  // One query term as the posting lists it may match and their idf weights.
+  const matcher = (term, asPrefix) => {
+    const count = slotOfKey.size;
+    const lists = (asPrefix ? expand(term) : [term]).flatMap(candidate => {
+      const list = postings.get(candidate);
+      if (!list) return [];
+      const idf = Math.log(1 + (count - list.size + 0.5) / (list.size + 0.5));
+      return [{ list, weight: idf * (candidate === term ? 1 : SEARCH_PREFIX_BOOST) }];
+    });
+    return { lists, size: lists.reduce((sum, { list }) => sum + list.size, 0) };
+  };
+
+  // Best matches first: [{ ...meta, score }]. The smallest term drives the
+  // intersection; the others are only probed for its candidates.
+  const search = (query, { limit = 20 } = {}) => {
+    const terms = [...new Set(tokenizeSearchText(query))];
+    if (terms.length === 0 || slotOfKey.size === 0) return [];
+
+    const matchers = terms
+      .map((term, i) => matcher(term, i === terms.length - 1))
+      .sort((a, b) => a.size - b.size);
+    if (matchers[0].size === 0) return [];
+
+    const avgLength = totalLength / slotOfKey.size || 1;
+    const saturate = (tf, slot) =>
+      (tf * (SEARCH_BM25_K1 + 1)) /
+      (tf + SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * (slotLengths[slot] / avgLength)));
+    // BM25 contribution of a matcher's best list for one stop; 0 if absent.
+    const matchScore = ({ lists }, slot) => {
+      let best = 0;
+      for (const { list, weight } of lists) {
+        const tf = list.get(slot);
+        if (tf !== undefined) best = Math.max(best, weight * saturate(tf, slot));
+      }
+      return best;
+    };
+
+    const [driver, ...rest] = matchers;
+    const single = driver.lists.length === 1;
+    const seen = single ? null : new Set();
+    const top = []; // at most `limit`, best first
+    driver.lists.forEach(({ list, weight }) => list.forEach((tf, slot) => {
+      if (!single) {
+        if (seen.has(slot)) return;
+        seen.add(slot);
+      }
+      let total = single ? weight * saturate(tf, slot) : matchScore(driver, slot);
+      for (const other of rest) {
+        const score = matchScore(other, slot);
+        if (score === 0) return;
+        total += score;
+      }
+      if (top.length === limit && total <= top[limit - 1].score) return;
+      let i = top.length;
+      while (i > 0 && top[i - 1].score < total) i--;
+      top.splice(i, 0, { slot, score: total });
+      if (top.length > limit) top.pop();
+    }));
+    return top.map(({ slot, score }) => ({ ...slotMeta[slot], score }));
+  };
+
+  return {
+    add,
+    remove,
+    search,
+    subscribe(listener) {
+      listeners.add(listener);
+      return () => listeners.delete(listener);
+    },
+    getVersion: () => version,
+    has: (key) => slotOfKey.has(key),
+    size: () => slotOfKey.size,
+    termCount: () => postings.size
+  };
+};
+
+const searchKey = (tripId, stopId) => `${tripId}/${stopId}`;
+
+// Keeps the index in step with a trip store: loaded stops are indexed now,
+// and every stop the store reports as written, deleted or loaded is
+// re-indexed as it happens. Returns a function that stops listening; the
+// trip's entries stay, since they are still saved.
+export const connectSearchIndex = (index, store) => {
+  const indexStop = (stopId) => {
+    const tripId = store.getMeta().id;
+    const stop = store.getStop(stopId);
+    if (!stop) {
+      index.remove(searchKey(tripId, stopId));
+      return;
+    }
+    index.add(searchKey(tripId, stopId), stop, { tripId, dayId: store.getDayOfStop(stopId), stopId, name: stop.name });
+  };
+  const indexDay = (dayId) => store.getDayStopIds(dayId).forEach(indexStop);
+
+  store.getDayIds().forEach(dayId => store.isDayLoaded(dayId) && indexDay(dayId));
+  return store.onChange(changes => changes.forEach(({ kind, id }) => {
+    if (kind === 'stop') indexStop(id);
+    else if (kind === 'load') indexDay(id);
+  }));
+};
+
+// Indexes saved stops of every trip in the database, except days the live
+// store has loaded, whose entries it keeps current itself. Works in batches
+// of SEARCH_INDEX_BATCH stops, yielding in between so input stays responsive.
+export const indexSavedTrips = async (db, index, store) => {
+  const tx = db.transaction(PERSISTED_STORES, 'readonly');
+  const [trips, dayRows, stopRows] = await Promise.all(
+    PERSISTED_STORES.map(name => idbRequest(tx.objectStore(name).getAll()))
+  );
+  const titles = new Map(trips.map(trip => [trip.id, trip.title]));
+  const tripOfDay = new Map(dayRows.map(day => [day.id, day.tripId]));
+  const liveTripId = store.getMeta().id;
+  for (let start = 0; start < stopRows.length; start += SEARCH_INDEX_BATCH) {
+    if (start > 0) await sleep(0);
+    stopRows.slice(start, start + SEARCH_INDEX_BATCH).forEach(({ dayId, ...stop }) => {
+      const tripId = tripOfDay.get(dayId);
+      if (!tripId || (tripId === liveTripId && store.isDayLoaded(dayId))) return;
+      index.add(searchKey(tripId, stop.id), stop, { tripId, tripTitle: titles.get(tripId), dayId, stopId: stop.id, name: stop.name });
+    });
+  }
+};
@@ -0,0 +1,83 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { tokenizeSearchText, createSearchIndex } from './search.js';
+
+test('tokenizer lowercases Latin text and strips diacritics', () => {
+  assert.deepEqual(tokenizeSearchText('Tokyo Skytree 2F'), ['tokyo', 'skytree', '2f']);
+  assert.deepEqual(tokenizeSearchText('Café Crème'), ['cafe', 'creme']);
+  assert.deepEqual(tokenizeSearchText('Ramen-Lunch (¥1,200)'), ['ramen', 'lunch', '1', '200']);
+  assert.deepEqual(tokenizeSearchText(''), []);
+});
+
+test('tokenizer folds full-width and half-width forms', () => {
+  assert.deepEqual(tokenizeSearchText('ＴＯＫＹＯ'), ['tokyo']);
+  assert.deepEqual(tokenizeSearchText('ｶﾌｪ'), tokenizeSearchText('カフェ'));
+});
+
+test('tokenizer splits CJK runs into overlapping bigrams', () => {
+  assert.deepEqual(tokenizeSearchText('浅草寺'), ['浅草', '草寺']);
+  assert.deepEqual(tokenizeSearchText('東京タワー'), ['東京', '京タ', 'タワ', 'ワー']);
+  assert.deepEqual(tokenizeSearchText('서울역'), ['서울', '울역']);
+  assert.deepEqual(tokenizeSearchText('寺'), ['寺']);
+  assert.deepEqual(tokenizeSearchText('Senso-ji 浅草寺'), ['senso', 'ji', '浅草', '草寺']);
+});
+
+const buildIndex = (stops) => {
+  const index = createSearchIndex();
+  stops.forEach(stop => index.add(stop.id, stop, { id: stop.id }));
+  return index;
+};
+
+const ids = (hits) => hits.map(hit => hit.id);
+
+const STOPS = [
+  { id: 'tower', name: 'Tokyo Tower', remarks: 'Night view from the deck' },
+  { id: 'skytree', name: 'Tokyo Skytree', ticketInfo: 'Tower deck tickets in the app' },
+  { id: 'ramen', name: 'Ramen lunch', remarks: 'Near Tokyo station' },
+  { id: 'sensoji', name: '浅草寺', remarks: 'Senso-ji temple, go early' },
+  { id: 'map', name: 'Hotel', googleLink: 'https://www.google.com/maps/search/?api=1&query=Shinjuku+Gyoen' }
+];
+
+test('search requires every term and ranks name matches first', () => {
+  const index = buildIndex(STOPS);
+  assert.deepEqual(ids(index.search('tower')), ['tower', 'skytree']);
+  // Both have "tokyo" in the name; ticket info outweighs remarks.
+  assert.deepEqual(ids(index.search('tokyo deck')), ['skytree', 'tower']);
+  assert.deepEqual(ids(index.search('ramen tower')), []);
+  assert.ok(index.search('tower')[0].score > index.search('tower')[1].score);
+});
+
+test('search matches the last term as a prefix', () => {
+  const index = buildIndex(STOPS);
+  assert.deepEqual(ids(index.search('sky')), ['skytree']);
+  assert.deepEqual(ids(index.search('tokyo sta')), ['ramen']);
+  assert.deepEqual(ids(index.search('sta tokyo')), []);
+});
+
+test('search finds CJK substrings and words in map links', () => {
+  const index = buildIndex(STOPS);
+  assert.deepEqual(ids(index.search('浅草')), ['sensoji']);
+  assert.deepEqual(ids(index.search('草寺')), ['sensoji']);
+  assert.deepEqual(ids(index.search('gyoen')), ['map']);
+  assert.deepEqual(ids(index.search('google')), []);
+});
+
+test('re-adding a stop replaces its terms, and removing it frees them', () => {
+  const index = buildIndex(STOPS);
+  index.add('ramen', { name: 'Sushi dinner' }, { id: 'ramen' });
+  assert.deepEqual(ids(index.search('ramen')), []);
+  assert.deepEqual(ids(index.search('sushi')), ['ramen']);
+  const terms = index.termCount();
+  index.remove('ramen');
+  assert.equal(index.size(), STOPS.length - 1);
+  assert.equal(index.termCount(), terms - 2);
+  assert.deepEqual(ids(index.search('sushi')), []);
+});
+
+test('limit keeps the best hits', () => {
+  const index = buildIndex(Array.from({ length: 50 }, (_, i) => ({ id: `s${i}`, name: i === 37 ? 'Park park park' : `Park ${i} and a long tail of other words` })));
+  const hits = index.search('park', { limit: 5 });
+  assert.equal(hits.length, 5);
+  assert.equal(hits[0].id, 's37');
+  hits.slice(1).forEach((hit, i) => assert.ok(hit.score <= hits[i].score));
+});
@@ -0,0 +1,350 @@
+import { DEFAULT_TRAVEL_MODE, hasLocation } from './travel.js';
+import { parseTime, formatTime } from './schedule.js';
+import { DEFAULT_CURRENCY } from './expenses.js';
+
+// --- Share Links ---
+// Trips are shared as a compact binary payload in the URL fragment:
+//
+//   version byte, then length-prefixed frames: a trip header, then one frame
+//   per day, so a reader can render day 1 before later days are decoded.
+//
+// Strings are dictionary-coded across the whole payload (a varint index for
+// repeats, 0 + UTF-8 bytes on first use), categories are enum bytes, durations
+// and times are varint minutes and coordinates zigzag varints of 1e-5 degrees.
+// The result is deflate-compressed where CompressionStream exists and
+// base64url-encoded. Ids are not encoded; the receiver assigns fresh ones.
+// Links come from anyone, so the decoder checks every read against its frame
+// and caps the decompressed size: a corrupt or crafted link fails fast
+// instead of allocating without bound.
+
+// Version 2 widened the stop field mask from a byte to a varint.
+const SHARE_FORMAT_VERSION = 2;
+export const SHARE_HASH_PREFIX = '#trip=';
+const SHARE_CATEGORIES = ['sight', 'food', 'hotel', 'transport', 'coffee'];
+const SHARE_COORD_SCALE = 1e5;
+const SHARE_MAX_BYTES = 8 * 1024 * 1024; // decompressed
+const SHARE_MIN_STOP_BYTES = 4; // mask, name, category and duration
+
+// Presence bits for optional stop fields.
+const SHARE_FIELDS = {
+  type: 1,
+  startTime: 2,
+  ticketInfo: 4,
+  remarks: 8,
+  expenses: 16,
+  googleLink: 32,
+  location: 64,
+  pinned: 128,
+  fixedTime: 256,
+  openingHours: 512
+};
+
+export const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+const createByteWriter = (strings) => {
+  let buffer = new Uint8Array(256);
+  let length = 0;
+  const ensure = (n) => {
+    if (length + n <= buffer.length) return;
+    const next = new Uint8Array(Math.max(buffer.length * 2, length + n));
+    next.set(buffer);
+    buffer = next;
+  };
+  const writer = {
+    byte(value) {
+      ensure(1);
+      buffer[length++] = value;
+    },
+    varint(value) {
+      ensure(5);
+      let n = value >>> 0;
+      while (n >= 0x80) {
+        buffer[length++] = (n & 0x7f) | 0x80;
+        n >>>= 7;
+      }
+      buffer[length++] = n;
+    },
+    zigzag(value) {
+      writer.varint((value << 1) ^ (value >> 31));
+    },
+    bytes(data) {
+      ensure(data.length);
+      buffer.set(data, length);
+      length += data.length;
+    },
+    string(value) {
+      const index = strings.get(value);
+      if (index !== undefined) {
+        writer.varint(index + 1);
+        return;
+      }
+      strings.set(value, strings.size);
+      const encoded = textEncoder.encode(value);
+      writer.varint(0);
+      writer.varint(encoded.length);
+      writer.bytes(encoded);
+    },
+    finish: () => buffer.subarray(0, length)
+  };
+  return writer;
+};
+
+const corruptShareLink = () => new Error('Share link is corrupt');
+
+const createFrameReader = (bytes, strings) => {
+  let pos = 0;
+  const reader = {
+    remaining: () => bytes.length - pos,
+    byte() {
+      if (pos >= bytes.length) throw corruptShareLink();
+      return bytes[pos++];
+    },
+    varint() {
+      let result = 0;
+      let shift = 0;
+      let b;
+      do {
+        if (shift > 28) throw corruptShareLink();
+        b = reader.byte();
+        result |= (b & 0x7f) << shift;
+        shift += 7;
+      } while (b & 0x80);
+      return result >>> 0;
+    },
+    zigzag() {
+      const n = reader.varint();
+      return (n >>> 1) ^ -(n & 1);
+    },
+    string() {
+      const index = reader.varint();
+      if (index > strings.length) throw corruptShareLink();
+      if (index > 0) return strings[index - 1];
+      const length = reader.varint();
+      if (length > reader.remaining()) throw corruptShareLink();
+      const value = textDecoder.decode(bytes.subarray(pos, pos + length));
+      pos += length;
+      strings.push(value);
+      return value;
+    }
+  };
+  return reader;
+};
+
+const writeSharedStop = (w, stop) => {
+  let mask = 0;
+  Object.entries(SHARE_FIELDS).forEach(([field, bit]) => {
+    const present = field === 'location' ? hasLocation(stop) : !!stop[field];
+    if (present) mask |= bit;
+  });
+  w.varint(mask);
+  w.string(stop.name || '');
+  const category = SHARE_CATEGORIES.indexOf(stop.category);
+  w.byte(category < 0 ? 255 : category);
+  w.varint(stop.duration || 0);
+  if (mask & SHARE_FIELDS.type) w.string(stop.type);
+  if (mask & SHARE_FIELDS.startTime) w.varint(parseTime(stop.startTime));
+  if (mask & SHARE_FIELDS.ticketInfo) w.string(stop.ticketInfo);
+  if (mask & SHARE_FIELDS.remarks) w.string(stop.remarks);
+  if (mask & SHARE_FIELDS.expenses) w.string(stop.expenses);
+  if (mask & SHARE_FIELDS.googleLink) w.string(stop.googleLink);
+  if (mask & SHARE_FIELDS.openingHours) {
+    w.varint(parseTime(stop.openingHours.open));
+    w.varint(parseTime(stop.openingHours.close));
+  }
+  if (mask & SHARE_FIELDS.location) {
+    w.zigzag(Math.round(stop.location.lat * SHARE_COORD_SCALE));
+    w.zigzag(Math.round(stop.location.lng * SHARE_COORD_SCALE));
+  }
+};
+
+// Whether `link` is an absolute http(s) URL. A stop's googleLink is rendered
+// as a link, so anything else (javascript:, data:) is dropped from shared
+// trips, where a stranger chooses it.
+export const isWebLink = (link) => {
+  if (!link) return false;
+  try {
+    const { protocol } = new URL(link);
+    return protocol === 'https:' || protocol === 'http:';
+  } catch {
+    return false;
+  }
+};
+
+const readSharedStop = (r, id, version) => {
+  const mask = version === 1 ? r.byte() : r.varint();
+  const stop = { id, name: r.string() };
+  const category = r.byte();
+  stop.category = SHARE_CATEGORIES[category] || 'sight';
+  stop.duration = r.varint();
+  if (mask & SHARE_FIELDS.type) stop.type = r.string();
+  if (mask & SHARE_FIELDS.startTime) stop.startTime = formatTime(r.varint());
+  if (mask & SHARE_FIELDS.ticketInfo) stop.ticketInfo = r.string();
+  if (mask & SHARE_FIELDS.remarks) stop.remarks = r.string();
+  if (mask & SHARE_FIELDS.expenses) stop.expenses = r.string();
+  if (mask & SHARE_FIELDS.googleLink) {
+    const link = r.string();
+    if (isWebLink(link)) stop.googleLink = link;
+  }
+  if (mask & SHARE_FIELDS.openingHours) {
+    const open = formatTime(r.varint());
+    stop.openingHours = { open, close: formatTime(r.varint()) };
+  }
+  if (mask & SHARE_FIELDS.location) {
+    const lat = r.zigzag() / SHARE_COORD_SCALE;
+    stop.location = { lat, lng: r.zigzag() / SHARE_COORD_SCALE };
+  } else {
+    stop.location = { lat: 0, lng: 0 };
+  }
+  if (mask & SHARE_FIELDS.pinned) stop.pinned = true;
+  if (mask & SHARE_FIELDS.fixedTime) stop.fixedTime = true;
+  return stop;
+};
+
+// Uncompressed payload bytes for a nested trip.
+export const encodeTripBytes = (trip) => {
+  const strings = new Map();
+  const frames = [];
+
+  const header = createByteWriter(strings);
+  header.string(trip.title || '');
+  header.string(trip.startDate || '');
+  header.string(trip.travelMode || '');
+  header.string(trip.currency || '');
+  header.varint(trip.days.length);
+  frames.push(header.finish());
+
+  trip.days.forEach(day => {
+    const w = createByteWriter(strings);
+    w.string(day.date || '');
+    w.string(day.label || '');
+    w.varint(day.stops.length);
+    day.stops.forEach(stop => writeSharedStop(w, stop));
+    frames.push(w.finish());
+  });
+
+  const out = createByteWriter(strings);
+  out.byte(SHARE_FORMAT_VERSION);
+  frames.forEach(frame => {
+    out.varint(frame.length);
+    out.bytes(frame);
+  });
+  return out.finish();
+};
+
+export const toBase64Url = (bytes) => {
+  let binary = '';
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    binary += String.fromCharCode(...bytes.subarray(i, i + 0x8000));
+  }
+  return btoa(binary).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+};
+
+const fromBase64Url = (text) => {
+  const binary = atob(text.replace(/-/g, '+').replace(/_/g, '/'));
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return bytes;
+};
+
+const canCompress = () => typeof CompressionStream !== 'undefined';
+
+const pipeBytes = (bytes, transform) =>
+  new Blob([bytes]).stream().pipeThrough(transform);
+
+// "c" + base64url(deflate(payload)), or "r" + base64url(payload) when the
+// browser has no CompressionStream.
+export const encodeSharedTrip = async (trip) => {
+  const bytes = encodeTripBytes(trip);
+  if (!canCompress()) return `r${toBase64Url(bytes)}`;
+  const compressed = await new Response(pipeBytes(bytes, new CompressionStream('deflate-raw'))).arrayBuffer();
+  return `c${toBase64Url(new Uint8Array(compressed))}`;
+};
+
+// Pulls bytes from a ReadableStream on demand, so frames are decoded while
+// later ones are still being decompressed.
+const createStreamBuffer = (stream) => {
+  const reader = stream.getReader();
+  let buffer = new Uint8Array(0);
+  let pos = 0;
+  let received = 0;
+  const need = async (n) => {
+    while (buffer.length - pos < n) {
+      const { done, value } = await reader.read();
+      if (done) throw new Error('Share link is truncated');
+      received += value.length;
+      if (received > SHARE_MAX_BYTES) {
+        reader.cancel().catch(() => {});
+        throw new Error('Share link is too large');
+      }
+      const next = new Uint8Array(buffer.length - pos + value.length);
+      next.set(buffer.subarray(pos));
+      next.set(value, buffer.length - pos);
+      buffer = next;
+      pos = 0;
+    }
+  };
+  return {
+    async byte() {
+      await need(1);
+      return buffer[pos++];
+    },
+    async varint() {
+      let result = 0;
+      let shift = 0;
+      let b;
+      do {
+        if (shift > 28) throw corruptShareLink();
+        await need(1);
+        b = buffer[pos++];
+        result |= (b & 0x7f) << shift;
+        shift += 7;
+      } while (b & 0x80);
+      return result >>> 0;
+    },
+    async take(n) {
+      if (n > SHARE_MAX_BYTES) throw new Error('Share link is too large');
+      await need(n);
+      pos += n;
+      return buffer.subarray(pos - n, pos);
+    }
+  };
+};
+
+// Decodes a share payload, calling onTrip({ title, ..., dayCount }) once and
+// then onDay(day) for each day as soon as its frame is available.
+export const decodeSharedTrip = async (encoded, { onTrip, onDay }) => {
+  const bytes = fromBase64Url(encoded.slice(1));
+  const stream = encoded[0] === 'c'
+    ? pipeBytes(bytes, new DecompressionStream('deflate-raw'))
+    : new Blob([bytes]).stream();
+  const input = createStreamBuffer(stream);
+  const strings = [];
+
+  const version = await input.byte();
+  if (version < 1 || version > SHARE_FORMAT_VERSION) throw new Error(`Unsupported share link version ${version}`);
+
+  const header = createFrameReader(await input.take(await input.varint()), strings);
+  const trip = {
+    title: header.string(),
+    startDate: header.string(),
+    travelMode: header.string() || DEFAULT_TRAVEL_MODE,
+    currency: header.string() || DEFAULT_CURRENCY,
+    dayCount: header.varint()
+  };
+  onTrip(trip);
+
+  const idBase = `shared-${Date.now()}`;
+  for (let d = 0; d < trip.dayCount; d++) {
+    const r = createFrameReader(await input.take(await input.varint()), strings);
+    const day = { id: `${idBase}-d${d}`, date: r.string(), label: r.string() };
+    const stopCount = r.varint();
+    if (stopCount * SHARE_MIN_STOP_BYTES > r.remaining()) throw corruptShareLink();
+    day.stops = Array.from({ length: stopCount }, (_, i) => readSharedStop(r, `${idBase}-d${d}-s${i}`, version));
+    onDay(day);
+  }
+  return trip;
+};
+
+export const buildShareUrl = (encoded) =>
+  `${window.location.origin}${window.location.pathname}${SHARE_HASH_PREFIX}${encoded}`;
@@ -0,0 +1,89 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { isWebLink, encodeTripBytes, toBase64Url, encodeSharedTrip, decodeSharedTrip } from './shareLinks.js';
+
+const stop = (fields) => ({ id: 'x', name: 'Stop', category: 'sight', duration: 60, location: { lat: 0, lng: 0 }, ...fields });
+
+const TRIP = {
+  title: 'Coast to coast',
+  startDate: '2024-04-10',
+  travelMode: 'walk',
+  currency: 'USD',
+  days: [
+    {
+      date: '2024-04-10',
+      label: 'Day 1',
+      stops: [
+        stop({ name: 'Golden Gate Bridge', startTime: '09:15', fixedTime: true, location: { lat: 37.81992, lng: -122.47825 } }),
+        stop({ name: 'Lunch', category: 'food', duration: 45, expenses: '$25', remarks: 'Golden Gate Bridge view', pinned: true }),
+        stop({ name: 'Museum', duration: 100000, openingHours: { open: '10:00', close: '17:30' }, ticketInfo: 'Gate B' })
+      ]
+    },
+    { date: '2024-04-11', label: 'Day 2', stops: [] },
+    {
+      date: '2024-04-12',
+      label: 'Day 3',
+      stops: [stop({ name: 'Sydney Opera House', googleLink: 'https://maps.google.com/?q=Opera', location: { lat: -33.85678, lng: 151.21530 } })]
+    }
+  ]
+};
+
+const decodeAll = async (encoded) => {
+  let trip = null;
+  const days = [];
+  await decodeSharedTrip(encoded, { onTrip: (decoded) => { trip = decoded; }, onDay: (day) => days.push(day) });
+  return { trip, days };
+};
+
+// Fields the format carries, without the ids the decoder makes up.
+const sharedFields = ({ id, ...fields }) => fields;
+
+test('round-trips a trip through the compressed form', async () => {
+  const { trip, days } = await decodeAll(await encodeSharedTrip(TRIP));
+  assert.deepEqual(trip, { title: TRIP.title, startDate: TRIP.startDate, travelMode: 'walk', currency: 'USD', dayCount: 3 });
+  assert.deepEqual(days.map(day => [day.date, day.label]), TRIP.days.map(day => [day.date, day.label]));
+  assert.deepEqual(days.map(day => day.stops.map(sharedFields)), TRIP.days.map(day => day.stops.map(sharedFields)));
+});
+
+test('round-trips the raw form and keeps coordinates to 1e-5 degrees', async () => {
+  const trip = { ...TRIP, days: [{ date: '', label: '', stops: [stop({ location: { lat: -12.345678, lng: 179.999994 } })] }] };
+  const { days } = await decodeAll(`r${toBase64Url(encodeTripBytes(trip))}`);
+  assert.deepEqual(days[0].stops[0].location, { lat: -12.34568, lng: 179.99999 });
+});
+
+test('stores a repeated string once', () => {
+  const name = 'A fairly long name that repeats';
+  const once = encodeTripBytes({ ...TRIP, days: [{ date: '', label: '', stops: [stop({ name })] }] });
+  const twice = encodeTripBytes({ ...TRIP, days: [{ date: '', label: '', stops: [stop({ name }), stop({ name })] }] });
+  assert.ok(twice.length - once.length < name.length);
+});
+
+test('drops links that are not http(s) when decoding', async () => {
+  const hostile = [
+    'javascript:alert(document.cookie)',
+    ' JavaScript:alert(1)',
+    'data:text/html,<script>alert(1)</script>',
+    'vbscript:msgbox(1)',
+    '//evil.example/path'
+  ];
+  const trip = { ...TRIP, days: [{ date: '', label: '', stops: hostile.map(googleLink => stop({ googleLink })) }] };
+  const { days } = await decodeAll(await encodeSharedTrip(trip));
+  days[0].stops.forEach(decoded => assert.equal(decoded.googleLink, undefined));
+});
+
+test('isWebLink accepts only absolute http(s) URLs', () => {
+  assert.equal(isWebLink('https://maps.google.com/?q=Tokyo'), true);
+  assert.equal(isWebLink('http://goo.gl/maps/abc'), true);
+  assert.equal(isWebLink('javascript:alert(1)'), false);
+  assert.equal(isWebLink('maps.google.com'), false);
+  assert.equal(isWebLink(''), false);
+  assert.equal(isWebLink(undefined), false);
+});
+
+test('rejects truncated payloads and unknown versions', async () => {
+  const bytes = encodeTripBytes(TRIP);
+  await assert.rejects(decodeAll(`r${toBase64Url(bytes.subarray(0, bytes.length - 3))}`), /truncated|corrupt/);
+  const future = bytes.slice();
+  future[0] = 99;
+  await assert.rejects(decodeAll(`r${toBase64Url(future)}`), /Unsupported share link version 99/);
+});
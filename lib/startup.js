@@ -0,0 +1,117 @@
+import { summarizeLatencies } from './aiMetrics.js';
+import { geminiApiBase, getResponseStorage } from './gemini.js';
+
+// --- Startup ---
+// Work most sessions never need is kept out of the first paint. The modals
+// are a separate module (ui/modals.jsx) that the app imports dynamically: it
+// is fetched when the page is idle, or sooner when a modal mounts. A modal
+// mounts the first time it opens, or a moment earlier when the control that
+// opens it is hovered or focused. Warming the AI planner that way also
+// preconnects to the Gemini origin, so the first request skips the DNS and
+// TLS setup. Everything else is still imported statically, so the helpers
+// the modals share with the page arrive at startup. The compute worker and
+// the search index over saved trips start when the page is idle. Every load
+// records its startup timings and the script bytes it fetched, keyed by the
+// app module's URL (which bundlers fingerprint per build), so releases can be
+// compared over time.
+
+const STARTUP_IDLE_TIMEOUT_MS = 2000;
+const STARTUP_HISTORY_KEY = 'trip-startup-history';
+const STARTUP_HISTORY_RELEASES = 10;
+const STARTUP_HISTORY_SAMPLES = 20;
+
+// Runs `callback` when the main thread is idle (at most `timeout` ms later).
+// Returns a function that cancels it.
+export const whenIdle = (callback, timeout = STARTUP_IDLE_TIMEOUT_MS) => {
+  if (typeof requestIdleCallback === 'function') {
+    const id = requestIdleCallback(callback, { timeout });
+    return () => cancelIdleCallback(id);
+  }
+  const timer = setTimeout(callback, 1);
+  return () => clearTimeout(timer);
+};
+
+let geminiPreconnected = false;
+
+export const preconnectGemini = () => {
+  if (geminiPreconnected || typeof document === 'undefined') return;
+  geminiPreconnected = true;
+  const link = document.createElement('link');
+  link.rel = 'preconnect';
+  link.href = new URL(geminiApiBase).origin;
+  link.crossOrigin = 'anonymous'; // the Gemini helpers fetch in CORS mode
+  document.head.appendChild(link);
+};
+
+// Milliseconds since navigation start at which each phase was first reached.
+const startupMarks = { firstCommit: null, interactive: null };
+// The app module's URL and evaluation span; see recordModuleEvaluation.
+let startupModule = { release: null, startedAt: 0, evaluatedAt: 0 };
+
+// Called once by the app module when it has been evaluated, with the time it
+// started. Its URL keys the startup history.
+export const recordModuleEvaluation = (release, startedAt) => {
+  startupModule = { release, startedAt, evaluatedAt: performance.now() };
+};
+
+export const markStartup = (phase) => {
+  if (startupMarks[phase] === null) startupMarks[phase] = performance.now();
+};
+
+const scriptResourceBytes = () => {
+  const scripts = typeof performance.getEntriesByType === 'function'
+    ? performance.getEntriesByType('resource').filter(entry => entry.initiatorType === 'script' || /\.m?js(\?|$)/.test(entry.name))
+    : [];
+  return {
+    count: scripts.length,
+    transferBytes: scripts.reduce((sum, entry) => sum + (entry.transferSize || 0), 0),
+    decodedBytes: scripts.reduce((sum, entry) => sum + (entry.decodedBodySize || 0), 0)
+  };
+};
+
+// "Interactive" is the first idle period after the first commit: the page
+// has painted and no startup work is left queued on the main thread.
+export const getStartupReport = () => ({
+  release: startupModule.release,
+  moduleStartMs: Math.round(startupModule.startedAt),
+  moduleEvalMs: Math.round(startupModule.evaluatedAt - startupModule.startedAt),
+  firstCommitMs: startupMarks.firstCommit === null ? null : Math.round(startupMarks.firstCommit),
+  interactiveMs: startupMarks.interactive === null ? null : Math.round(startupMarks.interactive),
+  scripts: scriptResourceBytes()
+});
+
+const readStartupHistory = () => {
+  const storage = getResponseStorage();
+  try {
+    return (storage && JSON.parse(storage.getItem(STARTUP_HISTORY_KEY))) || [];
+  } catch {
+    return [];
+  }
+};
+
+// Appends this load's report to its release's samples, keeping the most
+// recent releases.
+export const saveStartupReport = () => {
+  const storage = getResponseStorage();
+  if (!storage) return;
+  const { release, ...sample } = getStartupReport();
+  const history = readStartupHistory();
+  const entry = history.find(item => item.release === release) || { release, samples: [] };
+  entry.samples = [...entry.samples, { ...sample, at: Date.now() }].slice(-STARTUP_HISTORY_SAMPLES);
+  try {
+    storage.setItem(STARTUP_HISTORY_KEY, JSON.stringify([...history.filter(item => item !== entry), entry].slice(-STARTUP_HISTORY_RELEASES)));
+  } catch {
+    // Storage full or disabled: the history is best-effort.
+  }
+};
+
+// Per release, oldest first: load count, percentiles of each timing and the
+// script bytes of the latest load.
+export const getStartupHistory = () => readStartupHistory().map(({ release, samples }) => ({
+  release,
+  loads: samples.length,
+  moduleEvalMs: summarizeLatencies(samples, 'moduleEvalMs'),
+  firstCommitMs: summarizeLatencies(samples, 'firstCommitMs'),
+  interactiveMs: summarizeLatencies(samples, 'interactiveMs'),
+  scripts: samples[samples.length - 1].scripts
+}));
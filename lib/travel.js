@@ -0,0 +1,85 @@
+import { createLruCache } from './cache.js';
+
+// --- Travel Times ---
+// Offline estimate: great-circle distance scaled by a per-mode detour factor
+// and speed, plus a fixed boarding/parking overhead, rounded up to 5 minutes.
+// Stops without coordinates fall back to DEFAULT_TRAVEL_MINUTES.
+
+export const DEFAULT_TRAVEL_MINUTES = 30;
+export const DEFAULT_TRAVEL_MODE = 'transit';
+export const EARTH_RADIUS_KM = 6371;
+export const DEG_TO_RAD = Math.PI / 180;
+
+export const TRAVEL_PROFILES = {
+  walk: { label: 'Walk', speedKmh: 4.5, detourFactor: 1.3, overheadMinutes: 0 },
+  transit: { label: 'Transit', speedKmh: 45, detourFactor: 1.25, overheadMinutes: 10 },
+  car: { label: 'Car', speedKmh: 35, detourFactor: 1.4, overheadMinutes: 5 }
+};
+
+const travelLegCache = createLruCache(5000);
+
+export const hasLocation = (stop) =>
+  !!stop.location && (stop.location.lat !== 0 || stop.location.lng !== 0);
+
+const haversineKm = (lat1, lng1, cosLat1, lat2, lng2, cosLat2) => {
+  const sinLat = Math.sin((lat2 - lat1) / 2);
+  const sinLng = Math.sin((lng2 - lng1) / 2);
+  const h = sinLat * sinLat + cosLat1 * cosLat2 * sinLng * sinLng;
+  return 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(h)));
+};
+
+export const travelMinutesForKm = (km, profile) =>
+  Math.ceil((km * profile.detourFactor * 60 / profile.speedKmh + profile.overheadMinutes) / 5) * 5;
+
+// Minutes from one stop to the next, memoized per coordinate pair and mode.
+// The scheduler asks for the same consecutive legs on every pass.
+export const travelLegMinutes = (from, to, mode = DEFAULT_TRAVEL_MODE) => {
+  if (!hasLocation(from) || !hasLocation(to)) return DEFAULT_TRAVEL_MINUTES;
+  const a = from.location;
+  const b = to.location;
+  const key = `${mode}:${a.lat},${a.lng}:${b.lat},${b.lng}`;
+  let minutes = travelLegCache.get(key);
+  if (minutes === undefined) {
+    const lat1 = a.lat * DEG_TO_RAD;
+    const lat2 = b.lat * DEG_TO_RAD;
+    const km = haversineKm(lat1, a.lng * DEG_TO_RAD, Math.cos(lat1), lat2, b.lng * DEG_TO_RAD, Math.cos(lat2));
+    minutes = travelMinutesForKm(km, TRAVEL_PROFILES[mode] || TRAVEL_PROFILES[DEFAULT_TRAVEL_MODE]);
+    travelLegCache.set(key, minutes);
+  }
+  return minutes;
+};
+
+// Full n x n matrix (row-major Int32Array) for a day's stops, computed in one
+// pass over packed radian/cosine arrays rather than leg by leg. It bypasses
+// the leg cache: a matrix has n² legs, enough to evict the whole cache once a
+// day passes about 70 stops, and a fresh string key per lookup would cost more
+// than the arithmetic. Both paths share haversineKm and travelMinutesForKm, so
+// the scheduler's legs always equal the matrix entries a route was optimized
+// with.
+export const buildTravelMatrix = (stops, mode = DEFAULT_TRAVEL_MODE) => {
+  const n = stops.length;
+  const profile = TRAVEL_PROFILES[mode] || TRAVEL_PROFILES[DEFAULT_TRAVEL_MODE];
+  const lat = new Float64Array(n);
+  const lng = new Float64Array(n);
+  const cosLat = new Float64Array(n);
+  const known = new Uint8Array(n);
+  for (let i = 0; i < n; i++) {
+    if (!hasLocation(stops[i])) continue;
+    known[i] = 1;
+    lat[i] = stops[i].location.lat * DEG_TO_RAD;
+    lng[i] = stops[i].location.lng * DEG_TO_RAD;
+    cosLat[i] = Math.cos(lat[i]);
+  }
+
+  const matrix = new Int32Array(n * n);
+  for (let i = 0; i < n; i++) {
+    for (let j = i + 1; j < n; j++) {
+      const minutes = known[i] && known[j]
+        ? travelMinutesForKm(haversineKm(lat[i], lng[i], cosLat[i], lat[j], lng[j], cosLat[j]), profile)
+        : DEFAULT_TRAVEL_MINUTES;
+      matrix[i * n + j] = minutes;
+      matrix[j * n + i] = minutes;
+    }
+  }
+  return matrix;
+};
@@ -0,0 +1,143 @@
+// --- Trip Store ---
+// Normalized trip state: days and stops live in id-keyed maps, with ordered id
+// lists per trip and per day. Writes replace only the touched entity, so
+// editing one stop costs O(1) no matter how large the trip is, and every other
+// day, stop and cached list keeps its identity. Components read through
+// useTripStore selectors and re-render only when their selection changes.
+// onChange listeners receive the touched entities ({ kind, id }) for
+// incremental persistence and indexing. A day given with `stops: null` is not
+// loaded yet; hydrateDayStops fills it in and reports { kind: 'load', id },
+// which is not a change to persist.
+
+export const createTripStore = (trip) => {
+  let meta = { id: trip.id, title: trip.title, startDate: trip.startDate, travelMode: trip.travelMode, currency: trip.currency };
+  let dayIds = trip.days.map(day => day.id);
+  const days = new Map();        // dayId -> { id, date, label }
+  const dayStopIds = new Map();  // dayId -> [stopId]
+  const stops = new Map();       // stopId -> stop
+  const dayOfStop = new Map();   // stopId -> dayId
+  const dayStopsCache = new Map(); // dayId -> [stop], dropped when the day changes
+  let daysCache = null;
+  const listeners = new Set();
+  const changeListeners = new Set();
+
+  const emit = (changes = []) => {
+    if (changes.length) changeListeners.forEach(listener => listener(changes));
+    listeners.forEach(listener => listener());
+  };
+
+  const fillDayStops = (dayId, dayStops) => {
+    dayStopIds.set(dayId, dayStops.map(stop => stop.id));
+    dayStops.forEach(stop => {
+      stops.set(stop.id, stop);
+      dayOfStop.set(stop.id, dayId);
+    });
+    dayStopsCache.set(dayId, dayStops);
+  };
+
+  const insertDay = ({ stops: dayStops = [], ...day }) => {
+    days.set(day.id, day);
+    if (dayStops) fillDayStops(day.id, dayStops);
+  };
+  trip.days.forEach(insertDay);
+
+  const getDayStops = (dayId) => {
+    let cached = dayStopsCache.get(dayId);
+    if (!cached) {
+      cached = (dayStopIds.get(dayId) || []).map(id => stops.get(id));
+      dayStopsCache.set(dayId, cached);
+    }
+    return cached;
+  };
+
+  return {
+    subscribe(listener) {
+      listeners.add(listener);
+      return () => listeners.delete(listener);
+    },
+    getMeta: () => meta,
+    getDayIds: () => dayIds,
+    getDay: (dayId) => days.get(dayId),
+    getDays() {
+      if (!daysCache) daysCache = dayIds.map(id => days.get(id));
+      return daysCache;
+    },
+    getStop: (stopId) => stops.get(stopId),
+    getDayOfStop: (stopId) => dayOfStop.get(stopId),
+    getDayStopIds: (dayId) => dayStopIds.get(dayId) || [],
+    getDayStops,
+    isDayLoaded: (dayId) => dayStopIds.has(dayId),
+    onChange(listener) {
+      changeListeners.add(listener);
+      return () => changeListeners.delete(listener);
+    },
+
+    setMeta(patch) {
+      meta = { ...meta, ...patch };
+      emit([{ kind: 'trip', id: meta.id }]);
+    },
+    updateDay(dayId, patch) {
+      days.set(dayId, { ...days.get(dayId), ...patch });
+      daysCache = null;
+      emit([{ kind: 'day', id: dayId }]);
+    },
+    // Appends days given in the nested { id, date, label, stops } shape.
+    addDays(newDays) {
+      newDays.forEach(insertDay);
+      dayIds = [...dayIds, ...newDays.map(day => day.id)];
+      daysCache = null;
+      emit([
+        { kind: 'trip', id: meta.id },
+        ...newDays.flatMap(day => [
+          { kind: 'day', id: day.id },
+          ...(day.stops || []).map(stop => ({ kind: 'stop', id: stop.id }))
+        ])
+      ]);
+    },
+    hydrateDayStops(dayId, dayStops) {
+      fillDayStops(dayId, dayStops);
+      emit([{ kind: 'load', id: dayId }]);
+    },
+    updateStop(stopId, updater) {
+      const stop = stops.get(stopId);
+      const next = stop && updater(stop);
+      if (!next || next === stop) return;
+      stops.set(stopId, next);
+      dayStopsCache.delete(dayOfStop.get(stopId));
+      emit([{ kind: 'stop', id: stopId }]);
+    },
+    // Replaces a day's stop list via updater(currentStops). The returned array
+    // becomes the cached list as-is; only stops whose object changed are written.
+    setDayStops(dayId, updater) {
+      const current = getDayStops(dayId);
+      const next = updater(current);
+      if (next === current) return;
+      const changes = [{ kind: 'day', id: dayId }];
+      const previousIds = dayStopIds.get(dayId) || [];
+      previousIds.forEach(id => dayOfStop.get(id) === dayId && dayOfStop.delete(id));
+      next.forEach(stop => {
+        if (stops.get(stop.id) !== stop) {
+          stops.set(stop.id, stop);
+          changes.push({ kind: 'stop', id: stop.id });
+        }
+        const previousDay = dayOfStop.get(stop.id);
+        if (previousDay && previousDay !== dayId) {
+          dayStopIds.set(previousDay, dayStopIds.get(previousDay).filter(id => id !== stop.id));
+          dayStopsCache.delete(previousDay);
+          changes.push({ kind: 'day', id: previousDay }, { kind: 'stop', id: stop.id });
+        }
+        dayOfStop.set(stop.id, dayId);
+      });
+      previousIds.forEach(id => {
+        if (dayOfStop.has(id)) return;
+        stops.delete(id);
+        changes.push({ kind: 'stop', id });
+      });
+      dayStopIds.set(dayId, next.map(stop => stop.id));
+      dayStopsCache.set(dayId, next);
+      emit(changes);
+    },
+    // Nested { ...meta, days: [{ ...day, stops }] } copy, e.g. for export.
+    toTrip: () => ({ ...meta, days: dayIds.map(id => ({ ...days.get(id), stops: getDayStops(id) })) })
+  };
+};
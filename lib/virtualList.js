@@ -0,0 +1,58 @@
+// --- Virtual List ---
+// Windowed rendering for long lists: only rows inside the viewport plus an
+// overscan margin are mounted. Row heights are measured once mounted and
+// remembered by key, so a reorder keeps them, and unseen rows use an estimate.
+// Offsets are prefix sums over the current order and the window is found by
+// binary search. The first visible row is kept as a scroll anchor and put
+// back in place whenever offsets change, so reorders and late measurements do
+// not make the view jump.
+
+export const VIRTUAL_OVERSCAN_PX = 600;
+
+// offsets[i] is the top of row i; offsets[keys.length] the total height.
+export const buildRowOffsets = (keys, heights, estimate) => {
+  const offsets = new Float64Array(keys.length + 1);
+  for (let i = 0; i < keys.length; i++) offsets[i + 1] = offsets[i] + (heights.get(keys[i]) ?? estimate);
+  return offsets;
+};
+
+// Index of the row containing `y`, clamped to the list.
+export const rowAtOffset = (offsets, y) => {
+  let lo = 0;
+  let hi = offsets.length - 2;
+  if (hi < 0) return 0;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (offsets[mid] <= y) lo = mid;
+    else hi = mid - 1;
+  }
+  return lo;
+};
+
+// [start, end) of the rows intersecting the viewport grown by `overscan`.
+export const visibleRows = (offsets, top, height, overscan) => {
+  const count = offsets.length - 1;
+  if (count <= 0) return [0, 0];
+  return [rowAtOffset(offsets, top - overscan), Math.min(count, rowAtOffset(offsets, top + height + overscan) + 1)];
+};
+
+// The mounted row elements, kept apart from the ResizeObserver watching them
+// so a new observer can be connected to the rows already in place.
+export const createRowRegistry = () => {
+  const elements = new Set();
+  let resize = null;
+  return {
+    observe(element) {
+      elements.add(element);
+      resize?.observe(element);
+    },
+    unobserve(element) {
+      elements.delete(element);
+      resize?.unobserve(element);
+    },
+    connect(next) {
+      resize = next;
+      elements.forEach(element => resize?.observe(element));
+    }
+  };
+};
@@ -1,7 +1,7 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { Profiler, useState, useEffect, useLayoutEffect, useMemo, useRef, useCallback, useSyncExternalStore } from 'react';
 import { 
-  Map, 
-  Calendar, 
+  Map as MapIcon, 
+  CalendarRange,
   Clock, 
   MapPin, 
   Plus, 
@@ -10,6 +10,8 @@ import {
   MoveDown,
   Navigation,
   Car,
+  Footprints,
+  Train,
   Utensils,
   Camera,
   Hotel,
@@ -22,97 +24,53 @@ import {
   Link as LinkIcon,
   X,
   Sparkles,
+  Lightbulb,
   Loader2,
-  Banknote
+  Banknote,
+  Lock,
+  Search,
+  AlertTriangle
 } from 'lucide-react';
-
-// --- Gemini API Helpers ---
-
-const generateGeminiContent = async (prompt, schema = null) => {
-  const apiKey = ""; // Runtime injection
-  try {
-    const payload = {
-      contents: [{ parts: [{ text: prompt }] }],
-      generationConfig: {
-        responseMimeType: schema ? "application/json" : "text/plain",
-      }
-    };
-
-    if (schema) {
-      payload.generationConfig.responseSchema = schema;
-    }
-
-    const response = await fetch(
-      `https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-09-2025:generateContent?key=${apiKey}`,
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload)
-      }
-    );
-
-    const data = await response.json();
-    const text = data.candidates?.[0]?.content?.parts?.[0]?.text;
-    
-    if (schema && text) {
-      return JSON.parse(text);
-    }
-    return text;
-  } catch (error) {
-    console.error("Gemini API Error:", error);
-    return null;
-  }
-};
-
-// --- Mock Data & Types ---
-
-const INITIAL_TRIP = {
-  id: 'trip-1',
-  title: 'Weekend in Tokyo',
-  startDate: '2024-04-10',
-  days: [
-    {
-      id: 'day-1',
-      date: '2024-04-10',
-      label: 'Day 1',
-      stops: [
-        { 
-          id: 's1', 
-          type: 'transport', 
-          name: 'Arrive at Narita Airport', 
-          startTime: '10:00', 
-          duration: 60, 
-          category: 'transport',
-          ticketInfo: 'Flight JL123',
-          remarks: 'Pick up pocket WiFi at terminal',
-          expenses: '¥2,000'
-        },
-        { 
-          id: 's2', 
-          type: 'visit', 
-          name: 'Check-in Hotel Shinjuku', 
-          startTime: '12:00', 
-          duration: 45, 
-          category: 'hotel',
-          googleLink: 'https://maps.google.com/?q=Shinjuku+Hotel',
-          expenses: '¥15,000'
-        },
-        { id: 's3', type: 'food', name: 'Ramen Lunch', startTime: '13:00', duration: 60, category: 'food', expenses: '¥1,200' },
-        { id: 's4', type: 'sight', name: 'Meiji Jingu Shrine', startTime: '14:30', duration: 90, category: 'sight', expenses: 'Free' },
-        { id: 's5', type: 'sight', name: 'Shibuya Crossing', startTime: '16:30', duration: 60, category: 'sight' },
-      ]
-    },
-    {
-      id: 'day-2',
-      date: '2024-04-11',
-      label: 'Day 2',
-      stops: [
-        { id: 's6', type: 'food', name: 'Breakfast at Tsukiji', startTime: '08:00', duration: 90, category: 'food', expenses: '¥3,500' },
-        { id: 's7', type: 'sight', name: 'TeamLab Planets', startTime: '10:00', duration: 120, category: 'sight', ticketInfo: 'QR Code saved in gallery', expenses: '¥3,200' },
-      ]
-    }
-  ]
-};
+import {
+  generateGeminiContent, appendTip, fetchTipsForStops, addDaysToDate
+} from './lib/gemini.js';
+import { INITIAL_TRIP } from './lib/sampleTrip.js';
+import { DEFAULT_TRAVEL_MODE, TRAVEL_PROFILES, hasLocation } from './lib/travel.js';
+import {
+  formatTimeLabel, formatDuration, EMPTY_SCHEDULE, updateIncrementalSchedule
+} from './lib/schedule.js';
+import { optimizeDayOrder } from './lib/route.js';
+import { splitStopsIntoDays } from './lib/daySplitter.js';
+import { createTripStore } from './lib/tripStore.js';
+import { createConflictIndex } from './lib/conflicts.js';
+import {
+  openTripDatabase, getLastOpenedTripId, setLastOpenedTripId, loadTripSkeleton,
+  connectTripPersistence
+} from './lib/persistence.js';
+import { createSearchIndex, connectSearchIndex, indexSavedTrips } from './lib/search.js';
+import { stopsCentroid, locateStops, locateEditedStop } from './lib/geocoding.js';
+import {
+  SHARE_HASH_PREFIX, isWebLink, encodeSharedTrip, decodeSharedTrip, buildShareUrl
+} from './lib/shareLinks.js';
+import { FX_RATES_AS_OF, DEFAULT_CURRENCY, formatMoney, summarizeStops } from './lib/expenses.js';
+import { createComputeClient } from './lib/compute.js';
+import {
+  VIRTUAL_OVERSCAN_PX, buildRowOffsets, rowAtOffset, visibleRows, createRowRegistry
+} from './lib/virtualList.js';
+import {
+  RENDER_PROFILING, traceHandler, recordRender, getRenderProfile, resetRenderProfile,
+  exportRenderProfile
+} from './lib/renderProfiling.js';
+import {
+  whenIdle, preconnectGemini, recordModuleEvaluation, markStartup, saveStartupReport
+} from './lib/startup.js';
+import { profiled } from './ui/profiled.jsx';
+
+// Read before the rest of this module is evaluated (its imports already
+// are); see lib/startup.js.
+const MODULE_STARTED_AT = performance.now();
+
+// --- Icons & Colors ---
 
 const CATEGORY_ICONS = {
   transport: Navigation,
@@ -123,6 +81,12 @@ const CATEGORY_ICONS = {
   default: MapPin
 };
 
+const TRAVEL_MODE_ICONS = {
+  walk: Footprints,
+  transit: Train,
+  car: Car
+};
+
 const CATEGORY_COLORS = {
   transport: 'bg-blue-100 text-blue-600',
   hotel: 'bg-purple-100 text-purple-600',
@@ -132,41 +96,134 @@ const CATEGORY_COLORS = {
   default: 'bg-gray-100 text-gray-600'
 };
 
-// --- Helper Functions ---
+// --- Hooks ---
+
+const useTripStore = (store, selector) =>
+  useSyncExternalStore(store.subscribe, () => selector(store));
 
-const addMinutes = (timeStr, mins) => {
-  const [h, m] = timeStr.split(':').map(Number);
-  const totalMins = h * 60 + m + mins;
-  const newH = Math.floor(totalMins / 60) % 24;
-  const newM = totalMins % 60;
-  return `${String(newH).padStart(2, '0')}:${String(newM).padStart(2, '0')}`;
+// [mounted, mountEarly]: false until `open` is first true or mountEarly() is
+// called, so a modal renders nothing and runs no hooks before it is needed.
+const useLazyMount = (open) => {
+  const [early, setEarly] = useState(false);
+  const [opened, setOpened] = useState(open);
+  if (open && !opened) setOpened(true);
+  const mountEarly = useCallback(() => setEarly(true), []);
+  return [opened || early, mountEarly];
 };
 
-const calculateSchedule = (stops) => {
-  if (stops.length === 0) return [];
-  
-  let currentStartTime = stops[0].startTime; 
-  
-  return stops.map((stop, index) => {
-    if (index > 0) {
-      const prevStop = stops[index - 1];
-      const travelTime = 30; 
-      currentStartTime = addMinutes(prevStop.startTime, prevStop.duration + travelTime);
+// Tracks the visible window of `keys` laid out in listRef inside the scroll
+// container scrollRef. Rows are measured through `observer` unless every row
+// is `rowHeight` tall.
+const useVirtualWindow = ({ scrollRef, listRef, keys, estimateHeight = 120, rowHeight = 0, overscan = VIRTUAL_OVERSCAN_PX }) => {
+  const heightsRef = useRef(new Map());
+  const [measured, setMeasured] = useState(0);
+  const [range, setRange] = useState(() => [0, Math.min(keys.length, 20)]);
+  const anchorRef = useRef(null);
+
+  const offsets = useMemo(() => (rowHeight > 0
+    ? Float64Array.from({ length: keys.length + 1 }, (_, i) => i * rowHeight)
+    : buildRowOffsets(keys, heightsRef.current, estimateHeight)
+  ), [keys, measured, estimateHeight, rowHeight]);
+  const offsetsRef = useRef(offsets);
+  offsetsRef.current = offsets;
+  const keysRef = useRef(keys);
+  keysRef.current = keys;
+
+  // Scroll position measured from the top of the list.
+  const listScrollTop = () => {
+    const scroll = scrollRef.current;
+    return scroll.getBoundingClientRect().top + scroll.clientTop - listRef.current.getBoundingClientRect().top;
+  };
+
+  const updateRange = useCallback(() => {
+    if (!scrollRef.current || !listRef.current) return;
+    const top = listScrollTop();
+    const rows = offsetsRef.current;
+    const rowKeys = keysRef.current;
+    if (top > 0 && rowKeys.length > 0) {
+      const index = rowAtOffset(rows, top);
+      anchorRef.current = { key: rowKeys[index], delta: top - rows[index] };
+    } else {
+      anchorRef.current = null;
     }
-    return { ...stop, startTime: currentStartTime };
-  });
+    const [start, end] = visibleRows(rows, top, scrollRef.current.clientHeight, overscan);
+    setRange(prev => (prev[0] === start && prev[1] === end ? prev : [start, end]));
+  }, [scrollRef, listRef, overscan]);
+
+  useEffect(() => {
+    const scroll = scrollRef.current;
+    if (!scroll) return;
+    scroll.addEventListener('scroll', updateRange, { passive: true });
+    const resize = new ResizeObserver(updateRange);
+    resize.observe(scroll);
+    return () => {
+      scroll.removeEventListener('scroll', updateRange);
+      resize.disconnect();
+    };
+  }, [scrollRef, updateRange]);
+
+  // Put the anchor row back where it was, then recompute the window.
+  useLayoutEffect(() => {
+    const anchor = anchorRef.current;
+    if (anchor && scrollRef.current && listRef.current) {
+      const index = keys.indexOf(anchor.key);
+      if (index >= 0) {
+        const drift = offsets[index] + anchor.delta - listScrollTop();
+        if (Math.abs(drift) >= 1) scrollRef.current.scrollTop += drift;
+      }
+    }
+    updateRange();
+  }, [offsets]);
+
+  // Rows register with a registry that outlives the ResizeObserver. The
+  // observer belongs to the effect, so a StrictMode remount disconnects it
+  // and its successor picks up every row still mounted.
+  const rowsRef = useRef(null);
+  if (!rowsRef.current) rowsRef.current = createRowRegistry();
+  useEffect(() => {
+    if (rowHeight > 0) return;
+    const resize = new ResizeObserver(entries => {
+      let changed = false;
+      entries.forEach(entry => {
+        const height = entry.borderBoxSize?.[0]?.blockSize ?? entry.target.offsetHeight;
+        const key = entry.target.dataset.key;
+        if (height > 0 && heightsRef.current.get(key) !== height) {
+          heightsRef.current.set(key, height);
+          changed = true;
+        }
+      });
+      if (changed) setMeasured(version => version + 1);
+    });
+    const rows = rowsRef.current;
+    rows.connect(resize);
+    return () => {
+      rows.connect(null);
+      resize.disconnect();
+    };
+  }, [rowHeight]);
+  const observer = rowHeight > 0 ? null : rowsRef.current;
+
+  return { start: range[0], end: range[1], offsets, observer };
+};
+
+// The open day's schedule, updated incrementally (see lib/schedule.js).
+const useIncrementalSchedule = (stops, travelMode) => {
+  const stateRef = useRef(EMPTY_SCHEDULE);
+  return useMemo(() => {
+    stateRef.current = updateIncrementalSchedule(stateRef.current, stops, travelMode);
+    return stateRef.current.scheduled;
+  }, [stops, travelMode]);
 };
 
 // --- Components ---
 
-const Header = ({ title, days, activeDayId, onEditDay }) => {
-  const activeDay = days.find(d => d.id === activeDayId);
+const Header = React.memo(profiled('Header', ({ title, activeDay, onEditDay, onSave, saveState, onShare, shareState }) => {
   return (
     <div className="bg-white shadow-sm z-20 relative">
       <div className="flex items-center justify-between px-4 py-3 border-b border-gray-100">
         <div className="flex items-center gap-3">
           <div className="w-10 h-10 bg-emerald-500 rounded-xl flex items-center justify-center text-white shadow-emerald-200 shadow-lg">
-            <Map size={20} />
+            <MapIcon size={20} />
           </div>
           <div>
             <h1 className="font-bold text-gray-800 text-lg leading-tight">{title}</h1>
@@ -180,19 +237,86 @@ const Header = ({ title, days, activeDayId, onEditDay }) => {
           </div>
         </div>
         <div className="flex gap-2">
-           <button className="p-2 text-gray-400 hover:text-gray-600 hover:bg-gray-50 rounded-full transition-colors">
-            <Share2 size={20} />
+           <button
+            onClick={onShare}
+            disabled={shareState === 'sharing'}
+            className="p-2 text-gray-400 hover:text-gray-600 hover:bg-gray-50 rounded-full transition-colors"
+            title={shareState === 'copied' ? 'Link copied' : 'Copy share link'}
+          >
+            {shareState === 'sharing' ? <Loader2 size={20} className="animate-spin" /> : <Share2 size={20} className={shareState === 'copied' ? 'text-emerald-600' : ''} />}
           </button>
-          <button className="p-2 text-emerald-600 bg-emerald-50 hover:bg-emerald-100 rounded-full transition-colors">
-            <Save size={20} />
+          <button
+            onClick={onSave}
+            disabled={saveState === 'saving'}
+            className={`p-2 rounded-full transition-colors ${saveState === 'error' ? 'text-red-600 bg-red-50 hover:bg-red-100' : 'text-emerald-600 bg-emerald-50 hover:bg-emerald-100'}`}
+            title={saveState === 'saved' ? 'All changes saved' : saveState === 'error' ? 'Could not save changes. Click to retry' : 'Save'}
+          >
+            {saveState === 'saving' ? <Loader2 size={20} className="animate-spin" /> : saveState === 'error' ? <AlertTriangle size={20} /> : <Save size={20} />}
           </button>
         </div>
       </div>
     </div>
   );
+}));
+
+// Searches the stops of every trip. Hits in the open trip jump to their day;
+// hits in other saved trips are listed under that trip's title.
+const TripSearch = ({ index, store, onSelectDay }) => {
+  const [query, setQuery] = useState('');
+  const tripId = useTripStore(store, s => s.getMeta().id);
+  // The index changes under us (saved trips indexed at idle, edits), so the
+  // results depend on its version as well as the query.
+  const version = useSyncExternalStore(index.subscribe, index.getVersion);
+  const results = useMemo(() => (query.trim() ? index.search(query, { limit: 8 }) : []), [index, query, version]);
+
+  return (
+    <div className="relative px-4 py-2 border-b border-gray-100 bg-white">
+      <div className="flex items-center gap-2 bg-gray-50 rounded-lg px-3 py-1.5">
+        <Search size={14} className="text-gray-400" />
+        <input
+          type="search"
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          onKeyDown={(e) => e.key === 'Escape' && setQuery('')}
+          placeholder="Search stops, tickets, notes…"
+          className="flex-1 bg-transparent text-sm outline-none placeholder-gray-400"
+        />
+        {query && (
+          <button onClick={() => setQuery('')} className="text-gray-400 hover:text-gray-600" title="Clear search">
+            <X size={14} />
+          </button>
+        )}
+      </div>
+      {query.trim() && (
+        <ul className="absolute left-4 right-4 mt-1 bg-white rounded-lg shadow-lg border border-gray-100 z-30 max-h-80 overflow-y-auto">
+          {results.length === 0 && <li className="px-3 py-2 text-xs text-gray-400">No matching stops</li>}
+          {results.map(hit => {
+            const inTrip = hit.tripId === tripId;
+            return (
+              <li key={`${hit.tripId}/${hit.stopId}`}>
+                <button
+                  disabled={!inTrip}
+                  onClick={() => {
+                    onSelectDay(hit.dayId);
+                    setQuery('');
+                  }}
+                  className="w-full text-left px-3 py-2 hover:bg-emerald-50 disabled:hover:bg-transparent disabled:cursor-default"
+                >
+                  <div className="text-sm font-medium text-gray-800 truncate">{hit.name}</div>
+                  <div className="text-xs text-gray-400 truncate">
+                    {inTrip ? store.getDay(hit.dayId)?.label : hit.tripTitle || 'Another trip'}
+                  </div>
+                </button>
+              </li>
+            );
+          })}
+        </ul>
+      )}
+    </div>
+  );
 };
 
-const DayTabs = ({ days, activeDayId, setActiveDayId, onAddDay, onEditDay, onOpenAI }) => {
+const DayTabs = React.memo(profiled('DayTabs', ({ days, activeDayId, setActiveDayId, onAddDay, onEditDay, onOpenAI, onWarmAI, onEnrichDay, isEnrichingDay, infeasibleDayIds = [], conflictDayIds = [] }) => {
   return (
     <div className="flex overflow-x-auto bg-white border-b border-gray-100 px-4 pt-2 no-scrollbar">
       {days.map((day) => (
@@ -206,7 +330,14 @@ const DayTabs = ({ days, activeDayId, setActiveDayId, onAddDay, onEditDay, onOpe
               : 'border-transparent text-gray-400 hover:text-gray-600'
           }`}
         >
-          {day.label}
+          <span className="flex items-center gap-1">
+            {day.label}
+            {(infeasibleDayIds.includes(day.id) || conflictDayIds.includes(day.id)) && (
+              <span title={conflictDayIds.includes(day.id) ? 'Some stops on this day overlap or run past midnight' : 'Some times on this day cannot be met'}>
+                <AlertTriangle size={12} className="text-red-500" />
+              </span>
+            )}
+          </span>
           <span className="block text-[10px] font-normal opacity-70 mt-0.5">{day.date}</span>
           
           {/* Edit Icon on active tab */}
@@ -236,40 +367,68 @@ const DayTabs = ({ days, activeDayId, setActiveDayId, onAddDay, onEditDay, onOpe
       {/* Magic AI Button */}
       <button
         onClick={onOpenAI}
+        onMouseEnter={onWarmAI}
+        onFocus={onWarmAI}
         className="ml-auto flex-shrink-0 flex items-center gap-1.5 px-3 py-1 my-2 text-xs font-bold text-violet-600 bg-violet-50 hover:bg-violet-100 rounded-lg transition-colors border border-violet-100"
       >
         <Sparkles size={14} />
         Magic Plan
       </button>
+
+      <button
+        onClick={onEnrichDay}
+        disabled={isEnrichingDay}
+        className="ml-2 flex-shrink-0 flex items-center gap-1.5 px-3 py-1 my-2 text-xs font-bold text-violet-600 hover:bg-violet-50 rounded-lg transition-colors border border-violet-100 disabled:opacity-60"
+        title="Get AI tips for every stop of this day"
+      >
+        {isEnrichingDay ? <Loader2 size={14} className="animate-spin" /> : <Lightbulb size={14} />}
+        Day Tips
+      </button>
     </div>
   );
-};
+}));
 
-const StopCard = ({ stop, index, isLast, onMoveUp, onMoveDown, onDelete, onChangeDuration, onEdit, onEnrich }) => {
+const StopCard = React.memo(profiled('StopCard', ({ stop, index, isLast, travelMode, onMoveUp, onMoveDown, onDelete, onChangeDuration, onEdit, onEnrich, conflict }) => {
   const Icon = CATEGORY_ICONS[stop.category] || CATEGORY_ICONS.default;
   const colorClass = CATEGORY_COLORS[stop.category] || CATEGORY_COLORS.default;
-  const endTime = addMinutes(stop.startTime, stop.duration);
+  const TravelIcon = TRAVEL_MODE_ICONS[travelMode] || TRAVEL_MODE_ICONS[DEFAULT_TRAVEL_MODE];
+  const startTime = formatTimeLabel(stop.startMinutes);
+  const endTime = formatTimeLabel(stop.endMinutes);
+  // Stops can come from share links, so only web links are rendered as links.
+  const mapLink = isWebLink(stop.googleLink) ? stop.googleLink : null;
   const [isEnriching, setIsEnriching] = useState(false);
+  const enrichControllerRef = useRef(null);
+
+  // Cancel an in-flight tip request if the card goes away.
+  useEffect(() => () => enrichControllerRef.current?.abort(), []);
 
   const handleEnrich = async (e) => {
     e.stopPropagation();
+    const controller = new AbortController();
+    enrichControllerRef.current = controller;
     setIsEnriching(true);
-    await onEnrich(stop);
-    setIsEnriching(false);
+    await onEnrich(stop, controller.signal);
+    if (!controller.signal.aborted) setIsEnriching(false);
   };
 
   return (
     <div className="relative flex group">
       {/* Timeline Line */}
       <div className="flex flex-col items-center mr-4 min-w-[50px]">
-        <div className="text-xs font-semibold text-gray-600 mb-1">{stop.startTime}</div>
+        {stop.slackMinutes > 0 && (
+          <div className="text-[10px] text-gray-400 mb-0.5" title="Waiting time before this stop">wait {formatDuration(stop.slackMinutes)}</div>
+        )}
+        <div className={`text-xs font-semibold mb-1 flex items-center gap-0.5 ${stop.overrunMinutes > 0 ? 'text-red-500' : 'text-gray-600'}`}>
+          {stop.fixedTime && <Lock size={9} />}
+          {startTime}
+        </div>
         <div className={`relative z-10 w-8 h-8 rounded-full flex items-center justify-center ${colorClass} shadow-sm border-2 border-white`}>
           <Icon size={14} />
         </div>
         {!isLast && (
           <div className="w-0.5 h-full bg-gray-200 my-1 relative">
             <div className="absolute top-1/2 left-1/2 -translate-x-1/2 -translate-y-1/2 bg-gray-50 text-[10px] text-gray-400 border border-gray-100 px-1.5 py-0.5 rounded-full flex items-center gap-1 whitespace-nowrap">
-              <Car size={8} /> 30m
+              <TravelIcon size={8} /> {formatDuration(stop.travelToNext)}
             </div>
           </div>
         )}
@@ -279,7 +438,9 @@ const StopCard = ({ stop, index, isLast, onMoveUp, onMoveDown, onDelete, onChang
       <div className="flex-1 pb-6">
         <div 
           onClick={() => onEdit(stop)}
-          className="bg-white p-4 rounded-xl border border-gray-100 shadow-sm hover:shadow-md transition-shadow group-hover:border-emerald-100 cursor-pointer"
+          className={`bg-white p-4 rounded-xl border shadow-sm hover:shadow-md transition-shadow cursor-pointer ${
+            conflict ? 'border-red-200' : 'border-gray-100 group-hover:border-emerald-100'
+          }`}
         >
           <div className="flex justify-between items-start mb-2">
             <h3 className="font-bold text-gray-800">{stop.name}</h3>
@@ -328,8 +489,31 @@ const StopCard = ({ stop, index, isLast, onMoveUp, onMoveDown, onDelete, onChang
             </div>
           </div>
 
+          {stop.overrunMinutes > 0 && (
+            <div className="flex items-center gap-2 text-xs text-red-600 bg-red-50 p-1.5 rounded border border-red-100 mb-3">
+              <AlertTriangle size={12} className="flex-shrink-0" />
+              <span>
+                {stop.fixedTime
+                  ? `Arrives ${formatDuration(stop.overrunMinutes)} after the fixed ${stop.startTime} start`
+                  : `Runs ${formatDuration(stop.overrunMinutes)} past closing (${stop.openingHours.close})`}
+              </span>
+            </div>
+          )}
+
+          {conflict && (
+            <div className="flex items-center gap-2 text-xs text-red-600 bg-red-50 p-1.5 rounded border border-red-100 mb-3">
+              <AlertTriangle size={12} className="flex-shrink-0" />
+              <span className="truncate">
+                {[
+                  conflict.overlaps.length > 0 && `Overlaps ${conflict.overlaps.map(other => other.name).join(', ')}`,
+                  conflict.pastMidnight && 'Runs past midnight'
+                ].filter(Boolean).join(' • ')}
+              </span>
+            </div>
+          )}
+
           {/* Additional Fields Display */}
-          {(stop.ticketInfo || stop.googleLink || stop.expenses || stop.remarks) && (
+          {(stop.ticketInfo || mapLink || stop.expenses || stop.remarks) && (
             <div className="space-y-1.5 pt-2 border-t border-gray-50">
                {stop.expenses && (
                 <div className="flex items-center gap-2 text-xs text-emerald-600 bg-emerald-50/50 p-1.5 rounded border border-emerald-100/50">
@@ -343,8 +527,8 @@ const StopCard = ({ stop, index, isLast, onMoveUp, onMoveDown, onDelete, onChang
                   <span className="truncate font-medium">{stop.ticketInfo}</span>
                 </div>
               )}
-              {stop.googleLink && (
-                 <a href={stop.googleLink} target="_blank" rel="noreferrer" className="flex items-center gap-2 text-xs text-blue-600 hover:underline hover:bg-blue-50 p-1.5 rounded transition-colors">
+              {mapLink && (
+                 <a href={mapLink} target="_blank" rel="noreferrer" className="flex items-center gap-2 text-xs text-blue-600 hover:underline hover:bg-blue-50 p-1.5 rounded transition-colors">
                    <LinkIcon size={12} className="flex-shrink-0" />
                    <span className="truncate">Open Map Location</span>
                  </a>
@@ -367,11 +551,53 @@ const StopCard = ({ stop, index, isLast, onMoveUp, onMoveDown, onDelete, onChang
       </div>
     </div>
   );
+}));
+
+const MeasuredRow = ({ rowKey, observer, children }) => {
+  const ref = useRef(null);
+  useLayoutEffect(() => {
+    const element = ref.current;
+    observer.observe(element);
+    return () => observer.unobserve(element);
+  }, [observer]);
+  return <div ref={ref} data-key={rowKey}>{children}</div>;
 };
 
-const AddStopButton = ({ onClick }) => (
+// Renders the visible window of `items` inside the scroll container
+// scrollRef, with padding standing in for the rows that are not mounted.
+const VirtualList = ({ scrollRef, items, getKey, renderItem, estimateHeight, rowHeight = 0 }) => {
+  const listRef = useRef(null);
+  const keys = useMemo(() => items.map(getKey), [items]);
+  const { start, end, offsets, observer } = useVirtualWindow({ scrollRef, listRef, keys, estimateHeight, rowHeight });
+  // The window can trail a shrinking list by one render.
+  const first = Math.min(start, items.length);
+  const last = Math.min(end, items.length);
+
+  return (
+    <div ref={listRef} style={{ paddingTop: offsets[first], paddingBottom: offsets[items.length] - offsets[last] }}>
+      {items.slice(first, last).map((item, i) => {
+        const index = first + i;
+        return observer ? (
+          <MeasuredRow key={keys[index]} rowKey={keys[index]} observer={observer}>
+            {renderItem(item, index)}
+          </MeasuredRow>
+        ) : (
+          <div key={keys[index]} style={{ height: rowHeight }}>
+            {renderItem(item, index)}
+          </div>
+        );
+      })}
+    </div>
+  );
+};
+
+const STOP_CARD_ESTIMATED_HEIGHT = 150;
+
+const AddStopButton = ({ onClick, onWarm }) => (
   <button 
     onClick={onClick}
+    onMouseEnter={onWarm}
+    onFocus={onWarm}
     className="ml-[66px] mb-8 flex items-center gap-2 text-emerald-600 font-medium hover:text-emerald-700 transition-colors group"
   >
     <div className="w-8 h-8 rounded-full border-2 border-emerald-500 border-dashed flex items-center justify-center group-hover:bg-emerald-50">
@@ -381,7 +607,15 @@ const AddStopButton = ({ onClick }) => (
   </button>
 );
 
-const SchematicMap = ({ stops, activeDay }) => {
+// Height of the route box's content area; rows share it until they would get
+// shorter than SCHEMATIC_MIN_ROW_HEIGHT, after which the box scrolls.
+const SCHEMATIC_INNER_HEIGHT = 348;
+const SCHEMATIC_MIN_ROW_HEIGHT = 44;
+
+const SchematicMap = profiled('SchematicMap', ({ stops, activeDay, travelMode, onChangeTravelMode }) => {
+  const routeScrollRef = useRef(null);
+  const rowHeight = Math.max(SCHEMATIC_MIN_ROW_HEIGHT, SCHEMATIC_INNER_HEIGHT / Math.max(stops.length, 1));
+
   return (
     <div className="h-full w-full bg-slate-50 relative overflow-hidden flex flex-col items-center justify-center p-8">
       <div className="absolute inset-0 opacity-[0.03] pointer-events-none" 
@@ -390,37 +624,60 @@ const SchematicMap = ({ stops, activeDay }) => {
       
       <div className="text-center mb-8 z-10">
         <div className="inline-flex items-center justify-center w-12 h-12 bg-white rounded-full shadow-lg mb-3 text-emerald-500">
-          <Map size={24} />
+          <MapIcon size={24} />
         </div>
         <h3 className="font-bold text-gray-700">Route Overview</h3>
         <p className="text-sm text-gray-400">
           {activeDay ? `${activeDay.label} • ${activeDay.date}` : 'Schematic view of your day'}
         </p>
+        <div className="inline-flex mt-3 bg-white rounded-lg shadow-sm border border-gray-100 p-0.5">
+          {Object.entries(TRAVEL_PROFILES).map(([mode, profile]) => {
+            const ModeIcon = TRAVEL_MODE_ICONS[mode];
+            return (
+              <button
+                key={mode}
+                onClick={() => onChangeTravelMode(mode)}
+                className={`flex items-center gap-1 px-2 py-1 text-[11px] font-medium rounded-md transition-colors ${
+                  travelMode === mode ? 'bg-emerald-50 text-emerald-600' : 'text-gray-400 hover:text-gray-600'
+                }`}
+              >
+                <ModeIcon size={12} />
+                {profile.label}
+              </button>
+            );
+          })}
+        </div>
       </div>
 
-      <div className="relative w-full max-w-md h-[400px] border-2 border-dashed border-gray-200 rounded-3xl p-6 flex flex-col justify-between bg-white/50 backdrop-blur-sm">
-        {stops.map((stop, i) => (
-          <div key={stop.id} className="flex items-center gap-3 relative z-10">
-             <div className={`w-3 h-3 rounded-full ${i === 0 || i === stops.length -1 ? 'bg-emerald-500' : 'bg-gray-300'}`}></div>
+      <div ref={routeScrollRef} className="relative w-full max-w-md h-[400px] border-2 border-dashed border-gray-200 rounded-3xl p-6 overflow-y-auto bg-white/50 backdrop-blur-sm">
+        <VirtualList
+          scrollRef={routeScrollRef}
+          items={stops}
+          getKey={stop => stop.id}
+          rowHeight={rowHeight}
+          renderItem={(stop, i) => (
+            <div className="h-full flex items-center gap-3 relative z-10">
+               <div className={`w-3 h-3 rounded-full ${i === 0 || i === stops.length -1 ? 'bg-emerald-500' : 'bg-gray-300'}`}></div>
              
-             {/* Enhanced Label with Time Details */}
-             <div className="flex flex-col min-w-0">
-               <div className="text-xs font-medium text-gray-600 truncate max-w-[150px]">{stop.name}</div>
-               <div className="flex items-center gap-1.5 text-[10px] text-gray-400 mt-0.5">
-                 <div className="flex items-center gap-0.5 bg-gray-100 px-1 rounded">
-                   <Clock size={8} />
-                   <span>{stop.startTime}</span>
+               {/* Enhanced Label with Time Details */}
+               <div className="flex flex-col min-w-0">
+                 <div className="text-xs font-medium text-gray-600 truncate max-w-[150px]">{stop.name}</div>
+                 <div className="flex items-center gap-1.5 text-[10px] text-gray-400 mt-0.5">
+                   <div className="flex items-center gap-0.5 bg-gray-100 px-1 rounded">
+                     <Clock size={8} />
+                     <span>{formatTimeLabel(stop.startMinutes)}</span>
+                   </div>
+                   <span>•</span>
+                   <span>{stop.duration}m</span>
                  </div>
-                 <span>•</span>
-                 <span>{stop.duration}m</span>
                </div>
-             </div>
 
-             {i !== stops.length - 1 && (
-               <div className="absolute left-[5px] top-[14px] w-[2px] h-[calc(100%+14px)] bg-gray-200 -z-10"></div>
-             )}
-          </div>
-        ))}
+               {i !== stops.length - 1 && (
+                 <div className="absolute left-[5px] top-1/2 w-[2px] bg-gray-200 -z-10" style={{ height: rowHeight }}></div>
+               )}
+            </div>
+            )}
+        />
         {stops.length === 0 && (
           <div className="absolute inset-0 flex items-center justify-center text-gray-300">
             No stops yet
@@ -429,326 +686,95 @@ const SchematicMap = ({ stops, activeDay }) => {
       </div>
     </div>
   );
-};
-
-// --- Modals ---
-
-const AIPlannerModal = ({ isOpen, onClose, onGenerate }) => {
-  const [location, setLocation] = useState('Tokyo');
-  const [vibe, setVibe] = useState('Classic Sightseeing');
-  const [isLoading, setIsLoading] = useState(false);
-
-  if (!isOpen) return null;
-
-  const handleGenerate = async () => {
-    setIsLoading(true);
-    
-    // Schema for structured JSON response
-    const schema = {
-      type: "ARRAY",
-      items: {
-        type: "OBJECT",
-        properties: {
-          name: { type: "STRING" },
-          category: { type: "STRING", enum: ["sight", "food", "hotel", "transport", "coffee"] },
-          duration: { type: "INTEGER" },
-          remarks: { type: "STRING" },
-          expenses: { type: "STRING", description: "Estimated cost (e.g. $20, ¥1000)" }
-        },
-        required: ["name", "duration", "category"]
-      }
-    };
-
-    const prompt = `Create a realistic travel itinerary for 1 day in ${location} with a "${vibe}" theme. Return exactly 4 items.`;
-    
-    const stops = await generateGeminiContent(prompt, schema);
-    
-    setIsLoading(false);
-    if (stops) {
-      onGenerate(stops);
-      onClose();
-    }
-  };
-
-  return (
-    <div className="fixed inset-0 bg-black/20 backdrop-blur-sm z-50 flex items-center justify-center p-4">
-      <div className="bg-white rounded-2xl shadow-xl w-full max-w-sm overflow-hidden animate-in fade-in zoom-in duration-200">
-        <div className="bg-gradient-to-r from-violet-500 to-fuchsia-500 p-6 text-white text-center">
-          <Sparkles className="w-12 h-12 mx-auto mb-2 opacity-90" />
-          <h3 className="font-bold text-xl">Magic Plan</h3>
-          <p className="text-white/80 text-sm">Let AI design your perfect day</p>
-        </div>
-        
-        <div className="p-6 space-y-4">
-          <div>
-            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Where to?</label>
-            <input 
-              type="text" 
-              value={location}
-              onChange={e => setLocation(e.target.value)}
-              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-violet-500"
-              placeholder="e.g. Paris, Kyoto, New York"
-            />
-          </div>
-          
-          <div>
-            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Trip Vibe</label>
-            <select 
-              value={vibe}
-              onChange={e => setVibe(e.target.value)}
-              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-violet-500"
-            >
-              <option>Classic Sightseeing</option>
-              <option>Foodie Adventure</option>
-              <option>Hidden Gems & Local Spots</option>
-              <option>Relaxed & Chill</option>
-              <option>History & Culture</option>
-              <option>Shopping Spree</option>
-            </select>
-          </div>
-
-          <button 
-            onClick={handleGenerate}
-            disabled={isLoading}
-            className="w-full py-3 bg-violet-600 hover:bg-violet-700 disabled:bg-violet-300 text-white font-bold rounded-xl transition-colors shadow-lg shadow-violet-200 flex items-center justify-center gap-2"
-          >
-            {isLoading ? (
-              <>
-                <Loader2 className="animate-spin" size={20} />
-                Planning...
-              </>
-            ) : (
-              <>
-                <Sparkles size={20} />
-                Generate Itinerary
-              </>
-            )}
-          </button>
-        </div>
-      </div>
-    </div>
-  );
-};
+});
 
-const StopModal = ({ isOpen, onClose, onSave, initialData }) => {
-  const [formData, setFormData] = useState({
-    name: '',
-    category: 'sight',
-    duration: 60,
-    googleLink: '',
-    ticketInfo: '',
-    remarks: '',
-    expenses: ''
-  });
+// Live view of the render profile. It polls instead of subscribing, and
+// it renders outside the profiled tree, so it does not count its own updates.
+const RenderProfileOverlay = () => {
+  const [profile, setProfile] = useState(() => getRenderProfile());
+  const [isOpen, setIsOpen] = useState(true);
 
   useEffect(() => {
-    if (initialData) {
-      setFormData({
-        name: initialData.name || '',
-        category: initialData.category || 'sight',
-        duration: initialData.duration || 60,
-        googleLink: initialData.googleLink || '',
-        ticketInfo: initialData.ticketInfo || '',
-        remarks: initialData.remarks || '',
-        expenses: initialData.expenses || ''
-      });
-    } else {
-      setFormData({ name: '', category: 'sight', duration: 60, googleLink: '', ticketInfo: '', remarks: '', expenses: '' });
-    }
-  }, [initialData, isOpen]);
-
-  if (!isOpen) return null;
+    const timer = setInterval(() => setProfile(getRenderProfile()), 1000);
+    return () => clearInterval(timer);
+  }, []);
 
-  const handleSubmit = (e) => {
-    e.preventDefault();
-    onSave({ ...formData, duration: parseInt(formData.duration) });
-    onClose();
-  };
+  if (!isOpen) {
+    return (
+      <button
+        onClick={() => setIsOpen(true)}
+        className="fixed bottom-3 left-3 z-50 px-2 py-1 text-[10px] font-mono bg-slate-800 text-white rounded shadow-lg"
+      >
+        Renders
+      </button>
+    );
+  }
 
-  const handleChange = (e) => {
-    setFormData(prev => ({ ...prev, [e.target.name]: e.target.value }));
-  };
+  const components = Object.entries(profile.components).sort(([, a], [, b]) => b.totalMs - a.totalMs);
+  const triggers = Object.entries(profile.triggers).sort(([, a], [, b]) => b.totalMs - a.totalMs).slice(0, 6);
 
   return (
-    <div className="fixed inset-0 bg-black/20 backdrop-blur-sm z-50 flex items-center justify-center p-4">
-      <div className="bg-white rounded-2xl shadow-xl w-full max-w-md overflow-hidden animate-in fade-in zoom-in duration-200 max-h-[90vh] flex flex-col">
-        <div className="p-4 border-b border-gray-100 flex justify-between items-center flex-shrink-0">
-          <h3 className="font-bold text-gray-800">{initialData ? 'Edit Stop' : 'Add New Stop'}</h3>
-          <button onClick={onClose} className="text-gray-400 hover:text-gray-600"><X size={20}/></button>
+    <div className="fixed bottom-3 left-3 z-50 w-80 max-h-[60vh] overflow-y-auto bg-slate-800/95 text-slate-100 text-[10px] font-mono rounded-lg shadow-xl p-3">
+      <div className="flex items-center justify-between mb-2">
+        <span className="font-bold text-xs">Render profile</span>
+        <div className="flex gap-2">
+          <button onClick={exportRenderProfile} className="text-emerald-300 hover:text-emerald-200">Export</button>
+          <button onClick={() => { resetRenderProfile(); setProfile(getRenderProfile()); }} className="text-slate-300 hover:text-white">Reset</button>
+          <button onClick={() => setIsOpen(false)} className="text-slate-400 hover:text-white"><X size={12} /></button>
         </div>
-        
-        <form onSubmit={handleSubmit} className="p-4 space-y-4 overflow-y-auto">
-          <div>
-            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Place Name</label>
-            <input 
-              autoFocus
-              type="text" 
-              name="name"
-              value={formData.name}
-              onChange={handleChange}
-              placeholder="e.g. Tokyo Tower"
-              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:ring-2 focus:ring-emerald-500/20 focus:border-emerald-500"
-              required
-            />
-          </div>
-          
-          <div className="grid grid-cols-2 gap-4">
-             <div>
-              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Category</label>
-              <select 
-                name="category"
-                value={formData.category} 
-                onChange={handleChange}
-                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
-              >
-                <option value="sight">Sightseeing</option>
-                <option value="food">Food/Drink</option>
-                <option value="hotel">Hotel</option>
-                <option value="transport">Transport</option>
-                <option value="coffee">Cafe</option>
-              </select>
-            </div>
-            <div>
-              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Duration (min)</label>
-              <input 
-                type="number" 
-                name="duration"
-                value={formData.duration}
-                onChange={handleChange}
-                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
-                min="15"
-                step="15"
-              />
-            </div>
-          </div>
-
-          <div className="border-t border-gray-100 pt-4 space-y-4">
-             <div>
-              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
-                <Banknote size={12}/> Expenses / Cost
-              </label>
-              <input 
-                type="text" 
-                name="expenses"
-                value={formData.expenses}
-                onChange={handleChange}
-                placeholder="e.g. ¥2000, $25, Free"
-                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
-              />
-            </div>
-
-            <div>
-              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
-                <LinkIcon size={12}/> Google Maps Link
-              </label>
-              <input 
-                type="url" 
-                name="googleLink"
-                value={formData.googleLink}
-                onChange={handleChange}
-                placeholder="https://goo.gl/maps/..."
-                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
-              />
-            </div>
-
-            <div>
-              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
-                <Ticket size={12}/> Ticket Info
-              </label>
-              <input 
-                type="text" 
-                name="ticketInfo"
-                value={formData.ticketInfo}
-                onChange={handleChange}
-                placeholder="e.g. Reservation #12345, Flight JL123"
-                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
-              />
-            </div>
-
-            <div>
-              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
-                <FileText size={12}/> Remarks
-              </label>
-              <textarea 
-                name="remarks"
-                value={formData.remarks}
-                onChange={handleChange}
-                placeholder="e.g. Enter through the south gate..."
-                rows="2"
-                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm resize-none"
-              />
+      </div>
+      <table className="w-full">
+        <thead>
+          <tr className="text-slate-400 text-left">
+            <th className="font-normal">Component</th>
+            <th className="font-normal text-right">Renders</th>
+            <th className="font-normal text-right">Mean</th>
+            <th className="font-normal text-right">p95</th>
+            <th className="font-normal text-right">Max</th>
+          </tr>
+        </thead>
+        <tbody>
+          {components.map(([id, stats]) => (
+            <tr key={id}>
+              <td>{id}</td>
+              <td className="text-right">{stats.renders}</td>
+              <td className="text-right">{stats.meanMs.toFixed(2)}</td>
+              <td className="text-right">{stats.p95Ms.toFixed(2)}</td>
+              <td className="text-right">{stats.maxMs.toFixed(2)}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+      {triggers.length > 0 && (
+        <div className="mt-2 pt-2 border-t border-slate-600">
+          <div className="text-slate-400 mb-1">Triggered by</div>
+          {triggers.map(([name, stats]) => (
+            <div key={name} className="flex justify-between gap-2">
+              <span className="truncate">{name}</span>
+              <span className="text-slate-300 whitespace-nowrap">{stats.renders} renders • {stats.totalMs.toFixed(1)} ms</span>
             </div>
-          </div>
-        </form>
-
-        <div className="p-4 border-t border-gray-100 bg-gray-50 flex-shrink-0">
-          <button 
-            onClick={handleSubmit}
-            className="w-full py-3 bg-emerald-500 hover:bg-emerald-600 text-white font-bold rounded-xl transition-colors shadow-lg shadow-emerald-200"
-          >
-            {initialData ? 'Save Changes' : 'Add to Itinerary'}
-          </button>
+          ))}
         </div>
-      </div>
+      )}
     </div>
   );
 };
 
-const DayEditModal = ({ isOpen, onClose, onSave, initialData }) => {
-  const [label, setLabel] = useState('');
-  const [date, setDate] = useState('');
+// --- Modals ---
+// The modals live in ui/modals.jsx and are fetched the first time one mounts
+// or once the page is idle (see lib/startup.js).
 
-  useEffect(() => {
-    if (initialData) {
-      setLabel(initialData.label);
-      setDate(initialData.date);
-    }
-  }, [initialData, isOpen]);
+const loadModals = () => import('./ui/modals.jsx');
+const lazyModal = (name) => React.lazy(() => loadModals().then(module => ({ default: module[name] })));
 
-  if (!isOpen) return null;
-
-  return (
-    <div className="fixed inset-0 bg-black/20 backdrop-blur-sm z-50 flex items-center justify-center p-4">
-      <div className="bg-white rounded-2xl shadow-xl w-full max-w-sm p-4 animate-in fade-in zoom-in duration-200">
-         <div className="flex justify-between items-center mb-4">
-          <h3 className="font-bold text-gray-800">Edit Day Details</h3>
-          <button onClick={onClose} className="text-gray-400 hover:text-gray-600"><X size={20}/></button>
-        </div>
-        <div className="space-y-4">
-          <div>
-            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Day Label</label>
-            <input 
-              type="text" 
-              value={label}
-              onChange={e => setLabel(e.target.value)}
-              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
-            />
-          </div>
-          <div>
-            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Date</label>
-            <input 
-              type="date" 
-              value={date}
-              onChange={e => setDate(e.target.value)}
-              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
-            />
-          </div>
-          <button 
-            onClick={() => { onSave(label, date); onClose(); }}
-            className="w-full py-2.5 bg-emerald-500 hover:bg-emerald-600 text-white font-bold rounded-xl transition-colors"
-          >
-            Update Day
-          </button>
-        </div>
-      </div>
-    </div>
-  );
-}
+const AIPlannerModal = lazyModal('AIPlannerModal');
+const StopModal = lazyModal('StopModal');
+const DayEditModal = lazyModal('DayEditModal');
 
 // --- Main App Component ---
 
-export default function App() {
-  const [trip, setTrip] = useState(INITIAL_TRIP);
+function App() {
+  const [store, setStore] = useState(() => createTripStore(INITIAL_TRIP));
   const [activeDayId, setActiveDayId] = useState(INITIAL_TRIP.days[0].id);
   const [viewMode, setViewMode] = useState('split');
   
@@ -758,146 +784,460 @@ export default function App() {
   const [aiModalOpen, setAiModalOpen] = useState(false);
   const [editingStop, setEditingStop] = useState(null); 
   const [editingDay, setEditingDay] = useState(null);
+  const [optimizeNotice, setOptimizeNotice] = useState(null);
+  const [isEnrichingDay, setIsEnrichingDay] = useState(false);
+  const [isStreamingPlan, setIsStreamingPlan] = useState(false);
+  const [saveState, setSaveState] = useState('idle');
+  const [shareState, setShareState] = useState('idle');
+  const [storageReady, setStorageReady] = useState(false);
+  const persistenceRef = useRef(null);
+  const listScrollRef = useRef(null);
+  const [stopModalMounted, mountStopModal] = useLazyMount(stopModalOpen);
+  const [dayModalMounted] = useLazyMount(dayModalOpen);
+  const [aiModalMounted, mountAiModal] = useLazyMount(aiModalOpen);
+
+  const warmAiPlanner = useCallback(() => {
+    mountAiModal();
+    preconnectGemini();
+  }, [mountAiModal]);
+
+  useEffect(() => {
+    markStartup('firstCommit');
+    return whenIdle(() => {
+      markStartup('interactive');
+      saveStartupReport();
+      // A failed prefetch is retried when a modal mounts.
+      loadModals().catch(() => {});
+    });
+  }, []);
 
   // Get current day's data
-  const activeDay = trip.days.find(d => d.id === activeDayId);
-  const stops = activeDay?.stops || [];
-  const scheduledStops = useMemo(() => calculateSchedule(stops), [stops]);
+  const meta = useTripStore(store, s => s.getMeta());
+  const days = useTripStore(store, s => s.getDays());
+  const activeDay = useTripStore(store, s => s.getDay(activeDayId));
+  const stops = useTripStore(store, s => s.getDayStops(activeDayId));
+  const travelMode = meta.travelMode || DEFAULT_TRAVEL_MODE;
+  const scheduledStops = useIncrementalSchedule(stops, travelMode);
+  // Neither the compute client nor the conflict index does anything until
+  // subscribed, and both stop when unsubscribed, so they can be created
+  // during render and survive StrictMode's extra effect pass.
+  const computeClient = useMemo(() => createComputeClient(store, { startWhen: whenIdle }), [store]);
+  const computed = useSyncExternalStore(computeClient.subscribe, computeClient.getSnapshot);
+  const { infeasibleDayIds } = computed;
+  const conflictIndex = useMemo(() => createConflictIndex(store, computeClient), [store, computeClient]);
+  const searchIndex = useMemo(() => createSearchIndex(), []);
+  const conflictDayIds = useSyncExternalStore(conflictIndex.subscribe, conflictIndex.getConflictDayIds);
+  useSyncExternalStore(conflictIndex.subscribe, conflictIndex.getVersion);
+  const currency = meta.currency || DEFAULT_CURRENCY;
+  const dayExpenses = summarizeStops(stops, currency);
+
+  // Open the local database: resume the last opened trip if it was saved,
+  // otherwise the saved initial trip, otherwise save the initial trip. From then on edits are written behind. A share
+  // link in the URL opens that trip instead, rendering each day as it is
+  // decoded, and saves it once complete. Until then the itinerary takes no
+  // input, since a saved trip would replace whatever was edited meanwhile.
+  useEffect(() => {
+    let cancelled = false;
+    let connection = null;
+    const flushOnHide = () => connection?.queue.flush();
+    const connect = (db, nextStore) => {
+      connection = connectTripPersistence(nextStore, db);
+      persistenceRef.current = connection;
+      setLastOpenedTripId(nextStore.getMeta().id);
+      window.addEventListener('pagehide', flushOnHide);
+      whenIdle(() => indexSavedTrips(db, searchIndex, nextStore).catch(error => console.error('Could not index saved trips:', error)));
+    };
 
-  // Handlers
-  const handleMoveStop = (index, direction) => {
-    const newStops = [...stops];
-    const targetIndex = index + direction;
-    if (targetIndex < 0 || targetIndex >= newStops.length) return;
-    [newStops[index], newStops[targetIndex]] = [newStops[targetIndex], newStops[index]];
-    updateStops(newStops);
-  };
+    const openSharedTrip = async (encoded) => {
+      let sharedStore = null;
+      await decodeSharedTrip(encoded, {
+        onTrip: ({ dayCount, ...sharedMeta }) => {
+          sharedStore = createTripStore({ ...sharedMeta, id: `trip-${Date.now()}`, days: [] });
+          if (!cancelled) setStore(sharedStore);
+        },
+        onDay: (day) => {
+          const isFirst = sharedStore.getDayIds().length === 0;
+          sharedStore.addDays([day]);
+          if (isFirst && !cancelled) setActiveDayId(day.id);
+        }
+      });
+      window.history.replaceState(null, '', window.location.pathname + window.location.search);
+      return sharedStore;
+    };
 
-  const handleDeleteStop = (id) => {
-    updateStops(stops.filter(s => s.id !== id));
-  };
+    const hash = window.location.hash;
+    const sharedTrip = hash.startsWith(SHARE_HASH_PREFIX)
+      ? openSharedTrip(hash.slice(SHARE_HASH_PREFIX.length)).catch(error => {
+          console.error('Could not open share link:', error);
+          return null;
+        })
+      : Promise.resolve(null);
+
+    const ready = () => !cancelled && setStorageReady(true);
+    Promise.all([openTripDatabase(), sharedTrip]).then(async ([db, sharedStore]) => {
+      if (cancelled) return;
+      if (sharedStore) {
+        connect(db, sharedStore);
+        connection.saveAll();
+        return;
+      }
+      const lastTripId = getLastOpenedTripId();
+      const saved = (lastTripId && lastTripId !== INITIAL_TRIP.id && await loadTripSkeleton(db, lastTripId))
+        || await loadTripSkeleton(db, INITIAL_TRIP.id);
+      if (cancelled) return;
+      const nextStore = saved ? createTripStore(saved) : store;
+      connect(db, nextStore);
+      if (saved) {
+        setStore(nextStore);
+        setActiveDayId(saved.days[0]?.id);
+      } else {
+        connection.saveAll();
+      }
+    }).catch(error => console.error('Trip storage unavailable:', error)).finally(ready);
+    return () => {
+      cancelled = true;
+      window.removeEventListener('pagehide', flushOnHide);
+      connection?.disconnect();
+    };
+  }, []);
 
-  const handleChangeDuration = (id, delta) => {
-    updateStops(stops.map(s => s.id === id ? { ...s, duration: Math.max(15, s.duration + delta) } : s));
-  };
+  useEffect(() => connectSearchIndex(searchIndex, store), [searchIndex, store]);
+
+  // "Saved" holds only until the next edit.
+  useEffect(() => store.onChange(changes => {
+    if (changes.some(change => change.kind !== 'load')) setSaveState(state => (state === 'saved' ? 'idle' : state));
+  }), [store]);
 
-  const handleSaveStop = (data) => {
+  // Stops of the open day that have no coordinates are geocoded offline. The
+  // day is written only when one of them resolves.
+  useEffect(() => {
+    if (!store.isDayLoaded(activeDayId) || stops.every(hasLocation)) return;
+    const located = locateStops(stops);
+    if (located === stops) return;
+    store.setDayStops(activeDayId, current => (current === stops ? located : locateStops(current)));
+  }, [store, activeDayId, stops]);
+
+  // Days of a saved trip are read from storage the first time they are opened.
+  useEffect(() => {
+    const connection = persistenceRef.current;
+    if (!connection || store.isDayLoaded(activeDayId)) return;
+    connection.loadDay(activeDayId).then(dayStops => store.hydrateDayStops(activeDayId, dayStops));
+  }, [store, activeDayId]);
+
+  useEffect(() => {
+    if (shareState !== 'copied') return;
+    const timer = setTimeout(() => setShareState('idle'), 3000);
+    return () => clearTimeout(timer);
+  }, [shareState]);
+
+  useEffect(() => {
+    if (!optimizeNotice) return;
+    const timer = setTimeout(() => setOptimizeNotice(null), 4000);
+    return () => clearTimeout(timer);
+  }, [optimizeNotice]);
+
+  // Handlers
+  // Stop handlers write through the store, so they stay referentially stable
+  // and memoized StopCards only re-render when their own stop changes. The
+  // handlers passed to Header and DayTabs are memoized as well, so neither
+  // re-renders on a stop edit.
+  const updateDayStops = useCallback((dayId, updater) => {
+    store.setDayStops(dayId, updater);
+  }, [store]);
+
+  const updateStops = useCallback((updater) => {
+    updateDayStops(activeDayId, updater);
+  }, [updateDayStops, activeDayId]);
+
+  const handleMoveStop = useCallback((index, direction) => {
+    updateStops(stops => {
+      const targetIndex = index + direction;
+      if (targetIndex < 0 || targetIndex >= stops.length) return stops;
+      const newStops = [...stops];
+      [newStops[index], newStops[targetIndex]] = [newStops[targetIndex], newStops[index]];
+      return newStops;
+    });
+  }, [updateStops]);
+
+  const handleSelectDay = useCallback(traceHandler('handleSelectDay', setActiveDayId), []);
+
+  const handleMoveUp = useCallback(traceHandler('handleMoveUp', (index) => handleMoveStop(index, -1)), [handleMoveStop]);
+  const handleMoveDown = useCallback(traceHandler('handleMoveDown', (index) => handleMoveStop(index, 1)), [handleMoveStop]);
+
+  const handleDeleteStop = useCallback(traceHandler('handleDeleteStop', (id) => {
+    updateStops(stops => stops.filter(s => s.id !== id));
+  }), [updateStops]);
+
+  const handleChangeDuration = useCallback(traceHandler('handleChangeDuration', (id, delta) => {
+    store.updateStop(id, s => ({ ...s, duration: Math.max(15, s.duration + delta) }));
+  }), [store]);
+
+  const handleOpenStop = useCallback(traceHandler('handleOpenStop', (stop) => {
+    setEditingStop(stop);
+    setStopModalOpen(true);
+  }), []);
+
+  const handleSaveStop = traceHandler('handleSaveStop', (data) => {
     if (editingStop) {
       // Update existing
-      updateStops(stops.map(s => s.id === editingStop.id ? { ...s, ...data } : s));
+      store.updateStop(editingStop.id, s => locateEditedStop({ ...s, ...data }, s, stopsCentroid(stops)));
     } else {
       // Add new
       const newStop = {
         id: `new-${Date.now()}`,
-        ...data,
-        startTime: '09:00', 
-        location: { lat: 0, lng: 0 }
+        location: { lat: 0, lng: 0 },
+        ...data
       };
-      updateStops([...stops, newStop]);
+      updateStops(stops => [...stops, locateEditedStop(newStop, null, stopsCentroid(stops))]);
     }
-  };
+  });
+
+  const handleSave = useCallback(traceHandler('handleSave', async () => {
+    if (!persistenceRef.current) return;
+    setSaveState('saving');
+    const saved = await persistenceRef.current.queue.flush();
+    setSaveState(saved ? 'saved' : 'error');
+  }), []);
+
+  // Copies a link carrying the whole trip. Days not opened yet are read from
+  // storage first so the link is complete.
+  const handleShare = useCallback(traceHandler('handleShare', async () => {
+    setShareState('sharing');
+    try {
+      const connection = persistenceRef.current;
+      const unloaded = store.getDayIds().filter(dayId => !store.isDayLoaded(dayId));
+      if (connection) {
+        await Promise.all(unloaded.map(dayId =>
+          connection.loadDay(dayId).then(dayStops => store.hydrateDayStops(dayId, dayStops))
+        ));
+      }
+      const url = buildShareUrl(await encodeSharedTrip(store.toTrip()));
+      await navigator.clipboard.writeText(url);
+      setShareState('copied');
+    } catch (error) {
+      console.error('Could not create share link:', error);
+      setShareState('idle');
+    }
+  }), [store]);
+
+  const handleChangeTravelMode = traceHandler('handleChangeTravelMode', (mode) => {
+    store.setMeta({ travelMode: mode });
+  });
 
-  const handleEditDay = (day) => {
+  const handleOptimizeDay = traceHandler('handleOptimizeDay', () => {
+    const result = optimizeDayOrder(stops, travelMode);
+    if (result.savedMinutes > 0) {
+      updateStops(() => result.stops);
+      setOptimizeNotice(`Saved ${formatDuration(result.savedMinutes)} of travel`);
+    } else {
+      setOptimizeNotice('Route is already optimal');
+    }
+  });
+
+  // Spreads the open day's stops over as many days as their durations need.
+  // The first group stays here; the rest fill the following days while they
+  // are empty, then new days appended after the trip's last day.
+  const handleSplitDay = traceHandler('handleSplitDay', () => {
+    const groups = splitStopsIntoDays(stops, { travelMode }).days.filter(group => group.length);
+    if (groups.length < 2) {
+      setOptimizeNotice('Fits in one day');
+      return;
+    }
+    const [first, ...rest] = groups;
+    const dayIds = store.getDayIds();
+    const emptyDayIds = [];
+    for (const dayId of dayIds.slice(dayIds.indexOf(activeDayId) + 1)) {
+      if (!store.isDayLoaded(dayId) || store.getDayStopIds(dayId).length) break;
+      emptyDayIds.push(dayId);
+    }
+
+    updateStops(() => first);
+    rest.slice(0, emptyDayIds.length).forEach((group, i) => updateDayStops(emptyDayIds[i], () => group));
+    const lastDay = store.getDay(dayIds[dayIds.length - 1]);
+    const newDays = rest.slice(emptyDayIds.length).map((group, k) => ({
+      id: `day-${Date.now()}-${k}`,
+      date: addDaysToDate(lastDay.date, k + 1),
+      label: `Day ${dayIds.length + k + 1}`,
+      stops: group
+    }));
+    if (newDays.length) store.addDays(newDays);
+    setOptimizeNotice(`Spread over ${groups.length} days`);
+  });
+
+  const handleEditDay = useCallback(traceHandler('handleEditDay', (day) => {
     setEditingDay(day);
     setDayModalOpen(true);
-  };
+  }), []);
 
-  const handleUpdateDay = (newLabel, newDate) => {
+  const handleUpdateDay = traceHandler('handleUpdateDay', (newLabel, newDate) => {
     const targetId = editingDay?.id || activeDayId;
-    const newDays = trip.days.map(d => d.id === targetId ? { ...d, label: newLabel, date: newDate } : d);
-    setTrip({ ...trip, days: newDays });
-  };
+    store.updateDay(targetId, { label: newLabel, date: newDate });
+  });
 
-  const handleAddDay = () => {
-    const lastDay = trip.days[trip.days.length - 1];
-    // Simple date increment logic
-    const dateObj = new Date(lastDay.date);
-    dateObj.setDate(dateObj.getDate() + 1);
-    const nextDate = dateObj.toISOString().split('T')[0];
+  const handleAddDay = useCallback(traceHandler('handleAddDay', () => {
+    const dayIds = store.getDayIds();
+    const lastDay = store.getDay(dayIds[dayIds.length - 1]);
+    const nextDate = addDaysToDate(lastDay.date, 1);
 
-    const newDayId = `day-${trip.days.length + 1}`;
+    const newDayId = `day-${Date.now()}`;
     const newDay = {
       id: newDayId,
       date: nextDate,
-      label: `Day ${trip.days.length + 1}`,
+      label: `Day ${dayIds.length + 1}`,
       stops: []
     };
 
-    setTrip(prev => ({ ...prev, days: [...prev.days, newDay] }));
+    store.addDays([newDay]);
     setActiveDayId(newDayId);
-  };
+  }), [store]);
 
-  const handleGenerateItinerary = (generatedStops) => {
-    // Add IDs to generated stops
-    const newStops = generatedStops.map(stop => ({
-      id: `ai-${Date.now()}-${Math.random()}`,
-      startTime: '09:00', // Will be recalculated
-      location: { lat: 0, lng: 0 },
-      ...stop
-    }));
-    
+  const handleOpenAI = useCallback(traceHandler('handleOpenAI', () => setAiModalOpen(true)), []);
+
+  // Add IDs to generated stops
+  const toGeneratedStop = (stop) => ({
+    id: `ai-${Date.now()}-${Math.random()}`,
+    startTime: '09:00', // Will be recalculated
+    location: { lat: 0, lng: 0 },
+    ...stop
+  });
+
+  const handleGenerateItinerary = traceHandler('handleGenerateItinerary', (generatedStops) => {
     // Replace current day's stops with generated ones
-    updateStops(newStops);
-  };
+    updateStops(() => locateStops(generatedStops.map(toGeneratedStop)));
+  });
+
+  const handleAppendGeneratedStop = traceHandler('handleAppendGeneratedStop', (stop) => {
+    updateStops(stops => [...stops, locateEditedStop(toGeneratedStop(stop), null, stopsCentroid(stops))]);
+  });
+
+  // Returns the ids of `count` consecutive days starting at the active day,
+  // appending new days to the trip where it is too short.
+  const handlePrepareTripDays = traceHandler('handlePrepareTripDays', (count) => {
+    const dayIds = store.getDayIds();
+    const startIndex = dayIds.indexOf(activeDayId);
+    const lastDay = store.getDay(dayIds[dayIds.length - 1]);
+    const missing = startIndex + count - dayIds.length;
+    const newDays = Array.from({ length: Math.max(0, missing) }, (_, k) => ({
+      id: `day-${Date.now()}-${k}`,
+      date: addDaysToDate(lastDay.date, k + 1),
+      label: `Day ${dayIds.length + k + 1}`,
+      stops: []
+    }));
+    if (newDays.length) store.addDays(newDays);
+    return store.getDayIds().slice(startIndex, startIndex + count);
+  });
+
+  const handleGenerateDay = traceHandler('handleGenerateDay', (dayId, generatedStops) => {
+    updateDayStops(dayId, () => locateStops(generatedStops.map(toGeneratedStop)));
+  });
 
-  const handleEnrichStop = async (stop) => {
+  const handleEnrichStop = useCallback(traceHandler('handleEnrichStop', async (stop, signal) => {
     const prompt = `Give me one interesting, insider travel tip, fun fact, or "must-eat" recommendation for "${stop.name}". Keep it short (max 20 words).`;
-    const tip = await generateGeminiContent(prompt);
+    const tip = await generateGeminiContent(prompt, null, { signal, caller: 'handleEnrichStop' });
     if (tip) {
-      const currentRemarks = stop.remarks || "";
-      const separator = currentRemarks ? "\n" : "";
-      const newRemarks = `${currentRemarks}${separator}✨ Tip: ${tip}`;
-      
-      updateStops(stops.map(s => s.id === stop.id ? { ...s, remarks: newRemarks } : s));
+      store.updateStop(stop.id, s => appendTip(s, tip));
     }
-  };
-
-  const updateStops = (newStops) => {
-    const newDays = trip.days.map(day => 
-      day.id === activeDayId ? { ...day, stops: newStops } : day
-    );
-    setTrip({ ...trip, days: newDays });
-  };
+  }), [store]);
+
+  // Reads the day's stops when clicked rather than closing over them, so the
+  // handler (and DayTabs) stays the same across stop edits.
+  const handleEnrichDay = useCallback(traceHandler('handleEnrichDay', async () => {
+    const dayStops = store.getDayStops(activeDayId);
+    if (dayStops.length === 0) return;
+    setIsEnrichingDay(true);
+    try {
+      const tips = await fetchTipsForStops(dayStops, { timeoutMs: 60000, caller: 'handleEnrichDay' });
+      // One state update for the whole day, however many chunks were needed.
+      updateStops(current => current.map(s => tips[s.id] ? appendTip(s, tips[s.id]) : s));
+    } catch (error) {
+      console.error('Could not enrich day:', error);
+    } finally {
+      setIsEnrichingDay(false);
+    }
+  }), [store, activeDayId, updateStops]);
 
   return (
-    <div className="h-screen w-full bg-gray-50 flex flex-col font-sans text-slate-800">
+    <div className="h-screen w-full bg-gray-50 flex flex-col font-sans text-slate-800 relative">
+      {!storageReady && (
+        <div className="absolute inset-0 z-40 bg-white/40 cursor-wait flex items-center justify-center" title="Opening saved trips…">
+          <Loader2 size={24} className="animate-spin text-emerald-500" />
+        </div>
+      )}
+
       <Header 
-        title={trip.title} 
-        days={trip.days} 
-        activeDayId={activeDayId} 
+        title={meta.title} 
+        activeDay={activeDay} 
         onEditDay={handleEditDay}
+        onSave={handleSave}
+        saveState={saveState}
+        onShare={handleShare}
+        shareState={shareState}
       />
       
       <div className="flex-1 flex overflow-hidden relative">
         {/* Left Panel: Itinerary List */}
         <div className={`${viewMode === 'map' ? 'hidden md:flex' : 'flex'} flex-col w-full md:w-[480px] bg-white border-r border-gray-200 z-10 shadow-xl`}>
           <DayTabs 
-            days={trip.days} 
+            days={days} 
             activeDayId={activeDayId} 
-            setActiveDayId={setActiveDayId} 
+            setActiveDayId={handleSelectDay} 
             onAddDay={handleAddDay}
             onEditDay={handleEditDay}
-            onOpenAI={() => setAiModalOpen(true)}
+            onOpenAI={handleOpenAI}
+            onWarmAI={warmAiPlanner}
+            onEnrichDay={handleEnrichDay}
+            isEnrichingDay={isEnrichingDay}
+            infeasibleDayIds={infeasibleDayIds}
+            conflictDayIds={conflictDayIds}
           />
+
+          <TripSearch index={searchIndex} store={store} onSelectDay={handleSelectDay} />
           
-          <div className="flex-1 overflow-y-auto p-4 scroll-smooth">
+          <div
+            className="flex items-center gap-3 px-4 py-2 text-xs text-gray-500 border-b border-gray-100 bg-gray-50/50"
+            title={`Offline rates as of ${FX_RATES_AS_OF}`}
+          >
+            <Banknote size={14} className="text-emerald-500" />
+            <span>Day <span className="font-semibold text-gray-700">{formatMoney(dayExpenses.total, currency)}</span></span>
+            <span className="text-gray-300">|</span>
+            <span>Trip <span className="font-semibold text-gray-700">{computed.currency === currency ? formatMoney(computed.expenseTotal, currency) : '…'}</span></span>
+            {dayExpenses.unparsed > 0 && (
+              <span className="ml-auto text-amber-500">{dayExpenses.unparsed} unpriced</span>
+            )}
+          </div>
+
+          <div ref={listScrollRef} className="flex-1 overflow-y-auto p-4">
             <div className="max-w-md mx-auto">
-              {scheduledStops.map((stop, index) => (
-                <StopCard 
-                  key={stop.id} 
-                  stop={stop} 
-                  index={index}
-                  isLast={index === scheduledStops.length - 1}
-                  onMoveUp={(i) => handleMoveStop(i, -1)}
-                  onMoveDown={(i) => handleMoveStop(i, 1)}
-                  onDelete={handleDeleteStop}
-                  onChangeDuration={handleChangeDuration}
-                  onEdit={(stop) => { setEditingStop(stop); setStopModalOpen(true); }}
-                  onEnrich={handleEnrichStop}
-                />
-              ))}
+              <VirtualList
+                scrollRef={listScrollRef}
+                items={scheduledStops}
+                getKey={stop => stop.id}
+                estimateHeight={STOP_CARD_ESTIMATED_HEIGHT}
+                renderItem={(stop, index) => (
+                  <StopCard 
+                    stop={stop} 
+                    index={index}
+                    isLast={index === scheduledStops.length - 1}
+                    travelMode={travelMode}
+                    onMoveUp={handleMoveUp}
+                    onMoveDown={handleMoveDown}
+                    onDelete={handleDeleteStop}
+                    onChangeDuration={handleChangeDuration}
+                    onEdit={handleOpenStop}
+                    onEnrich={handleEnrichStop}
+                    conflict={conflictIndex.getStopConflict(stop.id)}
+                  />
+                )}
+              />
               
-              <AddStopButton onClick={() => { setEditingStop(null); setStopModalOpen(true); }} />
+              {isStreamingPlan && (
+                <div className="ml-[66px] mb-6 flex items-center gap-2 text-xs font-medium text-violet-600">
+                  <Loader2 size={14} className="animate-spin" />
+                  Planning more stops...
+                </div>
+              )}
+
+              <AddStopButton onClick={() => { setEditingStop(null); setStopModalOpen(true); }} onWarm={mountStopModal} />
               <div className="h-20"></div> 
             </div>
           </div>
@@ -907,7 +1247,7 @@ export default function App() {
                onClick={() => setViewMode(viewMode === 'list' ? 'map' : 'list')}
                className="bg-gray-900 text-white p-4 rounded-full shadow-xl flex items-center gap-2"
              >
-               {viewMode === 'list' ? <Map size={20} /> : <Navigation size={20} />}
+               {viewMode === 'list' ? <MapIcon size={20} /> : <Navigation size={20} />}
                <span className="font-bold">{viewMode === 'list' ? 'Map' : 'List'}</span>
              </button>
           </div>
@@ -915,37 +1255,87 @@ export default function App() {
 
         {/* Right Panel: Map */}
         <div className={`${viewMode === 'list' ? 'hidden md:block' : 'block'} flex-1 bg-gray-100 relative`}>
-          <SchematicMap stops={scheduledStops} activeDay={activeDay} />
+          <SchematicMap
+            stops={scheduledStops}
+            activeDay={activeDay}
+            travelMode={travelMode}
+            onChangeTravelMode={handleChangeTravelMode}
+          />
           <div className="absolute top-4 right-4 flex flex-col gap-2">
             <button className="w-10 h-10 bg-white rounded-lg shadow-md flex items-center justify-center text-gray-600 hover:text-emerald-600">
               <Plus size={20} />
             </button>
-             <button className="w-10 h-10 bg-white rounded-lg shadow-md flex items-center justify-center text-gray-600 hover:text-emerald-600">
+             <button
+              onClick={handleOptimizeDay}
+              disabled={stops.length < 3}
+              className="w-10 h-10 bg-white rounded-lg shadow-md flex items-center justify-center text-gray-600 hover:text-emerald-600 disabled:opacity-40"
+              title="Optimize day"
+            >
               <Navigation size={20} />
             </button>
+            <button
+              onClick={handleSplitDay}
+              disabled={stops.length < 2}
+              className="w-10 h-10 bg-white rounded-lg shadow-md flex items-center justify-center text-gray-600 hover:text-emerald-600 disabled:opacity-40"
+              title="Spread over days"
+            >
+              <CalendarRange size={20} />
+            </button>
           </div>
+          {optimizeNotice && (
+            <div className="absolute top-4 right-16 bg-gray-900 text-white text-xs font-medium px-3 py-2 rounded-lg shadow-md">
+              {optimizeNotice}
+            </div>
+          )}
         </div>
       </div>
 
-      <StopModal 
-        isOpen={stopModalOpen} 
-        onClose={() => setStopModalOpen(false)} 
-        onSave={handleSaveStop}
-        initialData={editingStop}
-      />
+      <React.Suspense fallback={null}>
+        {stopModalMounted && (
+          <StopModal 
+            isOpen={stopModalOpen} 
+            onClose={() => setStopModalOpen(false)} 
+            onSave={handleSaveStop}
+            initialData={editingStop}
+          />
+        )}
 
-      <DayEditModal
-        isOpen={dayModalOpen}
-        onClose={() => setDayModalOpen(false)}
-        onSave={handleUpdateDay}
-        initialData={editingDay || activeDay}
-      />
+        {dayModalMounted && (
+          <DayEditModal
+            isOpen={dayModalOpen}
+            onClose={() => setDayModalOpen(false)}
+            onSave={handleUpdateDay}
+            initialData={editingDay || activeDay}
+          />
+        )}
 
-      <AIPlannerModal 
-        isOpen={aiModalOpen}
-        onClose={() => setAiModalOpen(false)}
-        onGenerate={handleGenerateItinerary}
-      />
+        {aiModalMounted && (
+          <AIPlannerModal 
+            isOpen={aiModalOpen}
+            onClose={() => setAiModalOpen(false)}
+            onGenerate={handleGenerateItinerary}
+            onAppend={handleAppendGeneratedStop}
+            onStreamingChange={setIsStreamingPlan}
+            onPrepareDays={handlePrepareTripDays}
+            onGenerateDay={handleGenerateDay}
+          />
+        )}
+      </React.Suspense>
     </div>
   );
 }
+
+// With render profiling on, the app runs inside a profiler and the overlay
+// sits outside it.
+const ProfiledApp = () => (
+  <>
+    <Profiler id="App" onRender={recordRender}>
+      <App />
+    </Profiler>
+    <RenderProfileOverlay />
+  </>
+);
+
+recordModuleEvaluation(import.meta.url, MODULE_STARTED_AT);
+
+export default RENDER_PROFILING ? ProfiledApp : App;
@@ -0,0 +1,470 @@
+import React, { useState, useEffect, useRef } from 'react';
+import { X, Sparkles, Loader2, Lock, Banknote, Link as LinkIcon, Ticket, FileText } from 'lucide-react';
+import {
+  generateGeminiContent, streamGeminiArray, MAX_PLAN_DAYS, planDayConcurrency, runWithConcurrency,
+  ITINERARY_SCHEMA, buildDayPlanPrompt
+} from '../lib/gemini.js';
+import { DEFAULT_DAY_START, formatTime } from '../lib/schedule.js';
+import { profiled } from './profiled.jsx';
+
+// --- Modals ---
+// Loaded on demand by the app (see lib/startup.js), so none of this code is
+// part of the startup bundle.
+
+export const AIPlannerModal = profiled('AIPlannerModal', ({ isOpen, onClose, onGenerate, onAppend, onStreamingChange, onPrepareDays, onGenerateDay }) => {
+  const [location, setLocation] = useState('Tokyo');
+  const [vibe, setVibe] = useState('Classic Sightseeing');
+  const [dayCount, setDayCount] = useState(1);
+  const [isLoading, setIsLoading] = useState(false);
+  const [dayStatus, setDayStatus] = useState([]);
+  const controllerRef = useRef(null);
+  const planDayIdsRef = useRef([]);
+
+  useEffect(() => () => controllerRef.current?.abort(), []);
+
+  if (!isOpen) return null;
+
+  // Closing before the first stop arrives cancels the request.
+  const handleClose = () => {
+    controllerRef.current?.abort();
+    setDayStatus([]);
+    onClose();
+  };
+
+  const handleGenerate = async () => {
+    setIsLoading(true);
+
+    const prompt = buildDayPlanPrompt(location, vibe, 1, 1);
+    
+    // The first stop replaces the day and closes the modal; the rest are
+    // appended to the list as they stream in.
+    let received = 0;
+    const controller = new AbortController();
+    controllerRef.current = controller;
+    onStreamingChange(true);
+    await streamGeminiArray(prompt, ITINERARY_SCHEMA, (stop) => {
+      if (received++ === 0) {
+        onGenerate([stop]);
+        onClose();
+      } else {
+        onAppend(stop);
+      }
+    }, { signal: controller.signal, caller: 'AIPlannerModal', priority: 'interactive' });
+    controllerRef.current = null;
+    onStreamingChange(false);
+    setIsLoading(false);
+  };
+
+  // Plans the given day indexes concurrently, at most planDayConcurrency() at
+  // a time; the request scheduler then paces those within the API quota.
+  // Each day is written into the trip as soon as it arrives. Failed days stay
+  // marked for a targeted retry.
+  const planDays = async (indexes) => {
+    const dayIds = planDayIdsRef.current;
+    const controller = new AbortController();
+    controllerRef.current = controller;
+    setIsLoading(true);
+    const setStatus = (index, status) =>
+      setDayStatus(prev => prev.map((s, i) => i === index ? status : s));
+
+    const results = await runWithConcurrency(indexes, planDayConcurrency(), async (index) => {
+      setStatus(index, 'running');
+      const prompt = buildDayPlanPrompt(location, vibe, index + 1, dayIds.length);
+      const stops = await generateGeminiContent(prompt, ITINERARY_SCHEMA, { signal: controller.signal, caller: 'AIPlannerModal', priority: 'interactive' });
+      if (stops) onGenerateDay(dayIds[index], stops);
+      setStatus(index, stops ? 'done' : 'failed');
+      return !!stops;
+    });
+
+    controllerRef.current = null;
+    setIsLoading(false);
+    if (!controller.signal.aborted && results.every(Boolean)) {
+      setDayStatus([]);
+      onClose();
+    }
+  };
+
+  const handleGenerateTrip = () => {
+    planDayIdsRef.current = onPrepareDays(dayCount);
+    setDayStatus(Array(dayCount).fill('pending'));
+    planDays(Array.from({ length: dayCount }, (_, i) => i));
+  };
+
+  const handleRetryFailed = () => {
+    planDays(dayStatus.flatMap((status, i) => status === 'failed' ? [i] : []));
+  };
+
+  const hasFailedDays = !isLoading && dayStatus.includes('failed');
+
+  return (
+    <div className="fixed inset-0 bg-black/20 backdrop-blur-sm z-50 flex items-center justify-center p-4">
+      <div className="bg-white rounded-2xl shadow-xl w-full max-w-sm overflow-hidden animate-in fade-in zoom-in duration-200">
+        <div className="relative bg-gradient-to-r from-violet-500 to-fuchsia-500 p-6 text-white text-center">
+          <button onClick={handleClose} className="absolute top-3 right-3 text-white/70 hover:text-white"><X size={20}/></button>
+          <Sparkles className="w-12 h-12 mx-auto mb-2 opacity-90" />
+          <h3 className="font-bold text-xl">Magic Plan</h3>
+          <p className="text-white/80 text-sm">Let AI design your perfect {dayCount > 1 ? 'trip' : 'day'}</p>
+        </div>
+        
+        <div className="p-6 space-y-4">
+          <div>
+            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Where to?</label>
+            <input 
+              type="text" 
+              value={location}
+              onChange={e => setLocation(e.target.value)}
+              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-violet-500"
+              placeholder="e.g. Paris, Kyoto, New York"
+            />
+          </div>
+          
+          <div className="grid grid-cols-3 gap-4">
+            <div className="col-span-2">
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Trip Vibe</label>
+              <select 
+                value={vibe}
+                onChange={e => setVibe(e.target.value)}
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-violet-500"
+              >
+                <option>Classic Sightseeing</option>
+                <option>Foodie Adventure</option>
+                <option>Hidden Gems & Local Spots</option>
+                <option>Relaxed & Chill</option>
+                <option>History & Culture</option>
+                <option>Shopping Spree</option>
+              </select>
+            </div>
+            <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Days</label>
+              <input
+                type="number"
+                value={dayCount}
+                onChange={e => setDayCount(Math.min(MAX_PLAN_DAYS, Math.max(1, parseInt(e.target.value) || 1)))}
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-violet-500"
+                min="1"
+                max={MAX_PLAN_DAYS}
+                disabled={isLoading}
+              />
+            </div>
+          </div>
+
+          {dayStatus.length > 0 && (
+            <div className="flex flex-wrap gap-1.5">
+              {dayStatus.map((status, i) => (
+                <span
+                  key={i}
+                  className={`flex items-center gap-1 px-2 py-0.5 rounded-full text-[10px] font-medium ${
+                    status === 'done' ? 'bg-emerald-50 text-emerald-600'
+                      : status === 'failed' ? 'bg-red-50 text-red-500'
+                      : 'bg-violet-50 text-violet-500'
+                  }`}
+                >
+                  {status === 'running' && <Loader2 size={10} className="animate-spin" />}
+                  Day {i + 1}
+                </span>
+              ))}
+            </div>
+          )}
+
+          <button 
+            onClick={hasFailedDays ? handleRetryFailed : dayCount > 1 ? handleGenerateTrip : handleGenerate}
+            disabled={isLoading}
+            className="w-full py-3 bg-violet-600 hover:bg-violet-700 disabled:bg-violet-300 text-white font-bold rounded-xl transition-colors shadow-lg shadow-violet-200 flex items-center justify-center gap-2"
+          >
+            {isLoading ? (
+              <>
+                <Loader2 className="animate-spin" size={20} />
+                Planning...
+              </>
+            ) : (
+              <>
+                <Sparkles size={20} />
+                {hasFailedDays ? 'Retry Failed Days' : 'Generate Itinerary'}
+              </>
+            )}
+          </button>
+        </div>
+      </div>
+    </div>
+  );
+});
+
+export const StopModal = profiled('StopModal', ({ isOpen, onClose, onSave, initialData }) => {
+  const [formData, setFormData] = useState({
+    name: '',
+    category: 'sight',
+    duration: 60,
+    googleLink: '',
+    ticketInfo: '',
+    remarks: '',
+    expenses: '',
+    fixedTime: false,
+    startTime: DEFAULT_DAY_START,
+    openTime: '',
+    closeTime: ''
+  });
+
+  useEffect(() => {
+    if (initialData) {
+      setFormData({
+        name: initialData.name || '',
+        category: initialData.category || 'sight',
+        duration: initialData.duration || 60,
+        googleLink: initialData.googleLink || '',
+        ticketInfo: initialData.ticketInfo || '',
+        remarks: initialData.remarks || '',
+        expenses: initialData.expenses || '',
+        fixedTime: !!initialData.fixedTime,
+        startTime: initialData.fixedTime || initialData.startMinutes === undefined
+          ? initialData.startTime || DEFAULT_DAY_START
+          : formatTime(initialData.startMinutes),
+        openTime: initialData.openingHours?.open || '',
+        closeTime: initialData.openingHours?.close || ''
+      });
+    } else {
+      setFormData({
+        name: '', category: 'sight', duration: 60, googleLink: '', ticketInfo: '', remarks: '', expenses: '',
+        fixedTime: false, startTime: DEFAULT_DAY_START, openTime: '', closeTime: ''
+      });
+    }
+  }, [initialData, isOpen]);
+
+  if (!isOpen) return null;
+
+  const handleSubmit = (e) => {
+    e.preventDefault();
+    const { fixedTime, startTime, openTime, closeTime, ...fields } = formData;
+    onSave({
+      ...fields,
+      duration: parseInt(formData.duration),
+      fixedTime,
+      // Only a fixed stop owns its start time; the others are scheduled.
+      ...(fixedTime ? { startTime } : {}),
+      openingHours: openTime && closeTime ? { open: openTime, close: closeTime } : undefined
+    });
+    onClose();
+  };
+
+  const handleChange = (e) => {
+    const { name, type, checked, value } = e.target;
+    setFormData(prev => ({ ...prev, [name]: type === 'checkbox' ? checked : value }));
+  };
+
+  return (
+    <div className="fixed inset-0 bg-black/20 backdrop-blur-sm z-50 flex items-center justify-center p-4">
+      <div className="bg-white rounded-2xl shadow-xl w-full max-w-md overflow-hidden animate-in fade-in zoom-in duration-200 max-h-[90vh] flex flex-col">
+        <div className="p-4 border-b border-gray-100 flex justify-between items-center flex-shrink-0">
+          <h3 className="font-bold text-gray-800">{initialData ? 'Edit Stop' : 'Add New Stop'}</h3>
+          <button onClick={onClose} className="text-gray-400 hover:text-gray-600"><X size={20}/></button>
+        </div>
+        
+        <form onSubmit={handleSubmit} className="p-4 space-y-4 overflow-y-auto">
+          <div>
+            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Place Name</label>
+            <input 
+              autoFocus
+              type="text" 
+              name="name"
+              value={formData.name}
+              onChange={handleChange}
+              placeholder="e.g. Tokyo Tower"
+              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:ring-2 focus:ring-emerald-500/20 focus:border-emerald-500"
+              required
+            />
+          </div>
+          
+          <div className="grid grid-cols-2 gap-4">
+             <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Category</label>
+              <select 
+                name="category"
+                value={formData.category} 
+                onChange={handleChange}
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
+              >
+                <option value="sight">Sightseeing</option>
+                <option value="food">Food/Drink</option>
+                <option value="hotel">Hotel</option>
+                <option value="transport">Transport</option>
+                <option value="coffee">Cafe</option>
+              </select>
+            </div>
+            <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Duration (min)</label>
+              <input 
+                type="number" 
+                name="duration"
+                value={formData.duration}
+                onChange={handleChange}
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
+                min="15"
+                step="15"
+              />
+            </div>
+          </div>
+
+          <div className="grid grid-cols-2 gap-4">
+            <div>
+              <label className="flex items-center gap-1.5 text-xs font-bold text-gray-500 uppercase mb-1">
+                <input
+                  type="checkbox"
+                  name="fixedTime"
+                  checked={formData.fixedTime}
+                  onChange={handleChange}
+                  className="accent-emerald-500"
+                />
+                <Lock size={12}/> Fixed Start
+              </label>
+              <input
+                type="time"
+                name="startTime"
+                value={formData.startTime}
+                onChange={handleChange}
+                disabled={!formData.fixedTime}
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm disabled:opacity-50"
+              />
+            </div>
+            <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Opening Hours</label>
+              <div className="flex items-center gap-1">
+                <input
+                  type="time"
+                  name="openTime"
+                  value={formData.openTime}
+                  onChange={handleChange}
+                  className="w-full min-w-0 px-2 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
+                />
+                <span className="text-gray-300">–</span>
+                <input
+                  type="time"
+                  name="closeTime"
+                  value={formData.closeTime}
+                  onChange={handleChange}
+                  className="w-full min-w-0 px-2 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
+                />
+              </div>
+            </div>
+          </div>
+
+          <div className="border-t border-gray-100 pt-4 space-y-4">
+             <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
+                <Banknote size={12}/> Expenses / Cost
+              </label>
+              <input 
+                type="text" 
+                name="expenses"
+                value={formData.expenses}
+                onChange={handleChange}
+                placeholder="e.g. ¥2000, $25, Free"
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
+              />
+            </div>
+
+            <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
+                <LinkIcon size={12}/> Google Maps Link
+              </label>
+              <input 
+                type="url" 
+                name="googleLink"
+                value={formData.googleLink}
+                onChange={handleChange}
+                placeholder="https://goo.gl/maps/..."
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
+              />
+            </div>
+
+            <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
+                <Ticket size={12}/> Ticket Info
+              </label>
+              <input 
+                type="text" 
+                name="ticketInfo"
+                value={formData.ticketInfo}
+                onChange={handleChange}
+                placeholder="e.g. Reservation #12345, Flight JL123"
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm"
+              />
+            </div>
+
+            <div>
+              <label className="block text-xs font-bold text-gray-500 uppercase mb-1 flex items-center gap-1">
+                <FileText size={12}/> Remarks
+              </label>
+              <textarea 
+                name="remarks"
+                value={formData.remarks}
+                onChange={handleChange}
+                placeholder="e.g. Enter through the south gate..."
+                rows="2"
+                className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500 text-sm resize-none"
+              />
+            </div>
+          </div>
+        </form>
+
+        <div className="p-4 border-t border-gray-100 bg-gray-50 flex-shrink-0">
+          <button 
+            onClick={handleSubmit}
+            className="w-full py-3 bg-emerald-500 hover:bg-emerald-600 text-white font-bold rounded-xl transition-colors shadow-lg shadow-emerald-200"
+          >
+            {initialData ? 'Save Changes' : 'Add to Itinerary'}
+          </button>
+        </div>
+      </div>
+    </div>
+  );
+});
+
+export const DayEditModal = profiled('DayEditModal', ({ isOpen, onClose, onSave, initialData }) => {
+  const [label, setLabel] = useState('');
+  const [date, setDate] = useState('');
+
+  useEffect(() => {
+    if (initialData) {
+      setLabel(initialData.label);
+      setDate(initialData.date);
+    }
+  }, [initialData, isOpen]);
+
+  if (!isOpen) return null;
+
+  return (
+    <div className="fixed inset-0 bg-black/20 backdrop-blur-sm z-50 flex items-center justify-center p-4">
+      <div className="bg-white rounded-2xl shadow-xl w-full max-w-sm p-4 animate-in fade-in zoom-in duration-200">
+         <div className="flex justify-between items-center mb-4">
+          <h3 className="font-bold text-gray-800">Edit Day Details</h3>
+          <button onClick={onClose} className="text-gray-400 hover:text-gray-600"><X size={20}/></button>
+        </div>
+        <div className="space-y-4">
+          <div>
+            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Day Label</label>
+            <input 
+              type="text" 
+              value={label}
+              onChange={e => setLabel(e.target.value)}
+              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
+            />
+          </div>
+          <div>
+            <label className="block text-xs font-bold text-gray-500 uppercase mb-1">Date</label>
+            <input 
+              type="date" 
+              value={date}
+              onChange={e => setDate(e.target.value)}
+              className="w-full px-3 py-2 bg-gray-50 border border-gray-200 rounded-lg focus:outline-none focus:border-emerald-500"
+            />
+          </div>
+          <button 
+            onClick={() => { onSave(label, date); onClose(); }}
+            className="w-full py-2.5 bg-emerald-500 hover:bg-emerald-600 text-white font-bold rounded-xl transition-colors"
+          >
+            Update Day
+          </button>
+        </div>
+      </div>
+    </div>
+  );
+});
@@ -0,0 +1,13 @@
+import React, { Profiler } from 'react';
+import { RENDER_PROFILING, recordRender } from '../lib/renderProfiling.js';
+
+// With render profiling on, reports the component's commits under `id`.
+export const profiled = (id, Component) => {
+  if (!RENDER_PROFILING) return Component;
+  const Profiled = (props) => (
+    <Profiler id={id} onRender={recordRender}>
+      <Component {...props} />
+    </Profiler>
+  );
+  return Profiled;
+};